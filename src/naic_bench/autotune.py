@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, ClassVar
+
+import yaml
+from pydantic import BaseModel, Field
+
+from naic_bench.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# Subdirectory of a benchmark's output directory for the probe runs
+AUTOTUNE_DIR = "autotune"
+
+# Markers in the output of a failed run, which identify an out-of-memory error
+OOM_MARKERS = ["out of memory", "outofmemory", "oom-kill"]
+
+def is_out_of_memory(lines: list[str]) -> bool:
+    for line in lines:
+        lowered = line.lower()
+        if any(x in lowered for x in OOM_MARKERS):
+            return True
+    return False
+
+class ProbeResult(BaseModel):
+    batch_size: int
+    throughput: float | None = Field(default=None, description="None if the run failed, e.g., due to OOM")
+    out_of_memory: bool = Field(default=False)
+
+    @property
+    def failed(self) -> bool:
+        return self.throughput is None
+
+class TuningResult(BaseModel):
+    benchmark: str
+    variant: str
+    gpu_model: str
+    gpu_count: int
+
+    batch_size: int
+    metric: str
+    throughput: float
+    estimated_batch_size: int = Field(description="batch size as estimated from the spec")
+    probes: list[ProbeResult] = Field(default=[])
+    timestamp: dt.datetime = Field(default_factory=lambda: dt.datetime.now(tz=dt.timezone.utc))
+
+    @classmethod
+    def key(cls, benchmark: str, variant: str, gpu_model: str, gpu_count: int) -> str:
+        return f"{benchmark}|{variant}|{gpu_model}|{gpu_count}"
+
+class TuningCache:
+    """
+    Persistent cache of the tuned batch sizes per (benchmark, variant, gpu_model, gpu_count)
+    """
+    filename: Path
+    entries: dict[str, TuningResult]
+
+    _instances: ClassVar[dict[Path, TuningCache]] = {}
+    _instances_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, filename: Path | str):
+        self.filename = Path(filename)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self.reload()
+
+    @classmethod
+    def default_file(cls) -> Path:
+        config = Config.initialize()
+        return config.cache_dir / "tuning.yaml"
+
+    @classmethod
+    def get_instance(cls, filename: Path | str | None = None) -> TuningCache:
+        filename = Path(filename) if filename else cls.default_file()
+        with cls._instances_lock:
+            if filename not in cls._instances:
+                cls._instances[filename] = TuningCache(filename)
+            return cls._instances[filename]
+
+    @classmethod
+    def clear(cls):
+        with cls._instances_lock:
+            cls._instances.clear()
+
+    @classmethod
+    def read(cls, filename: Path) -> dict[str, TuningResult]:
+        if not filename.exists():
+            return {}
+
+        try:
+            with open(filename, "r") as f:
+                data = yaml.load(f, Loader=yaml.SafeLoader) or {}
+            return {key: TuningResult(**value) for key, value in data.items()}
+        except Exception as e:
+            logger.warning(f"TuningCache.read: ignoring invalid cache file {filename} -- {e}")
+            return {}
+
+    def reload(self):
+        with self._lock:
+            self.entries = self.read(self.filename)
+
+    def get(self, benchmark: str, variant: str, gpu_model: str, gpu_count: int) -> TuningResult | None:
+        with self._lock:
+            return self.entries.get(TuningResult.key(benchmark, variant, gpu_model, gpu_count))
+
+    def put(self, result: TuningResult):
+        """
+        Add the result and write the cache, keeping entries which have been added by other processes
+        """
+        key = TuningResult.key(result.benchmark, result.variant, result.gpu_model, result.gpu_count)
+        with self._lock:
+            entries = self.read(self.filename)
+            entries.update(self.entries)
+            entries[key] = result
+            self.entries = entries
+
+            try:
+                self.filename.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = self.filename.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_file, "w") as f:
+                    yaml.dump({k: v.model_dump(mode="json") for k, v in entries.items()}, f)
+                os.replace(tmp_file, self.filename)
+            except OSError as e:
+                logger.warning(f"TuningCache.put: failed to write cache file {self.filename} -- {e}")
+
+class BatchSizeSearch:
+    """
+    Search the largest batch size that neither runs out of memory nor loses throughput.
+
+    Starting from the estimated batch size, the batch size is doubled as long as the probe runs succeed
+    and the throughput does not drop. Then the interval between the last good and the first bad
+    batch size is bisected.
+    """
+    probe: Callable[[int], ProbeResult]
+    tolerance: float
+    max_batch_size: int
+    max_probes: int
+    resolution: float
+
+    def __init__(self,
+                 probe: Callable[[int], ProbeResult],
+                 tolerance: float = 0.02,
+                 max_batch_size: int = 65536,
+                 max_probes: int = 12,
+                 resolution: float = 0.05):
+        """
+        :param probe: run the benchmark with the given batch size
+        :param tolerance: relative drop of the throughput that is still accepted
+        :param max_probes: maximum number of probe runs
+        :param resolution: stop bisecting when the interval is smaller than this fraction of the batch size
+        """
+        self.probe = probe
+        self.tolerance = tolerance
+        self.max_batch_size = max_batch_size
+        self.max_probes = max_probes
+        self.resolution = resolution
+
+        self.probes = []
+
+    def run_probe(self, batch_size: int) -> ProbeResult:
+        result = self.probe(batch_size)
+        logger.info(f"BatchSizeSearch.run_probe: {result}")
+        self.probes.append(result)
+        return result
+
+    def accepts(self, result: ProbeResult, best: ProbeResult) -> bool:
+        return not result.failed and result.throughput >= best.throughput * (1 - self.tolerance)
+
+    def search(self, start: int) -> ProbeResult | None:
+        """
+        Get the best probe, or None if even batch size 1 fails
+        """
+        batch_size = max(1, min(start, self.max_batch_size))
+
+        # find a working batch size first
+        best = self.run_probe(batch_size)
+        while best.failed:
+            if batch_size == 1 or len(self.probes) >= self.max_probes:
+                return None
+            batch_size = max(1, batch_size // 2)
+            best = self.run_probe(batch_size)
+
+        # the largest accepted batch size and the smallest rejected one
+        lower = best
+        upper = None
+        if lower.batch_size < start:
+            upper = lower.batch_size * 2
+
+        while upper is None and len(self.probes) < self.max_probes:
+            if lower.batch_size >= self.max_batch_size:
+                return lower
+
+            result = self.run_probe(min(lower.batch_size * 2, self.max_batch_size))
+            if self.accepts(result, best):
+                lower = result
+                if result.throughput > best.throughput:
+                    best = result
+            else:
+                upper = result.batch_size
+
+        if upper is None:
+            return lower
+
+        while len(self.probes) < self.max_probes \
+                and upper - lower.batch_size > max(1, lower.batch_size * self.resolution):
+            result = self.run_probe((lower.batch_size + upper) // 2)
+            if self.accepts(result, best):
+                lower = result
+                if result.throughput > best.throughput:
+                    best = result
+            else:
+                upper = result.batch_size
+
+        return lower
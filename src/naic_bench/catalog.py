@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from pathlib import Path
+
+from naic_bench.settings import Config
+from naic_bench.spec import BenchmarkSpec
+from naic_bench.version import __version__
+
+logger = logging.getLogger(__name__)
+
+# Increase when the layout of the cached specs changes
+CATALOG_CACHE_FORMAT = 2
+
+class BenchmarkCatalog:
+    """
+    The benchmark specs of a conf.d directory, which are loaded only once per process.
+
+    The parsed specs are additionally stored as pickled snapshot in the cache directory, so
+    that subsequent processes can skip parsing as long as the spec files remain unchanged.
+    """
+    confd_dir: Path
+    data_dir: str
+    fingerprint: str
+    specs: dict[str, dict[str, dict[str, BenchmarkSpec]]]
+
+    _instances: dict[tuple[str, str], BenchmarkCatalog] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, confd_dir: Path | str, data_dir: Path | str, fingerprint: str, specs: dict):
+        self.confd_dir = Path(confd_dir)
+        self.data_dir = str(data_dir)
+        self.fingerprint = fingerprint
+        self.specs = specs
+
+    @classmethod
+    def get_instance(cls, confd_dir: Path | str, data_dir: Path | str, use_cache: bool = True) -> BenchmarkCatalog:
+        """
+        Get the catalog for the given conf.d directory
+        """
+        key = (str(Path(confd_dir).resolve()), str(data_dir))
+        with cls._lock:
+            catalog = cls._instances.get(key)
+            if catalog is None:
+                fingerprint = cls.compute_fingerprint(confd_dir=confd_dir, data_dir=data_dir)
+                catalog = cls.load(confd_dir=confd_dir, data_dir=data_dir, fingerprint=fingerprint, use_cache=use_cache)
+                cls._instances[key] = catalog
+            return catalog
+
+    @classmethod
+    def clear(cls):
+        """
+        Drop all in-process instances
+        """
+        with cls._lock:
+            cls._instances.clear()
+
+    @classmethod
+    def compute_fingerprint(cls, confd_dir: Path | str, data_dir: Path | str) -> str:
+        """
+        Fingerprint of all spec files (name, mtime and content) and parameters that affect the parsed specs
+        """
+        sha = hashlib.sha256()
+        for x in [__version__, str(CATALOG_CACHE_FORMAT), str(data_dir)]:
+            sha.update(x.encode("UTF-8"))
+            sha.update(b"\0")
+
+        for spec_file in BenchmarkSpec.spec_files(confd_dir):
+            stat = spec_file.stat()
+            sha.update(f"{spec_file.name}:{stat.st_mtime_ns}:{stat.st_size}:".encode("UTF-8"))
+            sha.update(hashlib.sha256(spec_file.read_bytes()).digest())
+        return sha.hexdigest()
+
+    @classmethod
+    def cache_file(cls, confd_dir: Path | str, data_dir: Path | str) -> Path:
+        config = Config.initialize()
+
+        key = hashlib.sha256(f"{Path(confd_dir).resolve()}:{data_dir}".encode("UTF-8")).hexdigest()[:16]
+        return config.cache_dir / "catalog" / f"{key}.pickle"
+
+    @classmethod
+    def load(cls, confd_dir: Path | str, data_dir: Path | str, fingerprint: str, use_cache: bool = True) -> BenchmarkCatalog:
+        cache_file = cls.cache_file(confd_dir=confd_dir, data_dir=data_dir)
+        if use_cache and cache_file.exists():
+            try:
+                with open(cache_file, "rb") as f:
+                    catalog = pickle.load(f)
+
+                if catalog.fingerprint == fingerprint:
+                    logger.debug(f"BenchmarkCatalog.load: using cached catalog {cache_file}")
+                    return catalog
+            except Exception as e:
+                logger.warning(f"BenchmarkCatalog.load: ignoring invalid cache file {cache_file} -- {e}")
+
+        specs = BenchmarkSpec.load_all(confd_dir=confd_dir, data_dir=data_dir)
+        catalog = BenchmarkCatalog(confd_dir=confd_dir, data_dir=data_dir, fingerprint=fingerprint, specs=specs)
+
+        if use_cache:
+            catalog.save(cache_file)
+
+        return catalog
+
+    def save(self, cache_file: Path):
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning(f"BenchmarkCatalog.save: failed to write cache file {cache_file} -- {e}")
+
+    def as_list(self) -> list[tuple[str, str, str, BenchmarkSpec]]:
+        specs = []
+        for framework, benchmark_specs in self.specs.items():
+            for benchmark_name, variants in benchmark_specs.items():
+                for variant, benchmark_spec in variants.items():
+                    specs.append([framework, benchmark_name, variant, benchmark_spec])
+        return specs
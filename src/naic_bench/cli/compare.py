@@ -0,0 +1,107 @@
+from argparse import ArgumentParser
+import logging
+from pathlib import Path
+import sys
+
+from naic_bench.cli.base import BaseParser
+from naic_bench.compare import FAILED, MISSING, REGRESSION, compare, load_results, print_comparison
+from naic_bench.results import ResultFilter
+
+logger = logging.getLogger(__name__)
+
+
+class CompareParser(BaseParser):
+    def __init__(self, parser: ArgumentParser):
+        super().__init__(parser=parser)
+
+        parser.add_argument("--baseline",
+                            required=True,
+                            help="The baseline: a results directory or an export of 'naic-bench report' (.json, .yaml, .parquet, .arrow)"
+        )
+
+        parser.add_argument("--results",
+                            required=True,
+                            help="The results to check: a results directory or an export of 'naic-bench report'"
+        )
+
+        parser.add_argument("--threshold",
+                            type=float,
+                            default=0.05,
+                            help="Relative change of a metric (for the worse) that counts as regression, default is 0.05"
+        )
+
+        parser.add_argument("--confidence",
+                            type=float,
+                            default=0.95,
+                            help="Confidence level of the t-test, which a regression also has to pass if there are"
+                                 " multiple samples, default is 0.95"
+        )
+
+        parser.add_argument("--benchmark",
+                nargs="+",
+                type=str,
+                default=None,
+                help="Benchmark name(s), default is all"
+        )
+
+        parser.add_argument("--variant",
+                nargs="+",
+                type=str,
+                default=None,
+                help="Benchmark variant name(s), default is all"
+        )
+
+        parser.add_argument("--device-type",
+                nargs="+",
+                type=str,
+                default=None,
+                help="Device types to take into account, default is all"
+        )
+
+        parser.add_argument("--allow-missing",
+                            action="store_true",
+                            default=False,
+                            help="Do not fail for baseline results without a matching result"
+        )
+
+        parser.add_argument("--show-all",
+                            action="store_true",
+                            default=False,
+                            help="Show all compared metrics, not only the changed ones"
+        )
+
+        parser.add_argument("--save-as",
+                            default=None,
+                            help="Save the comparison (.csv or .json)"
+        )
+
+    def execute(self, args, options):
+        super().execute(args, options)
+
+        result_filter = ResultFilter(benchmarks=args.benchmark, variants=args.variant, device_types=args.device_type)
+        baseline = load_results(args.baseline, result_filter=result_filter)
+        results = load_results(args.results, result_filter=result_filter)
+        logger.info(f"Comparing {len(results)} results against {len(baseline)} baseline results")
+
+        comparison = compare(baseline, results, threshold=args.threshold, confidence=args.confidence)
+        print_comparison(comparison, show_all=args.show_all)
+
+        if args.save_as:
+            if Path(args.save_as).suffix == ".csv":
+                comparison.to_csv(args.save_as, index=False)
+            elif Path(args.save_as).suffix == ".json":
+                comparison.to_json(args.save_as, orient="records")
+            else:
+                raise ValueError(f"Could not save {args.save_as}. Unknown output format")
+            print(f"Saved comparison as {args.save_as}")
+
+        failures = comparison["status"].isin([REGRESSION, FAILED]).sum()
+        if failures:
+            print(f"Found {failures} regression(s) beyond {args.threshold:.1%}")
+
+        missing = 0 if args.allow_missing else (comparison["status"] == MISSING).sum()
+        if missing:
+            print(f"Found {missing} baseline result(s) without a matching result (use --allow-missing to accept them)")
+
+        if failures or missing:
+            sys.exit(1)
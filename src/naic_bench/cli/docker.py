@@ -17,9 +17,26 @@ class DockerParser(BaseParser):
     def __init__(self, parser: ArgumentParser):
         super().__init__(parser=parser)
 
-        parser.add_argument("--rebuild", action="store_true", default=False)
+        parser.add_argument("--rebuild", action="store_true", default=False,
+                help="Rebuild the image even if it is up to date, and restart the container")
+        parser.add_argument("--no-cache", action="store_true", default=False,
+                help="Rebuild the image without using cached layers")
+        parser.add_argument("--update", action="store_true", default=False,
+                help="Rebuild the image if the main branch of naic-bench has a newer commit than the one installed in the image")
         parser.add_argument("--restart", action="store_true", default=False)
 
+        parser.add_argument("--build",
+            nargs="+",
+            type=str,
+            default=None,
+            help="Only build the images for the given device types (in parallel), e.g., --build nvidia rocm"
+        )
+        parser.add_argument("--jobs",
+            type=int,
+            default=None,
+            help="Number of images to build in parallel, default is all"
+        )
+
         parser.add_argument("--device-type", required=False, type=str, default=None)
         parser.add_argument("--container",
             help="The container name, default is 'naic-bench-<device-type>'",
@@ -43,6 +60,12 @@ class DockerParser(BaseParser):
 
         Command.find(command="docker", do_throw=True)
 
+        if args.build:
+            built = Docker.build_all(args.build, jobs=args.jobs, force=args.rebuild, no_cache=args.no_cache, update=args.update)
+            for device_type, was_built in built.items():
+                print(f"{Docker.image_name(device_type)}: {'built' if was_built else 'up to date'}")
+            return
+
         Docker.run(
              device_type=args.device_type,
              container_name=args.container,
@@ -51,4 +74,6 @@ class DockerParser(BaseParser):
              data_dir=args.data_dir,
              cpus=args.cpus,
              shm_size=args.shm_size,
-             exec_args=exec_args)
+             exec_args=exec_args,
+             no_cache=args.no_cache,
+             update=args.update)
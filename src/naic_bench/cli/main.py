@@ -1,4 +1,5 @@
 from argparse import ArgumentParser
+from importlib import import_module
 import logging
 from logging import basicConfig, getLogger
 from rich import print as print
@@ -7,19 +8,37 @@ from rich_argparse import RichHelpFormatter
 import sys
 
 from naic_bench.cli.base import BaseParser
-from naic_bench.cli.docker import DockerParser
-from naic_bench.cli.prepare import PrepareParser
-from naic_bench.cli.report import ReportParser
-from naic_bench.cli.run import RunParser
-from naic_bench.cli.show import ShowParser
-from naic_bench.cli.singularity import SingularityParser
-
-
 from naic_bench import __version__
 
 logger = getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Subcommands with their parser as '<module>:<class>' - a parser (and thereby its dependencies)
+# is only imported when its subcommand is selected
+SUBCOMMANDS = {
+    "compare": ("naic_bench.cli.compare:CompareParser", "Compare benchmark results against a baseline and detect regressions"),
+    "docker": ("naic_bench.cli.docker:DockerParser", "Prepare and/or use docker image for benchmarking"),
+    "prepare": ("naic_bench.cli.prepare:PrepareParser", "Prepare benchmarks, e.g., downloading data and setting up venvs"),
+    "report": ("naic_bench.cli.report:ReportParser", "Report on available benchmark results"),
+    "run": ("naic_bench.cli.run:RunParser", "Run benchmarks"),
+    "singularity": ("naic_bench.cli.singularity:SingularityParser", "Prepare and/or use singularity image for benchmarking"),
+    "slurm": ("naic_bench.cli.slurm:SlurmParser", "Submit benchmark runs as slurm jobs"),
+    "show": ("naic_bench.cli.show:ShowParser", "Show available benchmark specs"),
+}
+
+def load_parser_class(name: str) -> type[BaseParser]:
+    """
+    Import a parser class given as '<module>:<class>'
+    """
+    module_name, class_name = name.split(":")
+    return getattr(import_module(module_name), class_name)
+
+def selected_subcommand(argv: list[str]) -> str | None:
+    """
+    Get the subcommand in the arguments, i.e., the first argument that is a known subcommand
+    """
+    return next((x for x in argv if x in SUBCOMMANDS), None)
+
 class MainParser(ArgumentParser):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -30,15 +49,24 @@ class MainParser(ArgumentParser):
         self.add_argument("--verbose", default=False, action="store_true", help="Show verbose information, including error traceback")
 
     def attach_subcommand_parser(
-        self, subcommand: str, help: str, parser_klass: BaseParser
+        self, subcommand: str, help: str, parser_klass: type[BaseParser] | str | None
     ):
+        """
+        :param parser_klass: the parser class or its name as '<module>:<class>' - None only
+            registers the subcommand (for the help), without its arguments
+        """
         if not hasattr(self, 'subparsers'):
             # lazy initialization, since it cannot be part of the __init__ function
             # otherwise random errors
             self.subparsers = self.add_subparsers(help="sub-command help")
 
-        subparser = self.subparsers.add_parser(subcommand)
+        subparser = self.subparsers.add_parser(subcommand, help=help)
         subparser.formatter_class = RichHelpFormatter
+        if parser_klass is None:
+            return
+
+        if isinstance(parser_klass, str):
+            parser_klass = load_parser_class(parser_klass)
         parser_klass(parser=subparser)
 
 def run():
@@ -49,41 +77,13 @@ def run():
 
     main_parser = MainParser(formatter_class=RichHelpFormatter)
 
-    main_parser.attach_subcommand_parser(
-        subcommand="docker",
-        help="Prepare and/or use docker image for benchmarking",
-        parser_klass=DockerParser
-    )
-
-    main_parser.attach_subcommand_parser(
-        subcommand="prepare",
-        help="Prepare benchmarks, e.g., downloading data and setting up venvs",
-        parser_klass=PrepareParser
-    )
-
-    main_parser.attach_subcommand_parser(
-        subcommand="report",
-        help="Report on available benchmark results",
-        parser_klass=ReportParser
-    )
-
-    main_parser.attach_subcommand_parser(
-        subcommand="run",
-        help="Run benchmarks",
-        parser_klass=RunParser
-    )
-
-    main_parser.attach_subcommand_parser(
-        subcommand="singularity",
-        help="Prepare and/or use singularity image for benchmarking",
-        parser_klass=SingularityParser
-    )
-
-    main_parser.attach_subcommand_parser(
-        subcommand="show",
-        help="Show available benchmark specs",
-        parser_klass=ShowParser
-    )
+    selected = selected_subcommand(sys.argv[1:])
+    for subcommand, (parser_klass, help) in SUBCOMMANDS.items():
+        main_parser.attach_subcommand_parser(
+            subcommand=subcommand,
+            help=help,
+            parser_klass=parser_klass if subcommand == selected else None
+        )
 
     args, options = main_parser.parse_known_args()
 
@@ -1,5 +1,6 @@
 from argparse import ArgumentParser
 import logging
+import time
 
 from naic_bench.cli.base import BaseParser
 from naic_bench.prepare import BenchmarkPrepare
@@ -20,6 +21,30 @@ class PrepareParser(BaseParser):
                 help="Do not force installation of prerequisites, assuming that they have already been installed"
         )
 
+        parser.add_argument("--no-wheelhouse",
+                action="store_true",
+                default=False,
+                help="Do not prebuild the wheels for the benchmarks' requirements"
+        )
+
+        parser.add_argument("--jobs",
+                type=int,
+                default=4,
+                help="Maximum number of prepare scripts that run in parallel"
+        )
+
+        parser.add_argument("--force",
+                action="store_true",
+                default=False,
+                help="Run the prepare scripts, even if they have already been completed"
+        )
+
+        parser.add_argument("--verify",
+                action="store_true",
+                default=False,
+                help="Only check the data against the manifests (sizes and checksums), which are created after the preparation"
+        )
+
         parser.add_argument("--benchmark",
                 nargs="+",
                 type=str,
@@ -34,9 +59,40 @@ class PrepareParser(BaseParser):
                 benchmarks_dir=args.benchmarks_dir,
                 confd_dir=args.confd_dir)
 
+        if args.verify:
+            results = bp.verify(args.benchmark)
+            for result in results:
+                print(result)
+
+            failed = [x.benchmark for x in results if not x.ok]
+            if failed:
+                raise RuntimeError(f"Data verification failed for: {', '.join(failed)}")
+            return
+
         if args.no_deps:
             print(f"Assuming the following packages are already available: {','.join(bp.get_prerequisites())}")
         else:
             bp.install_prerequisites()
 
-        bp.prepare(args.benchmark)
+        start = time.monotonic()
+        tasks = bp.prepare(args.benchmark, jobs=args.jobs, force=args.force)
+        timings_in_s = {'data': time.monotonic() - start}
+
+        # recreate the manifests only for data that has been (re)created successfully, and create missing ones
+        # for existing data - benchmarks without any data get no manifest, i.e., remain unverified
+        start = time.monotonic()
+        prepared = bp.prepared_benchmarks(tasks)
+        if prepared:
+            bp.create_manifests(prepared, force=True)
+        bp.create_manifests(args.benchmark)
+        timings_in_s['manifest'] = time.monotonic() - start
+
+        if not args.no_wheelhouse:
+            start = time.monotonic()
+            wheelhouse_timings = bp.build_wheelhouse(args.benchmark)
+            timings_in_s['wheelhouse'] = time.monotonic() - start
+
+            for benchmark_name, duration_in_s in wheelhouse_timings.items():
+                logger.info(f"PrepareParser: wheelhouse for {benchmark_name}: {duration_in_s:.1f} s")
+
+        print(f"Preparation completed: {', '.join(f'{k}: {v:.1f} s' for k, v in timings_in_s.items())}")
@@ -5,21 +5,13 @@ from pathlib import Path
 import yaml
 
 from naic_bench.cli.base import BaseParser
+from naic_bench.export import COLUMNAR_FORMATS, export_columnar
+from naic_bench.results import RESULTS_INDEX_FILENAME, ResultFilter, ResultsIndex
 from naic_bench.spec import Report
 
 logger = logging.getLogger(__name__)
 
 
-class CustomSafeLoader(yaml.SafeLoader):
-    def construct_unknown(self, node):
-        if "torch.torch_version.TorchVersion" in node.tag:
-            return node.value[0].value
-
-        return None
-
-CustomSafeLoader.add_constructor(None, CustomSafeLoader.construct_unknown)
-
-
 class ReportParser(BaseParser):
     def __init__(self, parser: ArgumentParser):
         super().__init__(parser=parser)
@@ -31,7 +23,18 @@ class ReportParser(BaseParser):
 
         parser.add_argument("--save-as",
                             default="reports.json",
-                            help="The export file (either .json or .yaml)"
+                            help="The export file (.json, .yaml, or columnar as .parquet, .arrow)"
+        )
+
+        parser.add_argument("--index-file",
+                            default=None,
+                            help=f"The results index, default is <output-base-dir>/{RESULTS_INDEX_FILENAME}"
+        )
+
+        parser.add_argument("--workers",
+                            type=int,
+                            default=None,
+                            help="Number of processes to parse new or modified results"
         )
 
         parser.add_argument("--benchmark",
@@ -63,18 +66,19 @@ class ReportParser(BaseParser):
         if not reports_search_dir.exists():
             raise FileNotFoundError(f"The directory '{reports_search_dir}' does not exist")
 
-        reports = []
-        for benchmark_report in reports_search_dir.glob("*/**/report.yaml"):
-            system_info_path = Path(benchmark_report.parent / "system_info.yaml")
-            system_info = {}
-            if system_info_path.exists():
-                with open(system_info_path, "r") as f:
-                    system_info = yaml.load(f, Loader=CustomSafeLoader)
-
-            with open(benchmark_report, "r") as f:
-                data = yaml.load(f, Loader=yaml.SafeLoader)
-                print(Report(**data))
-                data['system_info'] = system_info
+        result_filter = ResultFilter(benchmarks=args.benchmark, variants=args.variant, device_types=args.device_type)
+        with ResultsIndex(reports_search_dir, filename=args.index_file) as index:
+            ingested, removed = index.update(workers=args.workers, result_filter=result_filter)
+            logger.info(f"Updated index {index.filename}: {ingested} ingested, {removed} removed")
+
+            if Path(args.save_as).suffix in COLUMNAR_FORMATS:
+                count = export_columnar(args.save_as, lambda: index.results(result_filter))
+                print(f"Saved {count} reports as {args.save_as}")
+                return
+
+            reports = []
+            for data in index.results(result_filter):
+                print(Report(**{k: v for k, v in data.items() if k != 'system_info'}))
                 reports.append(data)
 
         logger.info(f"Found {len(reports)} reports")
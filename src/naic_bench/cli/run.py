@@ -3,11 +3,13 @@ import logging
 from pathlib import Path
 import platform
 
-from slurm_monitor.utils.system_info import SystemInfo
 import subprocess
 
 from naic_bench.cli.base import BaseParser
+from naic_bench.hardware import HardwareInventory
 from naic_bench.run import BenchmarkRunner
+from naic_bench.scaling import ScalingReport
+from naic_bench.scheduler import available_devices
 from naic_bench.settings import Config
 
 
@@ -38,6 +40,12 @@ class RunParser(BaseParser):
 
         parser.add_argument("--confd-dir", default=None, type=str)
         parser.add_argument("--gpu-count", type=int, default=1)
+        parser.add_argument("--gpu-counts",
+                            type=str,
+                            default=None,
+                            help="Comma-separated list of gpu counts, e.g., 1,2,4,8, to run a scaling sweep"
+                                 " - overrides --gpu-count"
+        )
 
         parser.add_argument("--recreate-venv",
                             action="store_true",
@@ -45,6 +53,76 @@ class RunParser(BaseParser):
                             help="Force the recreation of any related venv for the benchmarks"
         )
 
+        parser.add_argument("--stop-after-samples",
+                            type=int,
+                            default=None,
+                            help="Stop a benchmark once all its metrics have been reported the given number of times"
+        )
+
+        parser.add_argument("--autotune",
+                            action="store_true",
+                            default=False,
+                            help="Search the batch size with the highest throughput via short probe runs, unless"
+                                 " it is already in the tuning cache"
+        )
+        parser.add_argument("--retune",
+                            action="store_true",
+                            default=False,
+                            help="Search the batch size, even if it is already in the tuning cache"
+        )
+
+        parser.add_argument("--repeat",
+                            type=int,
+                            default=1,
+                            help="Number of measured runs per benchmark - the report contains mean, median, stddev and"
+                                 " confidence interval of each metric across the runs"
+        )
+        parser.add_argument("--warmup-runs",
+                            type=int,
+                            default=0,
+                            help="Number of runs per benchmark before the measured runs, whose results are discarded"
+        )
+
+        parser.add_argument("--parallel",
+                            action="store_true",
+                            default=False,
+                            help="Run independent benchmarks concurrently, each on a disjoint set of --gpu-count devices"
+                                 " - requires --device-type"
+        )
+        parser.add_argument("--grace-period",
+                            type=int,
+                            default=30,
+                            help="Maximum time in seconds to wait for the device(s) to become idle before a benchmark starts"
+        )
+        parser.add_argument("--idle-utilization",
+                            type=float,
+                            default=None,
+                            help="Utilization (in percent) below which a device is considered idle"
+        )
+        parser.add_argument("--idle-memory",
+                            type=float,
+                            default=None,
+                            help="Used memory (in MB) below which a device is considered idle"
+        )
+        parser.add_argument("--idle-temperature",
+                            type=float,
+                            default=None,
+                            help="Temperature (in degree Celsius) below which a device is considered idle"
+        )
+
+        parser.add_argument("--telemetry-interval",
+                            type=float,
+                            default=None,
+                            help="Interval in seconds to record device utilization, memory, power, clocks and temperature,"
+                                 " and the host's cpu utilization and memory use during a benchmark - 0 disables the telemetry"
+        )
+
+        parser.add_argument("--log-compression",
+                            default=None,
+                            choices=["gzip", "zstd"],
+                            help="Compress the stdout/stderr logs of the benchmarks"
+        )
+
         parser.add_argument("--output-base-dir",
                             default=None,
                             help="Define the base/root folder for benchmark outputs")
@@ -52,30 +130,86 @@ class RunParser(BaseParser):
     def execute(self, args, options):
         super().execute(args, options)
 
-        if args.gpu_count > 0:
-            si = SystemInfo()
-            if si.gpu_info.count < args.gpu_count:
-                print(f"There are less gpus available than requested: {si.gpu_info.count} vs. {args.gpu_count}")
+        gpu_counts = [args.gpu_count]
+        if args.gpu_counts:
+            try:
+                gpu_counts = sorted({int(x) for x in args.gpu_counts.split(",") if x.strip()})
+            except ValueError:
+                print(f"Invalid --gpu-counts '{args.gpu_counts}': expected a comma-separated list of integers")
+                return
+
+            if not gpu_counts or gpu_counts[0] < 1:
+                print(f"Invalid --gpu-counts '{args.gpu_counts}': gpu counts must be > 0")
+                return
+
+        if args.repeat < 1 or args.warmup_runs < 0:
+            print(f"Invalid --repeat {args.repeat} / --warmup-runs {args.warmup_runs}: requires at least one measured run")
+            return
+
+        if args.parallel and not args.device_type:
+            print("Parallel execution requires --device-type, in order to assign the devices to the benchmarks")
+            return
+
+        max_gpu_count = max(gpu_counts)
+
+        devices = None
+        if max_gpu_count > 0:
+            inventory = HardwareInventory.get_instance()
+            if inventory.gpu_count < max_gpu_count:
+                print(f"There are less gpus available than requested: {inventory.gpu_count} vs. {max_gpu_count}")
                 return
 
+            if args.parallel:
+                devices = available_devices(device_type=args.device_type, device_count=inventory.gpu_count)
+        elif args.parallel:
+            print("Parallel execution requires --gpu-count > 0")
+            return
+
         config = Config.initialize()
+        if args.log_compression:
+            config.log_compression = args.log_compression
+
+        if args.telemetry_interval is not None:
+            config.telemetry_interval_in_s = args.telemetry_interval
+
+        if args.idle_utilization is not None:
+            config.idle_thresholds.utilization = args.idle_utilization
+        if args.idle_memory is not None:
+            config.idle_thresholds.memory_used_in_mb = args.idle_memory
+        if args.idle_temperature is not None:
+            config.idle_thresholds.temperature = args.idle_temperature
 
+        base_dir = config.output_base_dir
         if args.output_base_dir:
-            config.output_base_dir = Path(args.output_base_dir).resolve()
-            config.output_base_dir = Config.output_base_dir / f"{args.framework}-gpus:{args.gpu_count}-node:{platform.node()}"
+            base_dir = Path(args.output_base_dir).resolve()
 
+        # the runner caches the catalog and the prepared venvs, so that it is reused for all gpu counts
         runner = BenchmarkRunner(
                 data_dir=args.data_dir,
                 benchmarks_dir=args.benchmarks_dir,
                 confd_dir=args.confd_dir
         )
 
-        reports = runner.execute_all(args.framework,
-                args.benchmark, args.variant,
-                device_type=args.device_type,
-                gpu_count=args.gpu_count,
-                recreate_venv=args.recreate_venv
-        )
+        sweep = args.gpu_counts is not None
+        reports = []
+        for gpu_count in gpu_counts:
+            if sweep or args.output_base_dir:
+                config.output_base_dir = base_dir / f"{args.framework}-gpus:{gpu_count}-node:{platform.node()}"
+
+            reports += runner.execute_all(args.framework,
+                    args.benchmark, args.variant,
+                    device_type=args.device_type,
+                    gpu_count=gpu_count,
+                    recreate_venv=args.recreate_venv,
+                    stop_after_samples=args.stop_after_samples,
+                    grace_period_in_s=args.grace_period,
+                    parallel=args.parallel,
+                    devices=devices,
+                    autotune=args.autotune,
+                    retune=args.retune,
+                    repeat=args.repeat,
+                    warmup_runs=args.warmup_runs
+            )
 
         if not reports:
             print("Apparently there was nothing to run. Available benchmarks are:")
@@ -83,3 +217,10 @@ class RunParser(BaseParser):
 
         for report in reports:
             print(report)
+
+        if sweep and reports:
+            scaling_report = ScalingReport.from_reports(reports)
+            base_dir.mkdir(parents=True, exist_ok=True)
+            scaling_report.save(base_dir / "scaling.yaml")
+            scaling_report.print()
+            print(f"Scaling report: {base_dir / 'scaling.yaml'}")
@@ -3,7 +3,7 @@ from rich import print
 import logging
 
 from naic_bench.cli.base import BaseParser
-from naic_bench.spec import BenchmarkSpec
+from naic_bench.catalog import BenchmarkCatalog
 from naic_bench.utils import find_confd
 
 import re
@@ -39,10 +39,11 @@ class ShowParser(BaseParser):
     def execute(self, args, options):
         super().execute(args, options)
 
-        benchmarks = BenchmarkSpec.all_as_list(
-                        confd_dir=find_confd(),
+        confd_dir = args.confd_dir if args.confd_dir else find_confd()
+        benchmarks = BenchmarkCatalog.get_instance(
+                        confd_dir=confd_dir,
                         data_dir=args.data_dir
-                    )
+                    ).as_list()
 
         if not args.benchmark:
             benchmarks_pattern = [".*"]
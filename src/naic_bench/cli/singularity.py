@@ -5,7 +5,7 @@ import logging
 from logging import getLogger
 
 from naic_bench.cli.base import BaseParser
-from naic_bench.singularity import Singularity
+from naic_bench.singularity import CONVERSION_METHODS, Singularity
 from naic_bench.utils import Command
 from naic_bench.settings import Config
 
@@ -23,6 +23,10 @@ class SingularityParser(BaseParser):
         parser.add_argument("--rebuild-singularity", action="store_true", default=False,
                 help="Rebuild only the singularity image from the existing docker")
 
+        parser.add_argument("--update", action="store_true", default=False,
+                help="Rebuild the docker image (and convert it again) if the main branch of naic-bench has a newer commit"
+                     " than the one installed in the image")
+
         parser.add_argument("--build-only", action="store_true", default=False,
                 help="Build only the singularity (*.sif) image")
         parser.add_argument("--restart", action="store_true", default=False,
@@ -54,6 +58,18 @@ class SingularityParser(BaseParser):
             type=str,
             default=None
         )
+        parser.add_argument("--conversion",
+            help="Convert the docker image by streaming it from the docker daemon, or via an OCI layout"
+                 " in the scratch directory (requires skopeo), default is 'docker-daemon'",
+            choices=CONVERSION_METHODS,
+            default="docker-daemon"
+        )
+        parser.add_argument("--scratch-dir",
+            help="Node-local directory for temporary data of the conversion, default is the system's temp directory",
+            required=False,
+            type=str,
+            default=None
+        )
         parser.add_argument("--data-dir", type=str, default=None)
 
 
@@ -76,6 +92,8 @@ class SingularityParser(BaseParser):
         config = Config.get_instance()
         if args.sif_image_dir:
             config.sif.image_dir = args.sif_image_dir
+        if args.scratch_dir:
+            config.sif.scratch_dir = args.scratch_dir
 
         print("Using singularity:")
         print(f"    image dir: {config.sif.image_dir}")
@@ -90,5 +108,7 @@ class SingularityParser(BaseParser):
              rebuild_singularity=rebuild_singularity,
              rebuild_docker=rebuild_docker,
              restart=args.restart,
-             build_only=args.build_only
+             build_only=args.build_only,
+             method=args.conversion,
+             update_docker=args.update
         )
@@ -0,0 +1,163 @@
+from rich import print as print
+from argparse import ArgumentParser
+import logging
+from pathlib import Path
+
+from naic_bench.catalog import BenchmarkCatalog
+from naic_bench.cli.base import BaseParser
+from naic_bench.slurm import RuntimeHistory, SlurmSubmitter, format_time_limit
+from naic_bench.settings import Config
+from naic_bench.utils import find_confd
+
+logger = logging.getLogger(__name__)
+
+
+class SlurmParser(BaseParser):
+    def __init__(self, parser: ArgumentParser):
+        super().__init__(parser=parser)
+
+        parser.add_argument("action",
+                            choices=["submit", "status"],
+                            help="'submit' generates and submits the jobs, 'status' shows the state of the submitted jobs"
+        )
+
+        parser.add_argument("--nodes",
+                nargs="+",
+                type=str,
+                default=[],
+                help="Nodes to benchmark - one job per node"
+        )
+        parser.add_argument("--partitions",
+                nargs="+",
+                type=str,
+                default=[],
+                help="Partitions to benchmark - one job per partition"
+        )
+
+        parser.add_argument("--data-dir", default=None, type=str,
+                help="Data directory as seen from the compute nodes")
+        parser.add_argument("--benchmarks-dir", default=None, type=str,
+                help="Benchmarks directory as seen from the compute nodes")
+        parser.add_argument("--confd-dir", default=None, type=str)
+        parser.add_argument("--output-base-dir",
+                            default=None,
+                            help="Base folder for the benchmark outputs, default is the configured output_base_dir")
+
+        parser.add_argument("--framework", default="pytorch", type=str)
+        parser.add_argument("--benchmark",
+            nargs="+",
+            default=None,
+            type=str
+        )
+        parser.add_argument("--variant",
+            nargs="+",
+            default=None,
+            type=str
+        )
+        parser.add_argument("--device-type",
+                            default="cuda",
+                            help="Device type required: select from 'cpu','cuda','xpu','hpu'",
+                            type=str)
+        parser.add_argument("--gpu-count", type=int, default=1)
+        parser.add_argument("--repeat", type=int, default=1,
+                            help="Number of measured runs per benchmark, see 'naic-bench run --repeat'")
+
+        parser.add_argument("--account", type=str, default=None)
+        parser.add_argument("--array",
+                            action="store_true",
+                            default=False,
+                            help="Submit a job array per node or partition, with one task per benchmark variant"
+        )
+        parser.add_argument("--prolog",
+                            nargs="+",
+                            type=str,
+                            default=[],
+                            help="Commands to run before the benchmarks, e.g., 'source venv/bin/activate'"
+        )
+        parser.add_argument("--history-dir",
+                            type=str,
+                            default=None,
+                            help="Results directory to estimate the runtimes from, default is --output-base-dir"
+        )
+
+        parser.add_argument("--scripts-dir",
+                            type=str,
+                            default="naic-bench-slurm",
+                            help="Directory for the generated job scripts, the job logs and the record of the submissions"
+        )
+        parser.add_argument("--dry-run",
+                            action="store_true",
+                            default=False,
+                            help="Only generate the job scripts"
+        )
+
+    def execute(self, args, options):
+        super().execute(args, options)
+
+        submitter = SlurmSubmitter(scripts_dir=args.scripts_dir)
+        if args.action == "status":
+            submissions = submitter.submissions()
+            states = SlurmSubmitter.status([x.job_id for x in submissions])
+            for job in submissions:
+                tasks = {k: v for k, v in states.items() if k == job.job_id or k.startswith(f"{job.job_id}_")}
+                state = ", ".join(v if k == job.job_id else f"{k}: {v}" for k, v in tasks.items()) if tasks else "finished"
+                print(f"{job.job_id} {job.name}: {state}")
+            return
+
+        if not args.data_dir or not args.benchmarks_dir:
+            print("Submitting jobs requires --data-dir and --benchmarks-dir")
+            return
+
+        if args.repeat < 1:
+            print(f"Invalid --repeat {args.repeat}: requires at least one measured run")
+            return
+
+        confd_dir = args.confd_dir if args.confd_dir else find_confd()
+        selection = []
+        for framework, name, variant, _ in BenchmarkCatalog.get_instance(confd_dir=confd_dir, data_dir=args.data_dir).as_list():
+            if framework != args.framework:
+                continue
+            if args.benchmark and name not in args.benchmark:
+                continue
+            if args.variant and variant not in args.variant:
+                continue
+            selection.append((name, variant))
+
+        output_base_dir = Path(args.output_base_dir).resolve() if args.output_base_dir else Config.initialize().output_base_dir
+        history = RuntimeHistory.load(args.history_dir or output_base_dir)
+
+        run_args = ["--framework", args.framework,
+                    "--data-dir", args.data_dir,
+                    "--benchmarks-dir", args.benchmarks_dir,
+                    "--device-type", args.device_type,
+                    "--gpu-count", str(args.gpu_count),
+                    "--output-base-dir", str(output_base_dir)]
+        if args.confd_dir:
+            run_args += ["--confd-dir", args.confd_dir]
+        if args.repeat > 1:
+            run_args += ["--repeat", str(args.repeat)]
+
+        # further arguments for 'naic-bench run' can be passed after '--'
+        if options and options[0] == "--":
+            options = options[1:]
+
+        jobs = submitter.plan(selection,
+                    nodes=args.nodes,
+                    partitions=args.partitions,
+                    gpu_count=args.gpu_count,
+                    history=history,
+                    repeat=args.repeat,
+                    array=args.array,
+                    account=args.account,
+                    run_args=run_args + options,
+                    prolog=args.prolog,
+                    log_dir=submitter.scripts_dir / "logs"
+        )
+
+        if args.dry_run:
+            for job in submitter.write(jobs):
+                print(f"{job.script}: {len(job.selection)} benchmark variant(s), time limit {format_time_limit(job.time_limit_in_s)}")
+            return
+
+        for job in submitter.submit(jobs):
+            print(f"Submitted {job.script} as job {job.job_id}")
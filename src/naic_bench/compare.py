@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable
+
+import yaml
+
+from naic_bench.export import COLUMNAR_FORMATS
+from naic_bench.results import ResultFilter, ResultsIndex
+from naic_bench.statistics import lower_is_better, t_quantile
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns which identify comparable results
+MATCH_KEYS = ["benchmark", "variant", "gpu_model", "gpu_count", "device_type"]
+
+# Status of a compared metric, regressions and failures make a comparison fail
+OK = "ok"
+IMPROVEMENT = "improvement"
+REGRESSION = "regression"
+FAILED = "failed"
+MISSING = "missing"
+NEW = "new"
+
+def load_results(source: Path | str, result_filter: ResultFilter | None = None) -> pd.DataFrame:
+    """
+    Load results as flat table (one row per result, with columns such as 'metrics.throughput')
+
+    :param source: a results directory (using its results index), or an export of 'naic-bench report'
+        as .json, .yaml, .parquet or .arrow
+    """
+    import pandas as pd
+
+    source = Path(source)
+    if source.is_dir():
+        with ResultsIndex(source) as index:
+            index.update(result_filter=result_filter)
+            return flat_frame(index.results(result_filter))
+
+    if source.suffix in COLUMNAR_FORMATS:
+        if COLUMNAR_FORMATS[source.suffix] == "parquet":
+            df = pd.read_parquet(source)
+        else:
+            df = pd.read_feather(source)
+    elif source.suffix == ".json":
+        with open(source, "r") as f:
+            df = flat_frame(json.load(f))
+    elif source.suffix == ".yaml":
+        with open(source, "r") as f:
+            df = flat_frame(yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)))
+    else:
+        raise ValueError(f"load_results: unknown format of {source} - expected a directory or one of"
+                         f" .json,.yaml,{','.join(COLUMNAR_FORMATS)}")
+
+    if result_filter:
+        for column, values in [("benchmark", result_filter.benchmarks),
+                               ("variant", result_filter.variants),
+                               ("device_type", result_filter.device_types)]:
+            if values and column in df:
+                df = df[df[column].isin(values)]
+    return df
+
+def flat_frame(results: Iterable[dict[str, Any]]) -> pd.DataFrame:
+    """
+    Flatten results the same way as the columnar export does (ignoring the system_info)
+    """
+    import pandas as pd
+
+    return pd.json_normalize([{k: v for k, v in x.items() if k != 'system_info'} for x in results])
+
+def metric_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Get one row per result and metric with the columns MATCH_KEYS, metric, mean, variance and count
+
+    The statistics of a report are used where available (samples within a run, or repeated runs), otherwise a metric
+    is a single sample. Failed runs are kept with count 0, so that they can be detected.
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = MATCH_KEYS + ["metric", "mean", "variance", "count"]
+    metrics = [x.removeprefix("metrics.") for x in df.columns if x.startswith("metrics.")]
+    if df.empty or not metrics:
+        return pd.DataFrame(columns=columns)
+
+    failed = df["exit_code"].fillna(0).to_numpy() != 0 if "exit_code" in df else np.zeros(len(df), dtype=bool)
+    missing = pd.Series(np.nan, index=df.index)
+
+    frames = []
+    for metric in metrics:
+        value = df[f"metrics.{metric}"].astype(float)
+        mean = df.get(f"statistics.{metric}.mean", missing).astype(float)
+        count = df.get(f"statistics.{metric}.count", missing).astype(float)
+        stddev = df.get(f"statistics.{metric}.stddev", missing).astype(float)
+
+        with_statistics = mean.notna().to_numpy() & (count.to_numpy() > 0)
+        frame = df[MATCH_KEYS].copy()
+        frame["metric"] = metric
+        frame["mean"] = np.where(with_statistics, mean, value)
+        frame["variance"] = np.where(with_statistics, stddev**2, np.nan)
+        frame["count"] = np.where(with_statistics, count, value.notna().astype(float))
+        frame.loc[failed, "count"] = 0
+        frames.append(frame)
+
+    metrics_df = pd.concat(frames, ignore_index=True)
+    metrics_df["gpu_model"] = metrics_df["gpu_model"].fillna("n/a")
+    return metrics_df[columns]
+
+def pooled(metrics_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pool all entries with the same MATCH_KEYS and metric, i.e., combine their means and variances
+    as if all their samples were in a single set
+    """
+    import numpy as np
+
+    df = metrics_df.copy()
+    valid = df["count"] > 0
+    df["count"] = df["count"].where(valid, 0.0)
+    df["sum"] = (df["count"] * df["mean"]).where(valid, 0.0)
+    df["sum_of_squares"] = ((df["count"] - 1).clip(lower=0) * df["variance"].fillna(0.0)
+                            + df["count"] * df["mean"]**2).where(valid, 0.0)
+    df["entries"] = 1
+
+    grouped = df.groupby(MATCH_KEYS + ["metric"], dropna=False)[["count", "sum", "sum_of_squares", "entries"]].sum().reset_index()
+
+    n = grouped["count"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        grouped["mean"] = np.where(n > 0, grouped["sum"] / n, np.nan)
+        variance = (grouped["sum_of_squares"] - n * grouped["mean"]**2) / (n - 1)
+    grouped["variance"] = np.where(n > 1, np.clip(variance, 0.0, None), np.nan)
+    return grouped.drop(columns=["sum", "sum_of_squares"])
+
+def compare(baseline: pd.DataFrame,
+            candidate: pd.DataFrame,
+            threshold: float = 0.05,
+            confidence: float = 0.95) -> pd.DataFrame:
+    """
+    Compare the candidate results against the baseline results, both as returned by load_results
+
+    A metric regresses if it changes for the worse by more than the relative threshold, and the change is
+    significant according to Welch's t-test - if either side has a single sample only, the threshold decides.
+
+    :return: one row per MATCH_KEYS and metric with the pooled mean, variance and count of baseline and candidate,
+        the relative change, the t-statistic and the status
+    """
+    import numpy as np
+
+    base = pooled(metric_frame(baseline))
+    cand = pooled(metric_frame(candidate))
+
+    df = base.merge(cand, on=MATCH_KEYS + ["metric"], how="outer", suffixes=("_baseline", ""), indicator=True)
+
+    mean_baseline = df["mean_baseline"].to_numpy(dtype=float)
+    mean = df["mean"].to_numpy(dtype=float)
+    n_baseline = df["count_baseline"].fillna(0).to_numpy(dtype=float)
+    n = df["count"].fillna(0).to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (mean - mean_baseline) / np.abs(mean_baseline)
+
+        # Welch's t-test
+        se2_baseline = df["variance_baseline"].to_numpy(dtype=float) / n_baseline
+        se2 = df["variance"].to_numpy(dtype=float) / n
+        se2_total = se2_baseline + se2
+        t = (mean - mean_baseline) / np.sqrt(se2_total)
+        dof = se2_total**2 / (se2_baseline**2 / (n_baseline - 1) + se2**2 / (n - 1))
+
+    testable = (n_baseline > 1) & (n > 1) & np.isfinite(se2_total)
+    # conservative: critical value for the next lower integral degrees of freedom (dof is undefined without variance)
+    dof = np.where(testable, np.nan_to_num(dof, nan=1.0, posinf=1.0), 1.0)
+    dof = np.maximum(np.floor(dof), 1).astype(int)
+    critical = {x: t_quantile(0.5 + confidence/2, df=int(x)) for x in np.unique(dof[testable])}
+    t_critical = np.array([critical.get(x, np.nan) for x in dof])
+    with np.errstate(invalid="ignore"):
+        significant = np.where(testable, np.abs(t) > t_critical, True)
+
+    worse = np.array([lower_is_better(x) for x in df["metric"]])
+    signed_change = np.where(worse, -change, change)
+
+    status = np.full(len(df), OK, dtype=object)
+    status[significant & (signed_change > threshold)] = IMPROVEMENT
+    status[significant & (signed_change < -threshold)] = REGRESSION
+
+    both = (df["_merge"] == "both").to_numpy()
+    status[both & (n_baseline > 0) & (n == 0)] = FAILED
+    status[(df["_merge"] == "left_only").to_numpy()] = MISSING
+    status[(df["_merge"] == "right_only").to_numpy() | (both & (n_baseline == 0) & (n > 0))] = NEW
+
+    df["change"] = change
+    df["t"] = np.where(testable, t, np.nan)
+    df["t_critical"] = t_critical
+    df["status"] = status
+    return df.drop(columns=["_merge"]).sort_values(MATCH_KEYS + ["metric"]).reset_index(drop=True)
+
+def print_comparison(df: pd.DataFrame, show_all: bool = False, console=None):
+    from rich.console import Console
+    from rich.table import Table
+
+    rows = df if show_all else df[df["status"] != OK]
+    table = Table(title="Comparison against baseline")
+    for column in ["benchmark", "variant", "gpu model", "gpus", "device type", "metric",
+                   "baseline", "value", "change", "samples", "status"]:
+        table.add_column(column)
+
+    def fmt(value: float, pattern: str) -> str:
+        return "n/a" if value is None or value != value else pattern.format(value)
+
+    styles = {REGRESSION: "red", FAILED: "red", IMPROVEMENT: "green", MISSING: "yellow"}
+    for x in rows.itertuples(index=False):
+        table.add_row(str(x.benchmark),
+                      str(x.variant),
+                      str(x.gpu_model),
+                      str(x.gpu_count),
+                      str(x.device_type),
+                      str(x.metric),
+                      fmt(x.mean_baseline, "{:.2f}"),
+                      fmt(x.mean, "{:.2f}"),
+                      fmt(x.change, "{:+.1%}"),
+                      f"{fmt(x.count_baseline, '{:.0f}')}/{fmt(x.count, '{:.0f}')}",
+                      f"[{styles[x.status]}]{x.status}[/]" if x.status in styles else x.status)
+
+    if console is None:
+        console = Console()
+    if len(rows):
+        console.print(table)
+
+    counts = df["status"].value_counts()
+    console.print(", ".join(f"{status}: {counts.get(status, 0)}" for status in [OK, IMPROVEMENT, REGRESSION, FAILED, MISSING, NEW]))
@@ -1,6 +1,6 @@
 from rich import print as print
-from docker import from_env
-from docker.errors import APIError, NotFound
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import logging
 from logging import getLogger
 
@@ -11,6 +11,8 @@ import re
 import subprocess
 import sys
 
+from naic_bench.hardware import HardwareInventory
+from naic_bench.repository import git
 from naic_bench.utils.command import Command
 import naic_bench.utils.gpus as gpus
 from naic_bench.settings import Config
@@ -46,8 +48,42 @@ DOCKER_DEVICE_TYPE_ARGS = {
     ]
 }
 
+# Label of an image which holds the hash of its Dockerfile, build context and build args
+CONTEXT_HASH_LABEL = "naic-bench.context-hash"
+
+# Label of an image which holds the commit of naic-bench that is installed in it
+NAIC_BENCH_COMMIT_LABEL = "naic-bench.commit"
+
+# Name of the buildx builder, which keeps the BuildKit cache
+BUILDX_BUILDER = "naic-bench"
+
+NAIC_BENCH_REPOSITORY = "https://github.com/2maz/naic-bench"
+
+def context_hash(dockerfile: Path | str, build_args: dict[str, str] = {}) -> str:
+    """
+    Hash the Dockerfile, its build context (the Dockerfile's directory, without the other Dockerfiles)
+    and the build arguments
+    """
+    dockerfile = Path(dockerfile).resolve()
+    context_dir = dockerfile.parent
+
+    sha256 = hashlib.sha256()
+    for path in sorted(x for x in context_dir.rglob("*") if x.is_file()):
+        if path.name.startswith("Dockerfile") and path != dockerfile:
+            continue
+
+        sha256.update(str(path.relative_to(context_dir)).encode("UTF-8") + b"\0")
+        sha256.update(path.read_bytes() + b"\0")
+
+    for name, value in sorted(build_args.items()):
+        sha256.update(f"{name}={value}".encode("UTF-8") + b"\0")
+    return sha256.hexdigest()
+
 class Docker:
     def __init__(self):
+        # the docker SDK is slow to import, so it is only loaded once a client is needed
+        from docker import from_env
+
         self.client = from_env()
 
     @classmethod
@@ -91,7 +127,7 @@ class Docker:
                 if 'nvidia' in cls.runtimes():
                     docker_args += ["--runtime", "nvidia"]
                 else:
-                    uuids = gpus.Nvidia.device_uuids_nvidia()
+                    uuids = HardwareInventory.get_instance().uuids
                     device_list = f"device={','.join(uuids)}"
                     docker_args += ["--gpus", f'"{device_list}"']
             elif device_type not in ["rocm", "xpu", "habana"]:
@@ -151,12 +187,182 @@ class Docker:
         return None
 
     def image(self, name: str):
-        for x in self.client.images.list(all=True):
-            for tag in x.tags:
-                if tag.startswith(name):
-                    return x
+        """
+        Retrieve image by name (and tag) or None if it does not exist
+        """
+        from docker.errors import ImageNotFound
 
-        return None
+        try:
+            return self.client.images.get(name)
+        except ImageNotFound:
+            return None
+
+    @classmethod
+    def naic_bench_commit(cls) -> str | None:
+        """
+        Get the current commit of naic-bench's main branch, which is installed in the images
+        """
+        try:
+            result = git("ls-remote", NAIC_BENCH_REPOSITORY, "refs/heads/main")
+        except Exception as e:
+            logger.warning(f"Docker.naic_bench_commit: failed to resolve the commit of {NAIC_BENCH_REPOSITORY} -- {e}")
+            return None
+
+        return result.stdout.split()[0] if result.stdout.strip() else None
+
+    @classmethod
+    def buildx_available(cls) -> bool:
+        try:
+            Command.run(["docker", "buildx", "version"])
+            return True
+        except Exception:
+            return False
+
+    @classmethod
+    def ensure_builder(cls):
+        """
+        Create the buildx builder (using the docker-container driver, which supports a local cache) if it does not exist
+        """
+        try:
+            Command.run(["docker", "buildx", "inspect", BUILDX_BUILDER])
+        except RuntimeError:
+            logger.info(f"Docker.ensure_builder: creating buildx builder '{BUILDX_BUILDER}'")
+            Command.run(["docker", "buildx", "create", "--name", BUILDX_BUILDER, "--driver", "docker-container"])
+
+    @classmethod
+    def build_command(cls,
+            image_name: str,
+            dockerfile: Path,
+            content_hash: str,
+            build_args: dict[str, str] = {},
+            cache_dir: Path | None = None,
+            no_cache: bool = False) -> list[str]:
+        """
+        Get the build command - with a cache_dir, buildx is used with a persistent local cache,
+        otherwise docker build (with BuildKit) uses the cache of the docker daemon
+        """
+        if cache_dir:
+            cmd = ["docker", "buildx", "build", "--builder", BUILDX_BUILDER, "--load",
+                   "--cache-from", f"type=local,src={cache_dir}",
+                   "--cache-to", f"type=local,dest={cache_dir},mode=max"]
+        else:
+            cmd = ["docker", "build"]
+
+        if no_cache:
+            cmd += ["--no-cache"]
+
+        cmd += ["-t", image_name, "-f", str(dockerfile), "--label", f"{CONTEXT_HASH_LABEL}={content_hash}"]
+        if "NAIC_BENCH_COMMIT" in build_args:
+            cmd += ["--label", f"{NAIC_BENCH_COMMIT_LABEL}={build_args['NAIC_BENCH_COMMIT']}"]
+        for name, value in sorted(build_args.items()):
+            cmd += ["--build-arg", f"{name}={value}"]
+        cmd += [str(dockerfile.parent)]
+        return cmd
+
+    def build(self,
+            device_type: str,
+            image_name: str | None = None,
+            force: bool = False,
+            no_cache: bool = False,
+            update: bool = False,
+            echo: bool = True) -> bool:
+        """
+        Build the image for the device type, unless an image with the same context hash exists already
+
+        The commit of naic-bench that is installed in an existing image is kept, i.e., the latest commit of
+        naic-bench is only resolved (via the network) when the image is missing, rebuilt (force) or updated.
+
+        :param force: build even if the image is up to date (reusing cached layers, unless no_cache is set)
+        :param update: build if the latest commit of naic-bench differs from the one installed in the image
+        :return: True if the image has been built, False if it was up to date
+        """
+        if image_name is None:
+            image_name = self.image_name(device_type=device_type)
+
+        dockerfile = self.dockerfile(device_type=device_type)
+        if not dockerfile.exists():
+            raise RuntimeError(f"Dockerfile {dockerfile} not found")
+
+        image = self.image(image_name)
+
+        build_args = {}
+        commit = None if image is None else image.labels.get(NAIC_BENCH_COMMIT_LABEL)
+        if image is None or force or update:
+            # e.g. offline: stay with the commit that is installed in the existing image
+            commit = self.naic_bench_commit() or commit
+
+        if commit:
+            build_args["NAIC_BENCH_COMMIT"] = commit
+
+        content_hash = context_hash(dockerfile, build_args=build_args)
+        if image is not None and not force and not no_cache:
+            if image.labels.get(CONTEXT_HASH_LABEL) == content_hash:
+                logger.info(f"Docker.build: image '{image_name}' is up to date ({content_hash[:12]})")
+                return False
+            logger.info(f"Docker.build: image '{image_name}' is outdated - rebuilding")
+
+        Command.find(command="docker", do_throw=True)
+
+        config = Config.initialize()
+        cache_dir = None
+        if self.buildx_available():
+            self.ensure_builder()
+            cache_dir = config.build_cache_dir or (config.cache_dir / "buildkit")
+            cache_dir = cache_dir / f"{device_type}-{platform.machine()}"
+            cache_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            logger.warning("Docker.build: buildx is not available - using the build cache of the docker daemon")
+
+        cmd = self.build_command(image_name=image_name,
+                                 dockerfile=dockerfile,
+                                 content_hash=content_hash,
+                                 build_args=build_args,
+                                 cache_dir=cache_dir,
+                                 no_cache=no_cache)
+
+        log_dir = config.cache_dir / "logs"
+        log_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Docker.build: building '{image_name}' from {dockerfile} (log: {log_dir}/build-{device_type}.log)")
+        Command.run_with_progress(cmd,
+                                  env={"DOCKER_BUILDKIT": "1"},
+                                  echo=echo,
+                                  stdout_log=log_dir / f"build-{device_type}.log",
+                                  stderr_log=log_dir / f"build-{device_type}.stderr.log")
+        return True
+
+    @classmethod
+    def build_all(cls,
+            device_types: list[str],
+            jobs: int | None = None,
+            force: bool = False,
+            no_cache: bool = False,
+            update: bool = False) -> dict[str, bool]:
+        """
+        Build the images for multiple device types in parallel
+
+        :return: for each device type, whether its image has been built
+        """
+        if jobs is None:
+            jobs = len(device_types)
+
+        docker = Docker()
+        echo = jobs <= 1
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = {x: executor.submit(docker.build, device_type=x, force=force, no_cache=no_cache, update=update, echo=echo)
+                       for x in device_types}
+
+        built = {}
+        failed = {}
+        for device_type, future in futures.items():
+            try:
+                built[device_type] = future.result()
+            except Exception as e:
+                failed[device_type] = e
+
+        if failed:
+            raise RuntimeError(f"Docker.build_all: building the images failed for {','.join(failed)} --"
+                               + "; ".join(f"{x}: {e}" for x, e in failed.items()))
+        return built
 
     @classmethod
     def container_uuid(cls, name: str) -> str | None:
@@ -191,7 +397,9 @@ class Docker:
             restart: bool,
             container_name: str,
             exec_args: list[str],
-            device_type: str | None = None
+            device_type: str | None = None,
+            no_cache: bool = False,
+            update: bool = False
     ):
 
         device_type_auto = cls.autodetect_device_type()
@@ -204,25 +412,21 @@ class Docker:
 
         image_name = Docker.image_name(device_type=device_type)
 
-        dockerfile = Docker.dockerfile(device_type=device_type)
-        if not dockerfile:
-            raise RuntimeError(f"Dockerfile {dockerfile} not found")
-
-        build = False
         start = False
 
         docker = Docker()
-        image = docker.image(image_name)
 
         if container_name is None:
             container_name = f"naic-bench-{device_type}"
 
+        # the image is only built if it is missing or the Dockerfile or its context changed (or on rebuild and update)
+        built = docker.build(device_type=device_type, image_name=image_name, force=rebuild, no_cache=no_cache, update=update)
+
+        from docker.errors import APIError, NotFound
+
         container = docker.container(container_name)
 
-        if not image:
-            build = True
-            start = True
-        elif not container:
+        if not container:
             start = True
         elif rebuild:
             logger.info(f"docker: rebuild requested - stopping and removing container '{container.name}'")
@@ -231,7 +435,6 @@ class Docker:
                 container.remove()
             except (NotFound, APIError):
                 pass
-            build = True
             start = True
         elif restart:
             logger.info(f"docker: restart requested - stopping and removing container '{container.name}'")
@@ -243,6 +446,8 @@ class Docker:
             start = True
         elif container.status == "running":
             print(f"Docker container '{container_name}' exists - reusing")
+            if built:
+                print(f"Docker container '{container_name}' uses an outdated image - call with --restart to update it")
         elif not container.status == "running":
             print(f"Container {container_name} exists - but status={container.status}")
             print(f"Please remove the container first: docker rm {container_name} or call with --restart")
@@ -250,9 +455,6 @@ class Docker:
 
         Command.find(command="docker", do_throw=True)
 
-        if build:
-            Command.run_with_progress(["docker", "build", "--no-cache", "-t", image_name, "-f", str(dockerfile), dockerfile.parent])
-
         if start:
             # start the container with the correct mounted volumes
             docker_run = ["docker", "run", "-d", "--name", container_name]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Number of results per row group (Parquet) or record batch (Arrow IPC)
+EXPORT_ROW_GROUP_SIZE = 1024
+
+COLUMNAR_FORMATS = {
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow"
+}
+
+def flatten(data: dict[str, Any], prefix: str = "", separator: str = ".") -> dict[str, Any]:
+    """
+    Flatten nested dictionaries, e.g., {'metrics': {'throughput': 1.0}} to {'metrics.throughput': 1.0} -
+    lists are serialized as JSON
+    """
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix=f"{name}{separator}", separator=separator))
+        elif isinstance(value, (list, tuple)):
+            flat[name] = json.dumps(value, default=str)
+        else:
+            flat[name] = value
+    return flat
+
+def arrow_type(python_types: set[type]):
+    import pyarrow as pa
+
+    python_types = python_types - {type(None)}
+    if not python_types:
+        return pa.string()
+    if python_types == {bool}:
+        return pa.bool_()
+    if python_types == {int}:
+        return pa.int64()
+    if python_types <= {int, float}:
+        return pa.float64()
+    return pa.string()
+
+def infer_schema(rows: Iterable[dict[str, Any]]):
+    """
+    Get the schema for all (flattened) rows, i.e., the union of all columns
+    """
+    import pyarrow as pa
+
+    column_types: dict[str, set[type]] = {}
+    for row in rows:
+        for name, value in row.items():
+            column_types.setdefault(name, set()).add(type(value))
+
+    return pa.schema([(name, arrow_type(column_types[name])) for name in sorted(column_types)])
+
+def conform(row: dict[str, Any], schema) -> dict[str, Any]:
+    import pyarrow as pa
+
+    conformed = {}
+    for field in schema:
+        value = row.get(field.name)
+        if value is not None and field.type == pa.string() and not isinstance(value, str):
+            value = str(value)
+        conformed[field.name] = value
+    return conformed
+
+def batches(rows: Iterator[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def export_columnar(filename: Path | str,
+                    results: Callable[[], Iterator[dict[str, Any]]],
+                    row_group_size: int = EXPORT_ROW_GROUP_SIZE) -> int:
+    """
+    Export the results with flattened metrics and system_info columns as Parquet (.parquet) or Arrow IPC (.arrow, .feather)
+
+    The results are streamed twice - first to collect the schema, then to write one row group at a time,
+    so that memory use does not depend on the number of results.
+
+    :param results: function which returns a new iterator over the results
+    :return: number of exported results
+    """
+    filename = Path(filename)
+    if filename.suffix not in COLUMNAR_FORMATS:
+        raise ValueError(f"export_columnar: unknown format of {filename} - select from {','.join(COLUMNAR_FORMATS)}")
+
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(f"export_columnar: exporting {filename} requires 'pyarrow' - please install naic-bench[parquet]")
+
+    schema = infer_schema(flatten(x) for x in results())
+
+    if COLUMNAR_FORMATS[filename.suffix] == "parquet":
+        writer = pa.parquet.ParquetWriter(filename, schema)
+    else:
+        writer = pa.ipc.new_file(filename, schema)
+
+    count = 0
+    with writer:
+        for batch in batches((flatten(x) for x in results()), size=row_group_size):
+            table = pa.Table.from_pylist([conform(x, schema) for x in batch], schema=schema)
+            writer.write_table(table)
+            count += len(batch)
+
+    logger.info(f"export_columnar: exported {count} results to {filename}")
+    return count
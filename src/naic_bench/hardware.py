@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import logging
+import os
+import platform
+import threading
+from pathlib import Path
+from typing import Any, ClassVar
+
+import yaml
+from pydantic import BaseModel, Field, PrivateAttr
+
+from naic_bench.utils import CustomSafeLoader
+from naic_bench.utils.gpus import Nvidia
+
+logger = logging.getLogger(__name__)
+
+class HardwareInventory(BaseModel):
+    """
+    Hardware facts of the current node, which are probed only once per process
+    """
+    node: str
+    framework: str | None = Field(default=None, description="GPU framework, e.g., 'cuda', 'rocm', 'habana', 'xpu'")
+    gpu_model: str | None = Field(default=None)
+    gpu_count: int = Field(default=0)
+    gpu_memory_in_gb: int = Field(default=0, description="Memory of a single device")
+    architecture: str | None = Field(default=None)
+    uuids: list[str] = Field(default=[])
+    cpu_count: int
+
+    # system information as provided by slurm-monitor
+    _system_info: dict[str, Any] = PrivateAttr(default={})
+
+    _instance: ClassVar[HardwareInventory | None] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> HardwareInventory:
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls.probe()
+            return cls._instance
+
+    @classmethod
+    def set_instance(cls, inventory: HardwareInventory | None):
+        """
+        Set the inventory, e.g., loaded from a file, or reset it with None
+        """
+        with cls._lock:
+            cls._instance = inventory
+
+    @classmethod
+    def probe(cls) -> HardwareInventory:
+        from slurm_monitor.utils.system_info import SystemInfo
+        from slurm_monitor.devices.gpu import GPUInfo
+
+        si = SystemInfo()
+
+        framework = None
+        if si.gpu_info.framework is not None:
+            if si.gpu_info.framework == GPUInfo.Framework.CUDA:
+                framework = "cuda"
+            else:
+                framework = si.gpu_info.framework.value
+
+        inventory = HardwareInventory(
+                node=platform.node(),
+                framework=framework,
+                gpu_model=si.gpu_info.model,
+                gpu_count=si.gpu_info.count,
+                gpu_memory_in_gb=int((si.gpu_info.memory_total or 0) / 1024**3),
+                cpu_count=os.cpu_count()
+        )
+
+        if framework == "cuda":
+            properties = Nvidia.device_properties()
+            inventory.uuids = [x.uuid for x in properties if x.uuid]
+            inventory.architecture = next((x.architecture for x in properties if x.architecture), None)
+
+        inventory._system_info = dict(si)
+        logger.debug(f"HardwareInventory.probe: {inventory}")
+        return inventory
+
+    @property
+    def device_memory_in_gb(self) -> int:
+        """
+        Memory of a single device, which can be overridden by the environment variable GPU_SIZE_IN_GB
+        """
+        if "GPU_SIZE_IN_GB" in os.environ:
+            return int(os.environ["GPU_SIZE_IN_GB"])
+        return self.gpu_memory_in_gb
+
+    def system_info(self) -> dict[str, Any]:
+        """
+        Get the full system information, including the inventory
+        """
+        data = dict(self._system_info)
+        data['inventory'] = self.model_dump()
+        return data
+
+    def save(self, filename: Path | str, software: dict[str, str] | None = None):
+        """
+        Serialize as system_info.yaml
+        """
+        data = self.system_info()
+        if software:
+            data['software'] = software
+
+        with open(filename, "w") as f:
+            yaml.dump(data, f)
+
+    @classmethod
+    def load(cls, filename: Path | str) -> HardwareInventory:
+        with open(filename, "r") as f:
+            data = yaml.load(f, Loader=CustomSafeLoader)
+
+        inventory = HardwareInventory(**data['inventory'])
+        inventory._system_info = {k: v for k, v in data.items() if k not in ['inventory', 'software']}
+        return inventory
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import yaml
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+# Block size for reading files when hashing - large blocks keep the overhead per call low
+HASH_BLOCK_SIZE = 8*1024**2
+
+# Manifests and checksum cache (relative to the data directory)
+MANIFEST_DIR = Path(".naic-bench") / "manifests"
+CHECKSUM_CACHE_FILE = Path(".naic-bench") / "checksums.sqlite"
+
+def sha256sum(path: Path | str, block_size: int = HASH_BLOCK_SIZE) -> str:
+    """
+    Compute the sha256 of a file - reusing a single buffer, since hashlib releases the GIL for large blocks
+    """
+    sha = hashlib.sha256()
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            sha.update(view[:n])
+    return sha.hexdigest()
+
+class FileStat(BaseModel):
+    size: int
+    mtime_ns: int
+
+class ChecksumCache:
+    """
+    Checksums of files by (path, size, mtime), so that only new or modified files have to be hashed
+    """
+    filename: Path
+
+    def __init__(self, filename: Path | str):
+        self.filename = Path(filename)
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.filename, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS checksums ("
+                                 " path TEXT PRIMARY KEY,"
+                                 " size INTEGER NOT NULL,"
+                                 " mtime_ns INTEGER NOT NULL,"
+                                 " sha256 TEXT NOT NULL)")
+        self._connection.commit()
+
+    def get(self, path: str, stat: FileStat) -> str | None:
+        with self._lock:
+            row = self._connection.execute("SELECT size, mtime_ns, sha256 FROM checksums WHERE path = ?", (path,)).fetchone()
+
+        if row and row[0] == stat.size and row[1] == stat.mtime_ns:
+            return row[2]
+        return None
+
+    def put(self, checksums: dict[str, tuple[FileStat, str]]):
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO checksums (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                                         [(path, stat.size, stat.mtime_ns, sha256) for path, (stat, sha256) in checksums.items()])
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+class ManifestEntry(BaseModel):
+    size: int
+    sha256: str
+
+class Manifest(BaseModel):
+    """
+    Sizes and checksums of all files (relative to the data directory) which a benchmark requires
+    """
+    benchmark: str
+    data_paths: list[str]
+    files: dict[str, ManifestEntry] = Field(default={})
+    created: dt.datetime = Field(default_factory=lambda: dt.datetime.now(tz=dt.timezone.utc))
+
+    def save(self, filename: Path | str):
+        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        with open(filename, "w") as f:
+            yaml.dump(self.model_dump(mode="json"), f)
+
+    @classmethod
+    def load(cls, filename: Path | str) -> Manifest:
+        with open(filename, "r") as f:
+            return Manifest(**yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)))
+
+class VerificationResult(BaseModel):
+    benchmark: str
+    missing: list[str] = Field(default=[])
+    size_mismatch: list[str] = Field(default=[])
+    checksum_mismatch: list[str] = Field(default=[])
+    unexpected: list[str] = Field(default=[], description="Files which are not listed in the manifest")
+    unverified: bool = Field(default=False, description="The data could not be checked, since there is no manifest (or it lists no files)")
+
+    @property
+    def ok(self) -> bool:
+        return not (self.unverified or self.missing or self.size_mismatch or self.checksum_mismatch)
+
+    def __str__(self):
+        if self.unverified:
+            return f"{self.benchmark}: unverified (no manifest, or no files in the manifest)"
+
+        if self.ok:
+            return f"{self.benchmark}: ok"
+
+        details = []
+        for name in ["missing", "size_mismatch", "checksum_mismatch"]:
+            files = getattr(self, name)
+            if files:
+                details.append(f"{name}: {', '.join(files[:5])}{' ...' if len(files) > 5 else ''}")
+        return f"{self.benchmark}: {'; '.join(details)}"
+
+class DataVerifier:
+    """
+    Create and check the manifests of the data required by benchmarks
+    """
+    data_dir: Path
+    workers: int
+
+    def __init__(self, data_dir: Path | str, workers: int | None = None):
+        self.data_dir = Path(data_dir).resolve()
+        self.workers = workers or min(32, os.cpu_count() or 1)
+        self.checksum_cache = ChecksumCache(self.data_dir / CHECKSUM_CACHE_FILE)
+
+    def manifest_file(self, benchmark: str) -> Path:
+        return self.data_dir / MANIFEST_DIR / f"{benchmark.replace('/', '_')}.yaml"
+
+    def scan(self, data_paths: list[str]) -> dict[str, FileStat]:
+        """
+        Get all files below the given data paths
+        """
+        files = {}
+        for data_path in data_paths:
+            path = self.data_dir / data_path
+            if path.is_file():
+                candidates = [path]
+            else:
+                candidates = (x for x in path.rglob("*") if x.is_file())
+
+            for candidate in candidates:
+                stat = candidate.stat()
+                files[str(candidate.relative_to(self.data_dir))] = FileStat(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        return files
+
+    def checksums(self, files: dict[str, FileStat]) -> dict[str, str]:
+        """
+        Compute the checksums of the files in parallel - using the cache for unchanged files
+        """
+        checksums = {}
+        pending = []
+        for path, stat in files.items():
+            sha256 = self.checksum_cache.get(path, stat)
+            if sha256 is None:
+                pending.append(path)
+            else:
+                checksums[path] = sha256
+
+        if pending:
+            logger.info(f"DataVerifier.checksums: hashing {len(pending)} of {len(files)} files ({self.workers} workers)")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                computed = dict(zip(pending, executor.map(lambda x: sha256sum(self.data_dir / x), pending)))
+
+            self.checksum_cache.put({path: (files[path], sha256) for path, sha256 in computed.items()})
+            checksums.update(computed)
+        return checksums
+
+    def create_manifest(self, benchmark: str, data_paths: list[str]) -> Manifest | None:
+        """
+        Create and save the manifest of the data paths
+
+        :return: the manifest, or None if there are no files below the data paths, e.g., since the data has not been prepared
+        """
+        files = self.scan(data_paths)
+        if not files:
+            logger.warning(f"DataVerifier.create_manifest: no files found for {benchmark} in {data_paths} - skipping the manifest")
+            return None
+
+        checksums = self.checksums(files)
+
+        manifest = Manifest(benchmark=benchmark,
+                            data_paths=data_paths,
+                            files={path: ManifestEntry(size=stat.size, sha256=checksums[path])
+                                   for path, stat in sorted(files.items())})
+        manifest.save(self.manifest_file(benchmark))
+        return manifest
+
+    def verify(self, manifest: Manifest) -> VerificationResult:
+        if not manifest.files:
+            # e.g. created before the data had been prepared, so there is nothing to check against
+            return VerificationResult(benchmark=manifest.benchmark, unverified=True)
+
+        result = VerificationResult(benchmark=manifest.benchmark)
+        files = self.scan(manifest.data_paths)
+
+        candidates = {}
+        for path, entry in manifest.files.items():
+            if path not in files:
+                result.missing.append(path)
+            elif files[path].size != entry.size:
+                # no need to hash a truncated file
+                result.size_mismatch.append(path)
+            else:
+                candidates[path] = files[path]
+
+        checksums = self.checksums(candidates)
+        result.checksum_mismatch = [path for path, sha256 in checksums.items() if manifest.files[path].sha256 != sha256]
+        result.unexpected = sorted(set(files) - set(manifest.files))
+        return result
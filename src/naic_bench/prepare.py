@@ -1,11 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import datetime as dt
+from functools import cached_property
+import hashlib
 from pathlib import Path
 import subprocess
 import logging
 import os
-from git import Repo
+import threading
+import time
+import yaml
 
-from naic_bench.utils import find_confd
+from naic_bench.catalog import BenchmarkCatalog
+from naic_bench.manifest import DataVerifier, Manifest, VerificationResult
+from naic_bench.repository import MIRRORS_DIR
 from naic_bench.spec import BenchmarkSpec
+from naic_bench.utils import find_confd
+from naic_bench.utils.command import terminate_process_tree
+from naic_bench.venv import Wheelhouse
 from naic_bench.package_manager import (
     PackageManager,
     PackageManagerFactory
@@ -13,6 +24,10 @@ from naic_bench.package_manager import (
 
 logger = logging.getLogger(__name__)
 
+# Stamps and logs of the prepare scripts (relative to the data directory)
+PREPARE_STATE_DIR = Path(".naic-bench") / "prepare"
+PREPARE_POLL_INTERVAL_IN_S = 0.5
+
 # Define apt packages
 PREREQUISITES = {
     PackageManager.Identifier.APT: [
@@ -37,6 +52,59 @@ PREREQUISITES = {
     ]
 }
 
+class PrepareCancelled(RuntimeError):
+    pass
+
+class PrepareTask:
+    """
+    A prepare script, which is run for the first benchmark that requires it
+    """
+    prepare_file: Path
+    category: str
+    benchmark_name: str
+    benchmark_spec: BenchmarkSpec
+    benchmark_dir: Path | None
+
+    # all (selected) benchmarks that require this script
+    benchmark_names: set[str]
+
+    def __init__(self, prepare_file: Path, category: str, benchmark_name: str, benchmark_spec: BenchmarkSpec):
+        self.prepare_file = prepare_file
+        self.category = category
+        self.benchmark_name = benchmark_name
+        self.benchmark_spec = benchmark_spec
+        self.benchmark_dir = None
+        self.benchmark_names = {benchmark_name}
+
+    @property
+    def name(self) -> str:
+        return self.prepare_file.name
+
+    @cached_property
+    def sha256(self) -> str:
+        return hashlib.sha256(self.prepare_file.read_bytes()).hexdigest()
+
+    def stamp_file(self, state_dir: Path) -> Path:
+        return state_dir / f"{self.name}.stamp"
+
+    def log_file(self, state_dir: Path) -> Path:
+        return state_dir / f"{self.name}.log"
+
+    def is_complete(self, state_dir: Path) -> bool:
+        """
+        Check if the script has been completed - in its current version
+        """
+        stamp_file = self.stamp_file(state_dir)
+        if not stamp_file.exists():
+            return False
+
+        try:
+            with open(stamp_file, "r") as f:
+                stamp = yaml.load(f, Loader=yaml.SafeLoader) or {}
+        except yaml.YAMLError:
+            return False
+        return stamp.get('sha256') == self.sha256
+
 class BenchmarkPrepare:
     data_dir: Path
     benchmarks_dir: Path
@@ -69,14 +137,59 @@ class BenchmarkPrepare:
         package_manager = PackageManagerFactory.get_instance()
         package_manager.ensure_packages(cls.get_prerequisites())
 
-    def prepare(self, benchmark_names: list[str] | None = None):
-        benchmarks = BenchmarkSpec.all_as_list(confd_dir=self.confd_dir, data_dir=self.data_dir)
-        mark_as_run = set()
+    def clone(self, benchmark_spec: BenchmarkSpec) -> Path:
+        """
+        Check out the repository of the benchmark - as worktree of a mirror, which is shared by all
+        benchmarks using the same repository
+        """
+        clone_target_path = benchmark_spec.git_target_dir(self.benchmarks_dir)
+        return benchmark_spec.repo.checkout(clone_target_path, mirrors_dir=self.benchmarks_dir / MIRRORS_DIR)
+
+    def build_wheelhouse(self, benchmark_names: list[str] | None = None, wheelhouse: Wheelhouse | None = None) -> dict[str, float]:
+        """
+        Prebuild the wheels for the requirements of the benchmarks, so that their venvs can be installed offline
+
+        :return: duration in seconds per benchmark
+        """
+        benchmarks = BenchmarkCatalog.get_instance(confd_dir=self.confd_dir, data_dir=self.data_dir).as_list()
+        if wheelhouse is None:
+            wheelhouse = Wheelhouse()
+
+        timings_in_s = {}
+        for framework, benchmark_name, variant, benchmark_spec in benchmarks:
+            if benchmark_names and benchmark_name not in benchmark_names:
+                continue
+
+            if benchmark_name in timings_in_s:
+                continue
+
+            requirements_txt = self.clone(benchmark_spec) / benchmark_spec.base_dir / "requirements.txt"
+            if not requirements_txt.exists():
+                timings_in_s[benchmark_name] = 0.0
+                continue
+
+            logger.info(f"BenchmarkPrepare [wheelhouse]: {benchmark_name=} - {requirements_txt} -> {wheelhouse.path}")
+            timings_in_s[benchmark_name] = wheelhouse.build(requirements_txt)
+        return timings_in_s
+
+    @property
+    def state_dir(self) -> Path:
+        """
+        Directory for the completion stamps and logs of the prepare scripts
+        """
+        return self.data_dir / PREPARE_STATE_DIR
+
+    def collect_tasks(self, benchmark_names: list[str] | None = None) -> list[PrepareTask]:
+        """
+        Collect the prepare scripts of the selected benchmarks - each script is run only once
+        """
+        benchmarks = BenchmarkCatalog.get_instance(confd_dir=self.confd_dir, data_dir=self.data_dir).as_list()
 
         if not benchmark_names:
             all_benchmarks = [y for x,y,z,spec in benchmarks]
             logger.warning(f"Preparing all benchmarks defined in {self.confd_dir}\n{sorted(all_benchmarks)}")
 
+        tasks = {}
         for framework, benchmark_name, variant, benchmark_spec in benchmarks:
             if benchmark_names and benchmark_name not in benchmark_names:
                 continue
@@ -94,22 +207,173 @@ class BenchmarkPrepare:
                                 )
 
                     prepare_file = prepare_file.resolve()
-                    if prepare_file in mark_as_run:
+                    if prepare_file in tasks:
+                        tasks[prepare_file].benchmark_names.add(benchmark_name)
                         continue
 
-                    logger.info(f"BenchmarkPrepare [{category}]: {framework=} {benchmark_name=} -  {prepare_file} {self.data_dir} {self.benchmarks_dir}")
+                    tasks[prepare_file] = PrepareTask(prepare_file=prepare_file,
+                                                      category=category,
+                                                      benchmark_name=benchmark_name,
+                                                      benchmark_spec=benchmark_spec)
+        return list(tasks.values())
+
+    def data_paths(self, benchmark_names: list[str] | None = None) -> dict[str, list[str]]:
+        """
+        Get the data paths per benchmark (for all its variants)
+        """
+        benchmarks = BenchmarkCatalog.get_instance(confd_dir=self.confd_dir, data_dir=self.data_dir).as_list()
+
+        data_paths = {}
+        for framework, benchmark_name, variant, benchmark_spec in benchmarks:
+            if benchmark_names and benchmark_name not in benchmark_names:
+                continue
+            data_paths.setdefault(benchmark_name, set()).update(benchmark_spec.data_paths())
+        return {name: sorted(paths) for name, paths in data_paths.items()}
+
+    def create_manifests(self, benchmark_names: list[str] | None = None, force: bool = False) -> list[Manifest]:
+        """
+        Create the manifests of the (prepared) data of the benchmarks - skipping benchmarks without any data
+
+        :param force: recreate existing manifests
+        """
+        verifier = DataVerifier(self.data_dir)
+        manifests = []
+        for benchmark_name, data_paths in self.data_paths(benchmark_names).items():
+            if not data_paths:
+                continue
+
+            if not force and verifier.manifest_file(benchmark_name).exists():
+                continue
+
+            manifest = verifier.create_manifest(benchmark_name, data_paths)
+            if manifest is None:
+                continue
+
+            logger.info(f"BenchmarkPrepare: created manifest for {benchmark_name} with {len(manifest.files)} files")
+            manifests.append(manifest)
+        return manifests
+
+    def prepared_benchmarks(self, tasks: list[PrepareTask]) -> list[str]:
+        """
+        Get the benchmarks whose data has been (re)created by the tasks, i.e., which require one of
+        the successfully completed scripts
+        """
+        return sorted({name for task in tasks if task.is_complete(self.state_dir) for name in task.benchmark_names})
+
+    def verify(self, benchmark_names: list[str] | None = None) -> list[VerificationResult]:
+        """
+        Check the data of the benchmarks against their manifests - a benchmark without a manifest is reported as unverified
+        """
+        verifier = DataVerifier(self.data_dir)
+        results = []
+        for benchmark_name, data_paths in self.data_paths(benchmark_names).items():
+            manifest_file = verifier.manifest_file(benchmark_name)
+            if not manifest_file.exists():
+                if not data_paths:
+                    continue
+
+                logger.warning(f"BenchmarkPrepare.verify: no manifest for {benchmark_name} - run 'naic-bench prepare' to create it")
+                results.append(VerificationResult(benchmark=benchmark_name, unverified=True))
+                continue
+
+            results.append(verifier.verify(Manifest.load(manifest_file)))
+        return results
+
+    def prepare(self, benchmark_names: list[str] | None = None, jobs: int = 4, force: bool = False) -> list[PrepareTask]:
+        """
+        Run the prepare scripts of the selected benchmarks, with at most jobs scripts in parallel
+
+        A script that has completed successfully is skipped in subsequent calls, as long as the script
+        remains unchanged. Once a script fails, the remaining scripts are cancelled.
+
+        :param force: run the scripts even if they have already completed
+        :return: the tasks that have been run
+        """
+        tasks = self.collect_tasks(benchmark_names)
+
+        pending = []
+        for task in tasks:
+            if not force and task.is_complete(self.state_dir):
+                logger.info(f"BenchmarkPrepare: {task.name} has already been completed (skipping)")
+                continue
+            pending.append(task)
+
+        if not pending:
+            return []
+
+        # clone sequentially, since scripts might share a repository
+        for task in pending:
+            task.benchmark_dir = self.clone(task.benchmark_spec) / task.benchmark_spec.base_dir
+
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        abort = threading.Event()
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = {executor.submit(self.run_task, task, abort): task for task in pending}
+            failed = []
+            for future in as_completed(futures):
+                task = futures[future]
+                if future.cancelled():
+                    continue
+
+                try:
+                    future.result()
+                except PrepareCancelled:
+                    pass
+                except Exception as e:
+                    if not failed:
+                        logger.error(f"BenchmarkPrepare: {task.name} failed -- {e} (cancelling the remaining scripts)")
+                        abort.set()
+                        for other in futures:
+                            other.cancel()
+                    failed.append(task)
+
+        if failed:
+            raise RuntimeError("BenchmarkPrepare.prepare: failed to run "
+                               + ", ".join(f"{x.name} (see {x.log_file(self.state_dir)})" for x in failed))
+        return pending
+
+    def run_task(self, task: PrepareTask, abort: threading.Event):
+        # a queued task might be picked up before the failure of another task has been handled
+        if abort.is_set():
+            raise PrepareCancelled(f"{task.name} has been cancelled")
+
+        logger.info(f"BenchmarkPrepare [{task.category}]: {task.benchmark_name=} - {task.prepare_file} {self.data_dir} {self.benchmarks_dir}")
+
+        env = os.environ.copy()
+        env['DATA_DIR'] = str(task.benchmark_spec.data_dir)
+        env['TMP_DIR'] = str(task.benchmark_spec.create_temp_dir())
+        env['BENCHMARK_DIR'] = str(task.benchmark_dir)
+
+        stamp_file = task.stamp_file(self.state_dir)
+        stamp_file.unlink(missing_ok=True)
 
-                    clone_target_path = benchmark_spec.git_target_dir(self.benchmarks_dir)
-                    if not clone_target_path.exists():
-                        logger.info(f"Cloning: {benchmark_spec.repo.url} branch={benchmark_spec.repo.branch} into {clone_target_path}")
-                        Repo.clone_from(benchmark_spec.repo.url,
-                                        branch=benchmark_spec.repo.branch,
-                                        to_path=clone_target_path)
+        start = time.monotonic()
+        with open(task.log_file(self.state_dir), "w") as log:
+            process = subprocess.Popen([task.prepare_file, self.data_dir, self.benchmarks_dir],
+                                       env=env,
+                                       stdout=log,
+                                       stderr=subprocess.STDOUT)
+            while True:
+                try:
+                    returncode = process.wait(timeout=PREPARE_POLL_INTERVAL_IN_S)
+                    break
+                except subprocess.TimeoutExpired:
+                    if abort.is_set():
+                        logger.warning(f"BenchmarkPrepare: cancelling {task.name}")
+                        terminate_process_tree(process)
+                        raise PrepareCancelled(f"{task.name} has been cancelled")
 
-                    env = os.environ.copy()
-                    env['DATA_DIR'] = benchmark_spec.data_dir
-                    env['TMP_DIR'] = benchmark_spec.temp_dir
-                    env['BENCHMARK_DIR'] = clone_target_path / benchmark_spec.base_dir
+        duration_in_s = time.monotonic() - start
+        if returncode != 0:
+            # abort right away, so that this worker does not start the next task
+            abort.set()
+            raise RuntimeError(f"{task.name} failed with exit code {returncode}")
 
-                    subprocess.run([prepare_file, self.data_dir, self.benchmarks_dir], env=env)
-                    mark_as_run.add(prepare_file)
+        logger.info(f"BenchmarkPrepare: {task.name} completed in {duration_in_s:.1f} s")
+        with open(stamp_file, "w") as f:
+            yaml.dump({
+                'script': str(task.prepare_file),
+                'sha256': task.sha256,
+                'duration_in_s': duration_in_s,
+                'completed': dt.datetime.now(tz=dt.timezone.utc).isoformat()
+            }, f)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import logging
+import re
+import subprocess
+import threading
+from pathlib import Path
+from typing import ClassVar
+
+from naic_bench.utils.locking import FileLock
+
+logger = logging.getLogger(__name__)
+
+# Folder for the mirrors (relative to the directory of the checkouts)
+MIRRORS_DIR = ".mirrors"
+
+def sanitized_name(text: str) -> str:
+    return re.sub(r"[/(&:,;. ]",'_', text)
+
+def git(*args: str, cwd: Path | str | None = None, check: bool = True) -> subprocess.CompletedProcess:
+    cmd = ["git", *args]
+    logger.debug(f"git: {' '.join(cmd)} ({cwd=})")
+    result = subprocess.run(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if check and result.returncode != 0:
+        raise RuntimeError(f"git: '{' '.join(cmd)}' failed -- {result.stderr.strip()}")
+    return result
+
+class RepositoryMirror:
+    """
+    Bare (partial) mirror of a repository, which is shared by all checkouts of this repository.
+
+    Checkouts are created as worktrees of the mirror, so that different branches and commits of the
+    same repository share the objects, and the history is downloaded only once.
+    """
+    url: str
+    path: Path
+
+    _thread_locks: ClassVar[dict[Path, threading.Lock]] = {}
+    _thread_locks_guard: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, url: str, mirrors_dir: Path | str):
+        self.url = url
+        self.path = (Path(mirrors_dir) / f"{sanitized_name(url)}.git").resolve()
+
+    def lock(self) -> tuple[threading.Lock, FileLock]:
+        with self._thread_locks_guard:
+            thread_lock = self._thread_locks.setdefault(self.path, threading.Lock())
+        return thread_lock, FileLock(self.path.with_name(f"{self.path.name}.lock"))
+
+    def exists(self) -> bool:
+        return (self.path / "HEAD").exists()
+
+    def has_revision(self, revision: str) -> bool:
+        return git("cat-file", "-e", f"{revision}^{{commit}}", cwd=self.path, check=False).returncode == 0
+
+    def update(self, revisions: list[str] = []):
+        """
+        Create the mirror, or fetch if any of the required revisions is missing
+        """
+        if not self.exists():
+            logger.info(f"RepositoryMirror: cloning {self.url} into {self.path}")
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            git("clone", "--bare", "--filter=blob:none", self.url, str(self.path))
+            # a bare clone does not track the remote branches by default
+            git("config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*", cwd=self.path)
+            return
+
+        missing = [x for x in revisions if not self.has_revision(x)]
+        if missing:
+            logger.info(f"RepositoryMirror: fetching {self.url} into {self.path} (missing: {','.join(missing)})")
+            git("fetch", "--filter=blob:none", "--prune", "origin", cwd=self.path)
+
+    def checkout(self, target_dir: Path | str, branch: str | None = None, commit: str | None = None) -> Path:
+        """
+        Get a checkout of the given branch and commit at target_dir, which is a worktree of the mirror
+
+        :param commit: commit to pin the checkout to, otherwise the head of the branch
+        """
+        target_dir = Path(target_dir).resolve()
+        revision = commit or branch or "HEAD"
+
+        thread_lock, file_lock = self.lock()
+        with thread_lock, file_lock:
+            if target_dir.exists() and (target_dir / ".git").is_dir():
+                logger.warning(f"RepositoryMirror: {target_dir} is a standalone clone (not using the mirror)")
+                return target_dir
+
+            self.update(revisions=[revision])
+            # prune worktrees whose directories have been removed
+            git("worktree", "prune", cwd=self.path)
+
+            if not target_dir.exists():
+                logger.info(f"RepositoryMirror: checking out {revision} of {self.url} into {target_dir}")
+                target_dir.parent.mkdir(parents=True, exist_ok=True)
+                git("worktree", "add", "--detach", str(target_dir), revision, cwd=self.path)
+                return target_dir
+
+            if commit:
+                head = git("rev-parse", "HEAD", cwd=target_dir).stdout.strip()
+                expected = git("rev-parse", f"{commit}^{{commit}}", cwd=self.path).stdout.strip()
+                if head != expected:
+                    logger.info(f"RepositoryMirror: setting {target_dir} to {commit}")
+                    git("checkout", "--detach", commit, cwd=target_dir)
+        return target_dir
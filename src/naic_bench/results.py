@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterator
+
+import yaml
+from pydantic import BaseModel, Field
+
+from naic_bench.autotune import AUTOTUNE_DIR
+from naic_bench.statistics import REPEATS_DIR
+from naic_bench.utils import CustomSafeLoader
+
+logger = logging.getLogger(__name__)
+
+REPORT_FILENAME = "report.yaml"
+SYSTEM_INFO_FILENAME = "system_info.yaml"
+
+# Default name of the index (in the results directory)
+RESULTS_INDEX_FILENAME = ".naic-bench-index.sqlite"
+
+# Increase when the layout of the indexed data changes
+RESULTS_INDEX_FORMAT = 1
+
+def mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+def parse_result(result_dir: Path | str) -> dict[str, Any]:
+    """
+    Load the report of a benchmark run, including its system_info
+    """
+    result_dir = Path(result_dir)
+    with open(result_dir / REPORT_FILENAME, "r") as f:
+        data = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+    system_info = {}
+    system_info_path = result_dir / SYSTEM_INFO_FILENAME
+    if system_info_path.exists():
+        with open(system_info_path, "r") as f:
+            system_info = yaml.load(f, Loader=CustomSafeLoader)
+
+    data['system_info'] = system_info
+    return data
+
+class ResultFilter(BaseModel):
+    """
+    Selection of results by benchmark, variant and device type - None selects all
+    """
+    benchmarks: list[str] | None = Field(default=None)
+    variants: list[str] | None = Field(default=None)
+    device_types: list[str] | None = Field(default=None)
+
+    def matches_dir(self, name: str) -> bool:
+        """
+        Check if a result directory, named by the identifier of the benchmark spec '<benchmark>_<variant>',
+        can contain a selected result
+        """
+        if self.benchmarks and not any(name.startswith(f"{x.replace('/', '_')}_") for x in self.benchmarks):
+            return False
+
+        if self.variants and not any(name.endswith(f"_{x}") for x in self.variants):
+            return False
+        return True
+
+    def sql(self) -> tuple[str, list[str]]:
+        """
+        Get the WHERE clause and its parameters
+        """
+        clauses = []
+        parameters = []
+        for column, values in [("benchmark", self.benchmarks), ("variant", self.variants), ("device_type", self.device_types)]:
+            if values:
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+                parameters += values
+
+        if not clauses:
+            return "", []
+        return " WHERE " + " AND ".join(clauses), parameters
+
+class ResultsIndex:
+    """
+    Index of the benchmark results below a directory, which is updated incrementally:
+    only results whose report.yaml or system_info.yaml has been modified are parsed again.
+    """
+    base_dir: Path
+    filename: Path
+
+    def __init__(self, base_dir: Path | str, filename: Path | str | None = None):
+        self.base_dir = Path(base_dir).resolve()
+        if not self.base_dir.exists():
+            raise FileNotFoundError(f"ResultsIndex: the directory '{self.base_dir}' does not exist")
+
+        self.filename = Path(filename) if filename else self.base_dir / RESULTS_INDEX_FILENAME
+        self._connection = sqlite3.connect(self.filename)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS results ("
+                                 " path TEXT PRIMARY KEY,"
+                                 " report_mtime_ns INTEGER NOT NULL,"
+                                 " system_info_mtime_ns INTEGER NOT NULL,"
+                                 " benchmark TEXT,"
+                                 " variant TEXT,"
+                                 " device_type TEXT,"
+                                 " data TEXT NOT NULL)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)")
+
+        row = self._connection.execute("SELECT value FROM metadata WHERE key = 'format'").fetchone()
+        if row is None or int(row[0]) != RESULTS_INDEX_FORMAT:
+            self._connection.execute("DELETE FROM results")
+            self._connection.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES ('format', ?)", (str(RESULTS_INDEX_FORMAT),))
+        self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self) -> ResultsIndex:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def discover(self) -> dict[str, tuple[int, int]]:
+        """
+        Find all result directories (at least one level below the base directory)
+
+        :return: mtimes of report.yaml and system_info.yaml per result directory (relative path)
+        """
+        results = {}
+        for dirpath, dirnames, filenames in os.walk(self.base_dir):
+            # skip the probe runs of the batch size search and the individual runs of repeated benchmarks
+            dirnames[:] = [x for x in dirnames if x not in (AUTOTUNE_DIR, REPEATS_DIR)]
+
+            if REPORT_FILENAME not in filenames or dirpath == str(self.base_dir):
+                continue
+
+            result_dir = Path(dirpath)
+            results[str(result_dir.relative_to(self.base_dir))] = (
+                mtime_ns(result_dir / REPORT_FILENAME),
+                mtime_ns(result_dir / SYSTEM_INFO_FILENAME)
+            )
+        return results
+
+    def update(self, workers: int | None = None, result_filter: ResultFilter | None = None) -> tuple[int, int]:
+        """
+        Ingest new and modified results, and drop the ones that no longer exist
+
+        :param workers: number of processes to parse the results
+        :param result_filter: ingest only the results in directories that match the filter
+        :return: number of ingested and removed results
+        """
+        results = self.discover()
+        indexed = {path: (report_mtime, system_info_mtime)
+                   for path, report_mtime, system_info_mtime in
+                   self._connection.execute("SELECT path, report_mtime_ns, system_info_mtime_ns FROM results")}
+
+        changed = [path for path, mtimes in results.items() if indexed.get(path) != mtimes]
+        if result_filter:
+            changed = [path for path in changed if result_filter.matches_dir(Path(path).name)]
+        removed = [path for path in indexed if path not in results]
+
+        if changed:
+            logger.info(f"ResultsIndex.update: ingesting {len(changed)} of {len(results)} results")
+            # multiprocessing is only imported once there is something to ingest
+            from concurrent.futures import ProcessPoolExecutor
+
+            rows = []
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parsed = executor.map(parse_result, [self.base_dir / x for x in changed], chunksize=16)
+                for path, data in zip(changed, parsed):
+                    report_mtime, system_info_mtime = results[path]
+                    rows.append((path, report_mtime, system_info_mtime,
+                                 data.get('benchmark'), data.get('variant'), data.get('device_type'),
+                                 json.dumps(data, default=str)))
+
+            self._connection.executemany("INSERT OR REPLACE INTO results"
+                                         " (path, report_mtime_ns, system_info_mtime_ns, benchmark, variant, device_type, data)"
+                                         " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+        if removed:
+            self._connection.executemany("DELETE FROM results WHERE path = ?", [(x,) for x in removed])
+
+        self._connection.commit()
+        return len(changed), len(removed)
+
+    def results(self, result_filter: ResultFilter | None = None) -> Iterator[dict[str, Any]]:
+        """
+        Get the indexed results (report including the system_info), ordered by their path
+        """
+        where, parameters = result_filter.sql() if result_filter else ("", [])
+        for (data,) in self._connection.execute(f"SELECT data FROM results{where} ORDER BY path", parameters):
+            yield json.loads(data)
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
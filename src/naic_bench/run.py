@@ -1,22 +1,28 @@
 from rich import print as print
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
-import subprocess
 import logging
-import shutil
+import threading
 import yaml
-import time
 import os
-import platform
 import psutil
+import shutil
 import signal
-import site
-from slurm_monitor.utils.system_info import SystemInfo
 
+from naic_bench.autotune import AUTOTUNE_DIR, BatchSizeSearch, ProbeResult, TuningCache, TuningResult, is_out_of_memory
+from naic_bench.catalog import BenchmarkCatalog
+from naic_bench.hardware import HardwareInventory
 from naic_bench.utils import Command, find_confd
+from naic_bench.utils.command import LOG_COMPRESSION_SUFFIXES, open_log
+from naic_bench.settings import Config
+from naic_bench.scheduler import DevicePool, ReadinessProbe, used_devices, visible_devices_env
+from naic_bench.statistics import REPEATS_DIR, SAMPLES_FILENAME, save_samples, summarize
+from naic_bench.telemetry import TELEMETRY_FILENAME, TelemetrySampler
+from naic_bench.venv import VenvCache
 from naic_bench.spec import (
         VirtualEnv,
-        Report,
-        BenchmarkSpec
+        Report
 )
 
 logger = logging.getLogger(__name__)
@@ -45,50 +51,55 @@ class BenchmarkRunner:
             raise RuntimeError(f"Could not find confd directory: {self.confd_dir}")
 
         self.benchmark_specs = {}
+        self._venv_locks = {}
+        self._venv_locks_guard = threading.Lock()
+        self._recreated_venvs = set()
 
         self.load_all()
 
-    def prepare_venv(self, benchmark_name: str, benchmark_dir: Path | str, work_dir: Path | str = Path().resolve(), force: bool = False) -> str:
+    def venv_lock(self, benchmark_name: str) -> threading.Lock:
         """
-        Prepare venv and return python path setting
+        Get the lock which guards the preparation of a benchmark's venv for concurrent jobs
         """
-        venv_path = (work_dir / f"venv-{benchmark_name}-{platform.machine()}").resolve()
-
-        # plain execution of the benchmark
-        result = subprocess.run(["which", "python"], stdout=subprocess.PIPE)
-        python_path = result.stdout.decode("UTF-8").strip()
-        version = '.'.join(platform.python_version_tuple()[:2])
-        site_packages = "lib/python" + version + "/site-packages"
+        with self._venv_locks_guard:
+            return self._venv_locks.setdefault(benchmark_name, threading.Lock())
+
+    def prepare_venv(self,
+            benchmark_name: str,
+            benchmark_dir: Path | str,
+            device_type: str | None = None,
+            force: bool = False) -> VirtualEnv:
+        """
+        Get the venv for the benchmark from the venv cache, which creates it if needed
+        """
+        return VenvCache().get(benchmark_name=benchmark_name,
+                               benchmark_dir=benchmark_dir,
+                               device_type=device_type,
+                               force=force)
 
-        python_site_packages = python_path.replace(r"bin/python", site_packages)
-        python_path = f"{Path(venv_path).resolve()}/{site_packages}:{python_site_packages}"
+    @property
+    def inventory(self) -> HardwareInventory:
+        return HardwareInventory.get_instance()
 
-        python_path = f"{python_path}:{':'.join(site.getsitepackages())}"
-        venv = VirtualEnv(path=venv_path, python_path=python_path)
+    @cached_property
+    def software(self) -> dict[str, str]:
+        """
+        Versions of the relevant software, checked once per run
+        """
+        software = {}
+        try:
+            import torch
+            software['torch'] = str(torch.__version__)
+        except ImportError:
+            logger.warning("BenchmarkRunner: failed to check torch version")
+        return software
 
-        if venv.path.exists():
-            if force:
-                logger.warning(f"BenchmarkRunner[{benchmark_name}]: venv: {venv.name} already exists (forcing recreation)")
-                shutil.rmtree(venv.path)
-            else:
-                logger.info(f"BenchmarkRunner[{benchmark_name}]: venv: {venv.name} already exists (reusing)")
-                return venv
-
-        if not venv.path.exists():
-            logger.info(f"BenchmarkRunner[{benchmark_name}]: preparing venv: {venv.name}")
-            result = subprocess.run(["python3", "-m", "venv", venv.path],
-                            stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE)
-            if result.returncode != 0:
-                raise RuntimeError(f"BenchmarkRunner[{benchmark_name}]: preparing venv: {venv.name} failed")
-
-            requirements_txt = benchmark_dir / "requirements.txt"
-            if requirements_txt.exists():
-                subprocess.run(f". {venv.path}/bin/activate; PYTHONPATH={venv.python_path} pip install -r {requirements_txt}", shell=True)
-        return venv
+    @property
+    def catalog(self) -> BenchmarkCatalog:
+        return BenchmarkCatalog.get_instance(confd_dir=self.confd_dir, data_dir=self.data_dir)
 
     def load_all(self):
-        self.benchmark_specs = BenchmarkSpec.load_all(confd_dir=self.confd_dir, data_dir=self.data_dir)
+        self.benchmark_specs = self.catalog.specs
 
 
     def execute_all(self,
@@ -100,10 +111,28 @@ class BenchmarkRunner:
             cpu_count: int | None = None,
             timeout_in_s: int = 3600,
             grace_period_in_s: int = 30,
-            recreate_venv: bool = False):
+            recreate_venv: bool = False,
+            stop_after_samples: int | None = None,
+            parallel: bool = False,
+            devices: list[str] | None = None,
+            autotune: bool = False,
+            retune: bool = False,
+            repeat: int = 1,
+            warmup_runs: int = 0):
+        """
+        Execute all selected benchmarks
 
-        benchmarks = BenchmarkSpec.all_as_list(confd_dir=self.confd_dir, data_dir=self.data_dir)
-        reports = []
+        Before a benchmark starts, its devices have to be idle (see Config.idle_thresholds),
+        while grace_period_in_s is the upper bound for this wait.
+
+        :param parallel: run independent benchmarks concurrently on disjoint sets of devices
+        :param devices: device ids that can be used in parallel mode
+        :param autotune: search the batch size first, unless it is already in the tuning cache
+        :param retune: search the batch size even if it is in the tuning cache
+        :param repeat: number of measured runs per benchmark, see execute_repeated
+        :param warmup_runs: number of (discarded) runs before the measured runs
+        """
+        benchmarks = self.catalog.as_list()
 
         if not names:
             all_benchmarks = [y for x,y,z,spec in benchmarks]
@@ -114,6 +143,7 @@ class BenchmarkRunner:
                 msg += "(for all variants)"
             print(msg)
 
+        jobs = []
         for framework, benchmark_name, variant, benchmark_spec in benchmarks:
             if names and benchmark_name not in names:
                 continue
@@ -121,23 +151,313 @@ class BenchmarkRunner:
             if variants and variant not in variants:
                 continue
 
-            report = self.execute(framework=framework,
+            jobs.append((framework, benchmark_name, variant))
+
+        if parallel:
+            return self.execute_parallel(jobs,
+                    devices=devices,
+                    device_type=device_type,
+                    gpu_count=gpu_count,
+                    cpu_count=cpu_count,
+                    timeout_in_s=timeout_in_s,
+                    grace_period_in_s=grace_period_in_s,
+                    recreate_venv=recreate_venv,
+                    stop_after_samples=stop_after_samples,
+                    autotune=autotune,
+                    retune=retune,
+                    repeat=repeat,
+                    warmup_runs=warmup_runs
+            )
+
+        probe = self.readiness_probe(device_type=device_type, max_wait_in_s=grace_period_in_s)
+
+        reports = []
+        for framework, benchmark_name, variant in jobs:
+            idle_wait_in_s = probe.wait()
+            print(f"BenchmarkRunner {benchmark_name}|{variant}: waited {idle_wait_in_s:.1f} s for idle devices")
+
+            report = self.execute_repeated(framework=framework,
                     name=benchmark_name,
                     variant=variant,
+                    repeat=repeat,
+                    warmup_runs=warmup_runs,
                     device_type=device_type,
                     gpu_count=gpu_count,
                     cpu_count=cpu_count,
                     timeout_in_s=timeout_in_s,
-                    recreate_venv=recreate_venv
+                    recreate_venv=recreate_venv,
+                    stop_after_samples=stop_after_samples,
+                    idle_wait_in_s=idle_wait_in_s,
+                    autotune=autotune,
+                    retune=retune
             )
             reports.append(report)
-            print(f"BenchmarkRunner {benchmark_name}|{variant}: Grace period: waiting to {grace_period_in_s} s to finalize")
-            for i in reversed(range(0, grace_period_in_s)):
-                print(".", end='')
-                time.sleep(1)
-            print(f"BenchmarkRunner {benchmark_name}|{variant}: Grace period: completed")
         return reports
 
+    def tuning_gpu_model(self, device_type: str | None) -> str:
+        if not device_type or device_type == "cpu":
+            return "cpu"
+        return self.inventory.gpu_model or "n/a"
+
+    def tune(self,
+            framework: str,
+            name: str,
+            variant: str,
+            device_type: str = "cpu",
+            gpu_count: int = 1,
+            cpu_count: int | None = None,
+            probe_timeout_in_s: int = 900,
+            stable_window: int = 5,
+            recreate_venv: bool = False,
+            env: dict[str, str] = {}) -> TuningResult | None:
+        """
+        Search the batch size with the highest throughput via short probe runs and store it in the tuning cache
+
+        A probe run stops as soon as the throughput is stable over stable_window samples.
+        """
+        spec = self.benchmark_specs[framework][name][variant]
+        metric = "throughput" if "throughput" in spec.metrics else next(iter(spec.metrics))
+
+        inventory = self.inventory
+        estimated_batch_size = spec.estimate_batch_size(
+                gpu_count=gpu_count,
+                device_type=device_type,
+                gpu_model='n/a' if inventory.gpu_model is None else inventory.gpu_model,
+                device_memory_in_gb=None if device_type == 'cpu' else inventory.device_memory_in_gb
+        )
+
+        def probe(batch_size: int) -> ProbeResult:
+            output_dir = spec.temp_dir / AUTOTUNE_DIR / f"batch_size-{batch_size}"
+            report = self.execute(framework=framework,
+                    name=name,
+                    variant=variant,
+                    device_type=device_type,
+                    gpu_count=gpu_count,
+                    cpu_count=cpu_count,
+                    timeout_in_s=probe_timeout_in_s,
+                    recreate_venv=recreate_venv,
+                    env=env,
+                    echo=False,
+                    batch_size=batch_size,
+                    stable_window=stable_window,
+                    output_dir=output_dir
+            )
+            throughput = report.metrics.get(metric)
+            if report.exit_code != 0:
+                stderr_log = next(output_dir.glob("stderr.log*"), None)
+                out_of_memory = False
+                if stderr_log:
+                    with open_log(stderr_log) as f:
+                        out_of_memory = is_out_of_memory(f)
+                return ProbeResult(batch_size=batch_size, out_of_memory=out_of_memory)
+
+            return ProbeResult(batch_size=batch_size, throughput=throughput)
+
+        print(f"BenchmarkRunner {name}|{variant}: tuning batch size (estimated: {estimated_batch_size})")
+        search = BatchSizeSearch(probe=probe)
+        best = search.search(start=estimated_batch_size)
+        if best is None:
+            logger.warning(f"BenchmarkRunner.tune [{name}|{variant=}]: no working batch size found - {search.probes}")
+            return None
+
+        result = TuningResult(benchmark=name,
+                variant=variant,
+                gpu_model=self.tuning_gpu_model(device_type),
+                gpu_count=gpu_count,
+                batch_size=best.batch_size,
+                metric=metric,
+                throughput=best.throughput,
+                estimated_batch_size=estimated_batch_size,
+                probes=search.probes
+        )
+        TuningCache.get_instance().put(result)
+        print(f"BenchmarkRunner {name}|{variant}: tuned batch size {best.batch_size}"
+              f" ({metric}: {best.throughput:.2f}, estimated batch size: {estimated_batch_size})")
+        return result
+
+    def tuned_batch_size(self,
+            framework: str,
+            name: str,
+            variant: str,
+            device_type: str = "cpu",
+            gpu_count: int = 1,
+            cpu_count: int | None = None,
+            autotune: bool = False,
+            retune: bool = False,
+            recreate_venv: bool = False,
+            env: dict[str, str] = {}) -> int | None:
+        """
+        Get the batch size from the tuning cache - or search it first (autotune, if not in the cache, or retune)
+
+        :return: the tuned batch size, or None if there is none, i.e., the batch size has to be estimated
+        """
+        tuning_key = dict(benchmark=name, variant=variant, gpu_model=self.tuning_gpu_model(device_type), gpu_count=gpu_count)
+        tuning = None if retune else TuningCache.get_instance().get(**tuning_key)
+        if tuning is None and (autotune or retune):
+            tuning = self.tune(framework=framework,
+                    name=name,
+                    variant=variant,
+                    device_type=device_type,
+                    gpu_count=gpu_count,
+                    cpu_count=cpu_count,
+                    recreate_venv=recreate_venv,
+                    env=env
+            )
+
+        if tuning is None:
+            return None
+
+        logger.info(f"BenchmarkRunner.tuned_batch_size [{name}|{variant=}]: using tuned batch size {tuning.batch_size}")
+        return tuning.batch_size
+
+    def readiness_probe(self, device_type: str | None, max_wait_in_s: float) -> ReadinessProbe:
+        config = Config.initialize()
+        return ReadinessProbe(device_type=device_type,
+                    thresholds=config.idle_thresholds,
+                    max_wait_in_s=max_wait_in_s
+               )
+
+    def execute_parallel(self,
+            jobs: list[tuple[str, str, str]],
+            devices: list[str],
+            device_type: str,
+            gpu_count: int = 1,
+            cpu_count: int | None = None,
+            grace_period_in_s: int = 30,
+            **kwargs):
+        """
+        Execute (framework, benchmark, variant) jobs concurrently, so that each job gets
+        gpu_count devices exclusively.
+
+        Instead of a global grace period, a job waits only for its own devices to become idle
+        (for at most grace_period_in_s).
+        """
+        if gpu_count < 1:
+            raise ValueError("BenchmarkRunner.execute_parallel: requires gpu_count >= 1")
+
+        if not devices or len(devices) < gpu_count:
+            raise ValueError(f"BenchmarkRunner.execute_parallel: {gpu_count=} exceeds available devices: {devices}")
+
+        pool = DevicePool(devices=devices)
+        probe = self.readiness_probe(device_type=device_type, max_wait_in_s=grace_period_in_s)
+        slots = len(devices) // gpu_count
+        if cpu_count is None:
+            # share the cpus between the concurrently running jobs
+            cpu_count = max(1, os.cpu_count() // slots)
+
+        print(f"BenchmarkRunner: running {len(jobs)} jobs on devices {devices} ({slots} in parallel)")
+
+        def run_job(framework: str, name: str, variant: str) -> Report:
+            assigned_devices = pool.acquire(gpu_count)
+            try:
+                idle_wait_in_s = probe.wait(devices=assigned_devices)
+                print(f"BenchmarkRunner {name}|{variant}: starting on devices {assigned_devices}"
+                      f" (waited {idle_wait_in_s:.1f} s for idle devices)")
+                report = self.execute_repeated(framework=framework,
+                        name=name,
+                        variant=variant,
+                        device_type=device_type,
+                        gpu_count=gpu_count,
+                        cpu_count=cpu_count,
+                        env=visible_devices_env(device_type, assigned_devices),
+                        echo=False,
+                        idle_wait_in_s=idle_wait_in_s,
+                        **kwargs
+                )
+                print(f"BenchmarkRunner {name}|{variant}: completed on devices {assigned_devices}"
+                      f" (exit code: {report.exit_code})")
+                return report
+            finally:
+                pool.release(assigned_devices)
+
+        with ThreadPoolExecutor(max_workers=slots) as executor:
+            futures = [executor.submit(run_job, *job) for job in jobs]
+            return [x.result() for x in futures]
+
+    def execute_repeated(self,
+            framework: str,
+            name: str,
+            variant: str,
+            repeat: int = 1,
+            warmup_runs: int = 0,
+            output_dir: Path | None = None,
+            **kwargs) -> Report:
+        """
+        Execute a benchmark variant repeatedly, i.e., warmup_runs (discarded) runs followed by repeat measured runs
+
+        Each run writes to its own subdirectory (runs/warmup-<i>, runs/run-<i>), while the aggregated report
+        is written to the output directory: its metrics are the mean of the runs' metrics and its statistics
+        describe the spread across the measured runs.
+
+        A batch size search (autotune, retune) is done once before all runs.
+
+        :param kwargs: arguments for execute
+        """
+        if repeat < 1 or warmup_runs < 0:
+            raise ValueError(f"BenchmarkRunner.execute_repeated: requires repeat >= 1 and warmup_runs >= 0 - got {repeat=} {warmup_runs=}")
+
+        # tune only once, so that all runs use the same batch size
+        if kwargs.get("batch_size") is None and (kwargs.get("autotune") or kwargs.get("retune")):
+            kwargs["batch_size"] = self.tuned_batch_size(framework=framework,
+                    name=name,
+                    variant=variant,
+                    **{k: v for k, v in kwargs.items()
+                       if k in ["device_type", "gpu_count", "cpu_count", "autotune", "retune", "recreate_venv", "env"]}
+            )
+            kwargs["autotune"] = False
+            kwargs["retune"] = False
+
+        if repeat == 1 and warmup_runs == 0:
+            return self.execute(framework=framework, name=name, variant=variant, output_dir=output_dir, **kwargs)
+
+        if output_dir is None:
+            output_dir = self.benchmark_specs[framework][name][variant].create_temp_dir()
+        output_dir = Path(output_dir)
+
+        for i in range(warmup_runs):
+            report = self.execute(framework=framework, name=name, variant=variant,
+                    output_dir=output_dir / REPEATS_DIR / f"warmup-{i}",
+                    **kwargs)
+            logger.info(f"BenchmarkRunner.execute_repeated [{name}|{variant=}]: warmup run {i+1}/{warmup_runs} completed"
+                        f" ({report.exit_code=})")
+
+        reports = []
+        for i in range(repeat):
+            run_dir = output_dir / REPEATS_DIR / f"run-{i}"
+            report = self.execute(framework=framework, name=name, variant=variant, output_dir=run_dir, **kwargs)
+            logger.info(f"BenchmarkRunner.execute_repeated [{name}|{variant=}]: run {i+1}/{repeat} completed"
+                        f" ({report.exit_code=}, metrics={report.metrics})")
+            reports.append(report)
+
+        # failed runs (with partial metrics) do not count for the statistics
+        successful = [x for x in reports if x.exit_code == 0]
+        metric_names = list(dict.fromkeys(name for x in reports for name in x.metrics))
+        statistics = summarize({metric: [x.metrics.get(metric) for x in successful] for metric in metric_names})
+
+        report = Report(
+            benchmark=name,
+            variant=variant,
+            start_time=reports[0].start_time,
+            end_time=reports[-1].end_time,
+            exit_code=next((x.exit_code for x in reports if x.exit_code != 0), 0),
+            slurm_job_id=reports[-1].slurm_job_id,
+            device_type=reports[-1].device_type,
+            gpu_model=reports[-1].gpu_model,
+            gpu_count=reports[-1].gpu_count,
+            metrics={metric: x.mean for metric, x in statistics.items()},
+            idle_wait_in_s=reports[0].idle_wait_in_s,
+            batch_size=reports[-1].batch_size,
+            statistics=statistics,
+            repeats=repeat,
+            warmup_runs=warmup_runs
+        )
+
+        shutil.copyfile(run_dir / "system_info.yaml", output_dir / "system_info.yaml")
+        with open(output_dir / "report.yaml", "w") as f:
+            yaml.dump(report.model_dump(), f)
+
+        return report
+
     def execute(self,
             framework: str,
             name: str,
@@ -146,33 +466,132 @@ class BenchmarkRunner:
             gpu_count: int = 1,
             cpu_count: int | None = None,
             timeout_in_s: int = 3600,
-            recreate_venv: bool = False
+            recreate_venv: bool = False,
+            stop_after_samples: int | None = None,
+            env: dict[str, str] = {},
+            echo: bool = True,
+            idle_wait_in_s: float = 0.0,
+            batch_size: int | None = None,
+            autotune: bool = False,
+            retune: bool = False,
+            stable_window: int | None = None,
+            output_dir: Path | None = None,
+            telemetry_interval_in_s: float | None = None
      ):
+        """
+        Execute a single benchmark variant
+
+        :param stop_after_samples: stop the benchmark once every metric has been reported this number of times
+        :param env: additional environment variables for the benchmark, e.g., to select devices
+        :param echo: forward the output of the benchmark to the console
+        :param idle_wait_in_s: time waited for the devices to become idle - recorded in the report
+        :param batch_size: batch size to use - otherwise taken from the tuning cache or estimated
+        :param autotune: search the batch size first, if it is not in the tuning cache (or retune is set)
+        :param stable_window: stop the benchmark once the last stable_window values of each metric are stable
+        :param output_dir: directory for logs and report, defaults to the spec's temp_dir
+        :param telemetry_interval_in_s: interval of the hardware telemetry, defaults to Config.telemetry_interval_in_s
+        """
         config = self.benchmark_specs[framework][name][variant]
-        config.expand_placeholders(GPU_COUNT=gpu_count)
         if cpu_count is None:
             cpu_count = os.cpu_count()
 
-        config.expand_placeholders(CPU_COUNT=cpu_count)
+        if batch_size is None:
+            batch_size = self.tuned_batch_size(framework=framework,
+                    name=name,
+                    variant=variant,
+                    device_type=device_type,
+                    gpu_count=gpu_count,
+                    cpu_count=cpu_count,
+                    autotune=autotune,
+                    retune=retune,
+                    recreate_venv=recreate_venv,
+                    env=env
+            )
+
+        if output_dir is None:
+            temp_dir = config.create_temp_dir()
+        else:
+            temp_dir = Path(output_dir)
+            temp_dir.mkdir(parents=True, exist_ok=True)
+        placeholders = {
+            'CPU_COUNT': cpu_count,
+            'DATA_DIR': str(self.data_dir),
+            'TMP_DIR': str(temp_dir)
+        }
 
         clone_target_path = config.git_target_dir(self.benchmarks_dir)
         benchmark_dir = clone_target_path / config.base_dir
 
-        si = SystemInfo()
-        gpu_model = si.gpu_info.model
-        gpu_model = 'n/a' if gpu_model is None else gpu_model
-
-        cmd = config.get_command(device_type=device_type, gpu_count=gpu_count, gpu_model=gpu_model)
+        inventory = self.inventory
+        gpu_model = 'n/a' if inventory.gpu_model is None else inventory.gpu_model
+
+        device_memory_in_gb = None if device_type == 'cpu' else inventory.device_memory_in_gb
+        if batch_size is None:
+            batch_size = config.estimate_batch_size(device_type=device_type,
+                                                    gpu_count=gpu_count,
+                                                    gpu_model=gpu_model,
+                                                    device_memory_in_gb=device_memory_in_gb)
+
+        cmd = config.get_command(device_type=device_type,
+                                 gpu_count=gpu_count,
+                                 gpu_model=gpu_model,
+                                 placeholders=placeholders,
+                                 batch_size=batch_size)
         logger.info(f"Execute[{gpu_count=}|model={gpu_model}]: {cmd} in {benchmark_dir=}")
 
-        venv = self.prepare_venv(benchmark_name=name, benchmark_dir=benchmark_dir, force=recreate_venv)
+        with self.venv_lock(name):
+            # recreate a venv only once per runner, since other jobs might already use it
+            force = recreate_venv and name not in self._recreated_venvs
+            venv = self.prepare_venv(benchmark_name=name, benchmark_dir=benchmark_dir, device_type=device_type, force=force)
+            if force:
+                self._recreated_venvs.add(name)
+
+        extractor = config.metrics_extractor(window=stable_window)
+        stop_condition = None
+        if stable_window:
+            def stop_condition():
+                return extractor.stable()
+        elif stop_after_samples:
+            def stop_condition():
+                return extractor.complete(min_samples=stop_after_samples)
+
+        app_config = Config.initialize()
+        log_suffix = ".log"
+        if app_config.log_compression:
+            if app_config.log_compression not in LOG_COMPRESSION_SUFFIXES:
+                raise ValueError(f"BenchmarkRunner.execute: unknown log compression '{app_config.log_compression}'"
+                                 f" - select from {','.join(LOG_COMPRESSION_SUFFIXES)}")
+            log_suffix += LOG_COMPRESSION_SUFFIXES[app_config.log_compression]
+
+        if telemetry_interval_in_s is None:
+            telemetry_interval_in_s = app_config.telemetry_interval_in_s
+
+        sampler = None
+        if telemetry_interval_in_s > 0:
+            sampler = TelemetrySampler(device_type=device_type,
+                                       devices=used_devices(device_type, gpu_count=gpu_count, env=env),
+                                       interval_in_s=telemetry_interval_in_s)
+            sampler.start()
 
         logger.info(f"BenchmarkRunner.execute [{name}|{variant=}]: . {venv.name}/bin/activate; cd {benchmark_dir}; PYTHONPATH={venv.python_path} {cmd}")
-        result = Command.run_with_progress(
-                    [f". {venv.path}/bin/activate; cd {benchmark_dir}; PYTHONPATH={venv.python_path} timeout {timeout_in_s}s {cmd}"],
-                    shell=True,
-                    raise_on_error=False
-                 )
+        try:
+            result = Command.run_with_progress(
+                        [f". {venv.path}/bin/activate; cd {benchmark_dir}; PYTHONPATH={venv.python_path} timeout {timeout_in_s}s {cmd}"],
+                        env=env,
+                        shell=True,
+                        raise_on_error=False,
+                        echo=echo,
+                        line_handler=extractor.feed,
+                        stop_condition=stop_condition,
+                        stdout_log=temp_dir / f"stdout{log_suffix}",
+                        stderr_log=temp_dir / f"stderr{log_suffix}",
+                        max_lines_in_memory=app_config.log_tail_lines,
+                        on_start=sampler.attach if sampler else None
+                     )
+        finally:
+            if sampler:
+                sampler.stop()
+
         try:
             psutil.Process(result.pid)
             logger.info(f"BenchmarkRunner.execute [{name}|{variant=}]: process {result.pid} is still running - trying to kill")
@@ -183,43 +602,43 @@ class BenchmarkRunner:
         except OSError:
             logger.info(f"BenchmarkRunner.execute [{name}|{variant=}]: failed to kill process {result.pid}")
 
-        with open(config.temp_dir / "stdout.log", "w") as f:
-            for line in result.stdout:
-                f.write(f"{line}\n")
-
-        with open(config.temp_dir / "stderr.log", "w") as f:
-            for line in result.stderr:
-                f.write(f"{line}\n")
-
-        with open(config.temp_dir / "system_info.yaml", "w") as f:
-            data = dict(si)
-
-            try:
-                import torch
-                data['software'] = { 'torch': torch.__version__ }
-            except ImportError:
-                logger.warning("BenchmarkRunner: failed to check torch version")
-
-            yaml.dump(data, f)
-
-        metrics = {}
-        if result.returncode == 0:
-            metrics = config.extract_metrics(result.stdout + result.stderr)
+        inventory.save(temp_dir / "system_info.yaml", software=self.software)
+        save_samples(temp_dir / SAMPLES_FILENAME, extractor.samples)
+
+        # Metrics have been extracted while the benchmark was running, so that
+        # partial results are available, e.g., when the job has been killed by timeout
+        metrics = extractor.values()
+
+        telemetry = None
+        if sampler:
+            sampler.save(temp_dir / TELEMETRY_FILENAME)
+            telemetry = sampler.summary()
+            telemetry.set_throughput(metrics.get("throughput"))
+        exit_code = 0 if result.stopped_early else result.returncode
+        if exit_code != 0:
+            logger.warning(f"BenchmarkRunner.execute [{name}|{variant=}]: failed with {exit_code=} - partial metrics: {metrics}")
+            if result.stderr:
+                logger.warning(f"BenchmarkRunner.execute [{name}|{variant=}]: last lines of {result.stderr_log}:\n"
+                               + '\n'.join(result.stderr[-20:]))
 
         report = Report(
             benchmark=name,
             variant=variant,
             start_time=int(result.start_time.timestamp()),
             end_time=int(result.end_time.timestamp()),
-            exit_code=result.returncode,
-            # slurm_job_id=0
+            exit_code=exit_code,
+            slurm_job_id=int(os.environ.get("SLURM_JOB_ID", 0)),
             device_type=device_type,
-            gpu_model=si.gpu_info.model,
+            gpu_model=inventory.gpu_model,
             gpu_count=gpu_count,
-            metrics=metrics
+            metrics=metrics,
+            idle_wait_in_s=idle_wait_in_s,
+            batch_size=batch_size,
+            statistics=summarize(extractor.samples),
+            telemetry=telemetry
         )
 
-        with open(config.temp_dir / "report.yaml", "w") as f:
+        with open(temp_dir / "report.yaml", "w") as f:
             yaml.dump(report.model_dump(), f)
 
         return report
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import yaml
+from pydantic import BaseModel, Field
+from rich.console import Console
+from rich.table import Table
+
+from naic_bench.spec import Report
+from naic_bench.statistics import lower_is_better
+
+logger = logging.getLogger(__name__)
+
+class ScalingEntry(BaseModel):
+    benchmark: str
+    variant: str
+    metric: str
+    gpu_count: int
+    value: float | None = Field(default=None)
+    speedup: float | None = Field(default=None, description="value relative to the value for the baseline gpu count - inverted for metrics where lower is better, e.g., latency")
+    efficiency: float | None = Field(default=None, description="speedup relative to the ideal (linear) speedup")
+
+class ScalingReport(BaseModel):
+    """
+    Speedup and parallel efficiency of the benchmark metrics across gpu counts
+    """
+    baseline_gpu_count: int
+    entries: list[ScalingEntry] = Field(default=[])
+
+    @classmethod
+    def from_reports(cls, reports: list[Report]) -> ScalingReport:
+        """
+        Create the scaling report - the baseline is the run with a single GPU, or
+        if there is none, the run with the smallest gpu count
+        """
+        gpu_counts = sorted({x.gpu_count for x in reports if x.gpu_count > 0})
+        if not gpu_counts:
+            raise ValueError("ScalingReport.from_reports: requires reports with gpu_count > 0")
+
+        baseline_gpu_count = gpu_counts[0]
+
+        # (benchmark, variant, metric) -> gpu_count -> value
+        values: dict[tuple[str, str, str], dict[int, float | None]] = {}
+        for report in reports:
+            if report.gpu_count <= 0:
+                continue
+
+            for metric, value in report.metrics.items():
+                if report.exit_code != 0:
+                    value = None
+                values.setdefault((report.benchmark, report.variant, metric), {})[report.gpu_count] = value
+
+        entries = []
+        for (benchmark, variant, metric), values_by_count in sorted(values.items()):
+            baseline = values_by_count.get(baseline_gpu_count)
+            for gpu_count, value in sorted(values_by_count.items()):
+                speedup = None
+                efficiency = None
+                # a speedup > 1 is always an improvement, e.g., a lower latency
+                numerator, denominator = (baseline, value) if lower_is_better(metric) else (value, baseline)
+                if numerator is not None and denominator:
+                    speedup = numerator / denominator
+                    efficiency = speedup / (gpu_count / baseline_gpu_count)
+
+                entries.append(ScalingEntry(
+                    benchmark=benchmark,
+                    variant=variant,
+                    metric=metric,
+                    gpu_count=gpu_count,
+                    value=value,
+                    speedup=speedup,
+                    efficiency=efficiency
+                ))
+
+        return ScalingReport(baseline_gpu_count=baseline_gpu_count, entries=entries)
+
+    def save(self, filename: Path | str):
+        with open(filename, "w") as f:
+            yaml.dump(self.model_dump(), f)
+
+    @classmethod
+    def load(cls, filename: Path | str) -> ScalingReport:
+        with open(filename, "r") as f:
+            return ScalingReport(**yaml.load(f, Loader=yaml.SafeLoader))
+
+    def print(self, console: Console | None = None):
+        table = Table(title=f"Scaling relative to {self.baseline_gpu_count} GPU(s)")
+        for column in ["benchmark", "variant", "metric", "gpus", "value", "speedup", "efficiency"]:
+            table.add_column(column)
+
+        def fmt(value: float | None, pattern: str) -> str:
+            return "n/a" if value is None else pattern.format(value)
+
+        for x in self.entries:
+            table.add_row(x.benchmark,
+                          x.variant,
+                          x.metric,
+                          str(x.gpu_count),
+                          fmt(x.value, "{:.2f}"),
+                          fmt(x.speedup, "{:.2f}x"),
+                          fmt(x.efficiency, "{:.1%}"))
+
+        if console is None:
+            console = Console()
+        console.print(table)
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+
+from naic_bench.settings import IdleThresholds
+from naic_bench.utils.gpus import GPU, DeviceStatus
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that restricts the visible devices per device type
+DEVICE_VISIBILITY_ENV = {
+    'cuda': 'CUDA_VISIBLE_DEVICES',
+    'nvidia': 'CUDA_VISIBLE_DEVICES',
+    'rocm': 'HIP_VISIBLE_DEVICES',
+    'hpu': 'HABANA_VISIBLE_DEVICES',
+    'habana': 'HABANA_VISIBLE_DEVICES',
+    'xpu': 'ZE_AFFINITY_MASK',
+}
+
+def visibility_env_variable(device_type: str) -> str:
+    if not device_type:
+        raise ValueError("visibility_env_variable: device type is required")
+
+    if device_type in DEVICE_VISIBILITY_ENV:
+        return DEVICE_VISIBILITY_ENV[device_type]
+
+    for prefix, env_variable in DEVICE_VISIBILITY_ENV.items():
+        if device_type.startswith(prefix):
+            return env_variable
+
+    raise ValueError(f"visibility_env_variable: unsupported device type '{device_type}'"
+                     f" - select from {','.join(DEVICE_VISIBILITY_ENV)}")
+
+def visible_devices_env(device_type: str, devices: list[str]) -> dict[str, str]:
+    """
+    Get the environment to restrict a process to the given devices
+    """
+    return { visibility_env_variable(device_type): ','.join(devices) }
+
+def available_devices(device_type: str, device_count: int) -> list[str]:
+    """
+    Get the list of devices that can be used, respecting an already restricted
+    visibility, e.g., as set by slurm
+    """
+    env_variable = visibility_env_variable(device_type)
+    if os.environ.get(env_variable):
+        return os.environ[env_variable].split(',')
+
+    return [str(x) for x in range(device_count)]
+
+def used_devices(device_type: str | None, gpu_count: int, env: dict[str, str] = {}) -> list[str] | None:
+    """
+    Get the devices that a benchmark with gpu_count devices uses, i.e., the first of the visible devices
+
+    :param env: environment of the benchmark, which might restrict the visible devices
+    :return: the device indexes, or None if they cannot be determined
+    """
+    if not device_type or device_type == "cpu" or gpu_count < 1:
+        return None
+
+    try:
+        env_variable = visibility_env_variable(device_type)
+    except ValueError:
+        return None
+
+    visible = env.get(env_variable) or os.environ.get(env_variable)
+    if visible:
+        return visible.split(',')[:gpu_count]
+    return [str(x) for x in range(gpu_count)]
+
+class DevicePool:
+    """
+    Hand out disjoint sets of devices to concurrently running jobs
+
+    A released device becomes available again only after its cooldown period.
+    """
+    devices: list[str]
+    cooldown_in_s: float
+
+    def __init__(self, devices: list[str], cooldown_in_s: float = 0):
+        if not devices:
+            raise ValueError("DevicePool: requires at least one device")
+
+        self.devices = list(devices)
+        self.cooldown_in_s = cooldown_in_s
+
+        self._available_at = { x: 0.0 for x in self.devices }
+        self._in_use = set()
+        self._condition = threading.Condition()
+
+    def acquire(self, count: int) -> list[str]:
+        """
+        Wait until count devices are free and have cooled down, then reserve them
+        """
+        if count > len(self.devices):
+            raise ValueError(f"DevicePool.acquire: requested {count} devices, but only {len(self.devices)} exist")
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                free = sorted([x for x in self.devices if x not in self._in_use],
+                              key=lambda x: self._available_at[x])
+
+                ready = [x for x in free if self._available_at[x] <= now]
+                if len(ready) >= count:
+                    selected = ready[:count]
+                    self._in_use.update(selected)
+                    return selected
+
+                timeout = None
+                if len(free) >= count:
+                    # wait for the cooldown of the required number of devices to pass
+                    timeout = self._available_at[free[count - 1]] - now
+
+                self._condition.wait(timeout=timeout)
+
+    def release(self, devices: list[str]):
+        with self._condition:
+            available_at = time.monotonic() + self.cooldown_in_s
+            for x in devices:
+                self._in_use.discard(x)
+                self._available_at[x] = available_at
+            self._condition.notify_all()
+
+class ReadinessProbe:
+    """
+    Wait for devices to become idle, i.e., utilization, memory use and temperature
+    have to drop below the given thresholds.
+
+    The waiting time is limited by max_wait_in_s, which is also the fixed waiting time
+    when the device status cannot be queried.
+    """
+    device_type: str | None
+    thresholds: IdleThresholds
+    max_wait_in_s: float
+    poll_interval_in_s: float
+
+    def __init__(self,
+            device_type: str | None = None,
+            thresholds: IdleThresholds | None = None,
+            max_wait_in_s: float = 30,
+            poll_interval_in_s: float = 1.0):
+        self.device_type = device_type
+        self.thresholds = thresholds if thresholds else IdleThresholds()
+        self.max_wait_in_s = max_wait_in_s
+        self.poll_interval_in_s = poll_interval_in_s
+
+    def is_idle(self, status: DeviceStatus) -> bool:
+        checks = [
+            (status.utilization, self.thresholds.utilization),
+            (status.memory_used_in_mb, self.thresholds.memory_used_in_mb),
+            (status.temperature, self.thresholds.temperature)
+        ]
+        # a value that cannot be queried does not block
+        return all(value is None or value <= threshold for value, threshold in checks)
+
+    def busy_devices(self, devices: list[str] | None = None) -> list[DeviceStatus]:
+        status = GPU.device_status(device_type=self.device_type)
+        return [x for x in status if (devices is None or x.index in devices) and not self.is_idle(x)]
+
+    def wait(self, devices: list[str] | None = None) -> float:
+        """
+        Wait until the devices are idle
+
+        :param devices: device indexes to check, default is all
+        :return the time waited in seconds
+        """
+        start = time.monotonic()
+        if self.device_type == "cpu" or self.max_wait_in_s <= 0:
+            return 0.0
+
+        deadline = start + self.max_wait_in_s
+        while True:
+            try:
+                busy = self.busy_devices(devices)
+            except Exception as e:
+                logger.warning(f"ReadinessProbe.wait: cannot query device status ({e}) -"
+                               f" waiting a fixed period of {self.max_wait_in_s} s")
+                time.sleep(max(0.0, deadline - time.monotonic()))
+                break
+
+            if not busy:
+                break
+
+            now = time.monotonic()
+            if now >= deadline:
+                logger.warning(f"ReadinessProbe.wait: devices did not become idle within {self.max_wait_in_s} s:"
+                               f" {[x.model_dump() for x in busy]}")
+                break
+
+            time.sleep(min(self.poll_interval_in_s, deadline - now))
+
+        return time.monotonic() - start
@@ -13,6 +13,16 @@ class ContainerConfig(BaseModel):
     image_dir: Path = Field(default=Path("./sif-images"))
     workspace_dir: Path = Field(default=Path("/naic-workspace"),
             description="Containers folder to consider as workspace directory")
+    scratch_dir: Path | None = Field(default=None,
+            description="Node-local directory for temporary data when building images - defaults to the system's temp directory")
+
+class IdleThresholds(BaseModel):
+    utilization: float = Field(default=5.0, description="Maximum utilization (in percent) of an idle device")
+    memory_used_in_mb: float = Field(default=1024, description="Maximum used memory of an idle device")
+    temperature: float = Field(default=60.0, description="Maximum temperature (in degree Celsius) of an idle device")
+
+def default_cache_dir() -> Path:
+    return Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "naic-bench"
 
 class Config(BaseSettings):
     # export NAIC_BENCH_ENVFILE='.dev.env' in order to change the default
@@ -32,6 +42,37 @@ class Config(BaseSettings):
                             description="Local folder that will be mounted as workspace in the container"
                           )
 
+    idle_thresholds: IdleThresholds = IdleThresholds()
+
+    cache_dir: Path = Field(
+                            default_factory=default_cache_dir,
+                            description="Directory to cache, e.g., the parsed benchmark catalog"
+                          )
+
+    venv_cache_dir: Path | None = Field(
+                            default=None,
+                            description="Directory of the benchmark venvs, e.g., on a shared filesystem - defaults to <cache_dir>/venvs"
+                          )
+
+    build_cache_dir: Path | None = Field(
+                            default=None,
+                            description="Directory of the BuildKit cache for the container images - defaults to <cache_dir>/buildkit"
+                          )
+
+    telemetry_interval_in_s: float = Field(
+                            default=1.0,
+                            description="Interval of the hardware telemetry while a benchmark is running - 0 disables the telemetry"
+                          )
+
+    log_tail_lines: int = Field(
+                            default=1000,
+                            description="Number of the last output lines of a benchmark that are kept in memory"
+                          )
+    log_compression: str | None = Field(
+                            default=None,
+                            description="Compression of the benchmark logs: 'gzip', 'zstd' or None"
+                          )
+
     @classmethod
     def get_instance(cls) -> Config:
         if not hasattr(cls, "_instance") or not cls._instance:
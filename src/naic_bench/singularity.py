@@ -1,11 +1,19 @@
+from __future__ import annotations
+
 from rich import print as print
 from pathlib import Path
+import os
 import re
 import subprocess
+import tempfile
+import time
 
 import logging
 from logging import getLogger
 
+import yaml
+from pydantic import BaseModel, Field
+
 from naic_bench.docker import Docker
 from naic_bench.utils import Command, canonized_name
 from naic_bench.settings import Config
@@ -13,6 +21,51 @@ from naic_bench.settings import Config
 logger = getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Suffix of the file next to a SIF image, which records the docker image it has been converted from
+SIF_SOURCE_SUFFIX = ".source.yaml"
+
+# Sources to convert a docker image from: streaming from the docker daemon, or via an OCI layout in a (node-local) scratch directory
+CONVERSION_METHODS = ["docker-daemon", "oci"]
+
+class SifSource(BaseModel):
+    """
+    The docker image a SIF image has been converted from
+    """
+    docker_image: str
+    image_id: str = Field(description="Id (digest) of the docker image")
+    image_size_in_bytes: int = Field(default=0)
+    method: str
+    conversion_time_in_s: float = Field(default=0.0)
+    created_at: float = Field(default_factory=time.time)
+
+    @classmethod
+    def filename(cls, sif_image: Path | str) -> Path:
+        return Path(f"{sif_image}{SIF_SOURCE_SUFFIX}")
+
+    @classmethod
+    def load(cls, sif_image: Path | str) -> SifSource | None:
+        filename = cls.filename(sif_image)
+        if not filename.exists() or not Path(sif_image).exists():
+            return None
+
+        try:
+            with open(filename, "r") as f:
+                return SifSource(**yaml.safe_load(f))
+        except Exception as e:
+            logger.warning(f"SifSource.load: ignoring invalid {filename} -- {e}")
+            return None
+
+    def save(self, sif_image: Path | str):
+        with open(self.filename(sif_image), "w") as f:
+            yaml.dump(self.model_dump(), f)
+
+def format_bytes(size: float) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
 class Singularity:
     @classmethod
     def status(cls, instance_name, image_name: str | None) -> tuple[str, bool] | None:
@@ -40,32 +93,110 @@ class Singularity:
         Command.run_with_progress(["singularity", "instance", "stop", instance_name])
 
     @classmethod
-    def build(cls, device_type: str, sif_image: str, docker_image: str, rebuild_docker: bool = False):
+    def scratch_dir(cls) -> Path:
+        """
+        Node-local directory for the temporary data of a conversion
+        """
+        config = Config.initialize()
+        return Path(config.sif.scratch_dir or tempfile.gettempdir())
+
+    @classmethod
+    def convert(cls,
+            docker_image: str,
+            sif_image: Path | str,
+            method: str = "docker-daemon",
+            scratch_dir: Path | str | None = None):
+        """
+        Convert the docker image into sif_image without exporting it as archive
 
-        # First we require the docker image to be available / build
-        dockerfile = Docker.dockerfile(device_type=device_type)
-        Command.find(command="docker", do_throw=True)
+        The image is written to a temporary file next to sif_image and moved into place once complete.
+
+        :param method: 'docker-daemon' streams the image from the local docker daemon, 'oci' copies
+            it (via skopeo) to an OCI layout in scratch_dir first
+        """
+        if method not in CONVERSION_METHODS:
+            raise ValueError(f"Singularity.convert: unknown method '{method}' - select from {','.join(CONVERSION_METHODS)}")
+
+        scratch_dir = Path(scratch_dir) if scratch_dir else cls.scratch_dir()
+        scratch_dir.mkdir(parents=True, exist_ok=True)
+
+        sif_image = Path(sif_image)
+        sif_image.parent.mkdir(parents=True, exist_ok=True)
+        tmp_sif_image = sif_image.with_name(f".{sif_image.name}.tmp")
+
+        # docker-daemon:// requires an explicit tag
+        reference = docker_image if ":" in docker_image.split("/")[-1] else f"{docker_image}:latest"
+
+        with tempfile.TemporaryDirectory(dir=scratch_dir, prefix="naic-bench-sif-") as tmp_dir:
+            # unpack the layers in the scratch directory as well
+            env = {"SINGULARITY_TMPDIR": tmp_dir, "APPTAINER_TMPDIR": tmp_dir}
+            if method == "docker-daemon":
+                source = f"docker-daemon://{reference}"
+            else:
+                Command.find(command="skopeo", do_throw=True)
+                oci_dir = Path(tmp_dir) / "oci"
+                logger.info(f"Singularity.convert: copying '{reference}' to OCI layout {oci_dir}")
+                Command.run_with_progress(["skopeo", "copy", f"docker-daemon:{reference}", f"oci:{oci_dir}:latest"])
+                source = f"oci:{oci_dir}:latest"
+
+            logger.info(f"Singularity.convert: creating singularity image {sif_image} from '{source}'")
+            try:
+                Command.run_with_progress(["singularity", "build", "--force", str(tmp_sif_image), source], env=env)
+                os.replace(tmp_sif_image, sif_image)
+            finally:
+                tmp_sif_image.unlink(missing_ok=True)
+
+    @classmethod
+    def build(cls,
+            device_type: str,
+            sif_image: str,
+            docker_image: str,
+            rebuild_docker: bool = False,
+            force: bool = False,
+            method: str = "docker-daemon",
+            update_docker: bool = False) -> bool:
+        """
+        Build the docker image if needed and convert it to sif_image, unless the image has already
+        been converted from the same docker image (see SifSource)
+
+        :param force: convert even if sif_image is up to date
+        :param update_docker: update the docker image to the latest commit of naic-bench, see Docker.build
+        :return: True if the image has been converted
+        """
+        # First we require the docker image to be available and up to date
+        if not Command.find(command="docker", do_throw=force or not Path(sif_image).exists()):
+            logger.warning(f"Singularity.build: docker is not available - using the existing image {sif_image}")
+            return False
 
         docker = Docker()
-        rebuild_docker = rebuild_docker or not docker.image(name=docker_image)
+        docker.build(device_type=device_type, image_name=docker_image, force=rebuild_docker, update=update_docker)
 
-        if rebuild_docker:
-            logger.info(f"Building docker image '{docker_image}' from '{dockerfile}'")
-            Command.run_with_progress(["docker", "build", "--no-cache", "-t", docker_image, "-f", str(dockerfile), str(dockerfile.parent)])
-        else:
-            logger.info(f"Skipping building docker image '{docker_image}' from '{dockerfile}'")
+        image = docker.image(docker_image)
+        if image is None:
+            raise RuntimeError(f"Singularity.build: docker image '{docker_image}' does not exist")
+        image_size = int(image.attrs.get("Size", 0) or 0)
 
-        canonized_docker_name = canonized_name(docker_image)
+        source = SifSource.load(sif_image)
+        if source and source.image_id == image.id and not force:
+            print(f"Singularity image {sif_image} is up to date with '{docker_image}' ({image.id[:19]}) - skipping the conversion"
+                  f" (saved: ~{source.conversion_time_in_s:.0f} s)")
+            return False
 
-        # Export the docker image to tar / archive
-        logger.info(f"Exporting docker to '{canonized_docker_name}.tar'")
-        Command.run_with_progress(["docker", "save", "-o", f"{canonized_docker_name}.tar", docker_image])
+        start = time.monotonic()
+        cls.convert(docker_image=docker_image, sif_image=sif_image, method=method)
+        conversion_time_in_s = time.monotonic() - start
 
-        # Convert archive to sif format
-        logger.info(f"Creating singularity image {sif_image} from '{canonized_docker_name}.tar'")
-        Command.run_with_progress(["singularity", "build", sif_image, f"docker-archive://{canonized_docker_name}.tar"])
-        logger.info(f"Removing '{canonized_docker_name}.tar'")
-        Command.run_with_progress(["rm", f"{canonized_docker_name}.tar"])
+        SifSource(docker_image=docker_image,
+                  image_id=image.id,
+                  image_size_in_bytes=image_size,
+                  method=method,
+                  conversion_time_in_s=conversion_time_in_s
+        ).save(sif_image)
+
+        saved = "no intermediate archive" if method == "docker-daemon" else "archive only in scratch"
+        print(f"Converted '{docker_image}' to {sif_image} via {method} in {conversion_time_in_s:.0f} s"
+              f" ({saved}: {format_bytes(image_size)} less written to and read from {Path(sif_image).parent})")
+        return True
 
     @classmethod
     def run(cls,
@@ -78,7 +209,9 @@ class Singularity:
          exec_args: str | None = None,
          instance_name: str | None = None,
          docker_image: str | None = None,
-         build_only: bool = False
+         build_only: bool = False,
+         method: str = "docker-daemon",
+         update_docker: bool = False
     ):
 
         config = Config.initialize()
@@ -105,25 +238,29 @@ class Singularity:
 
         logger.info(f"singularity: using image {image_name}")
 
-        start = False
-        if not instance_running:
-            start = True
-            if not Path(image_name).exists():
-                rebuild_singularity = True
-
+        start = not instance_running
         if instance_running and (restart or rebuild_singularity):
             logger.info("singularity: restart requested")
             Singularity.stop(instance_name)
             start = True
 
-        if rebuild_docker or rebuild_singularity:
-            Singularity.build(
+        # the image id of the docker image decides whether the sif image has to be converted (again)
+        if start or build_only or rebuild_docker or update_docker:
+            converted = Singularity.build(
                     device_type=device_type,
                     docker_image=docker_image,
                     sif_image=image_name,
-                    rebuild_docker=rebuild_docker
+                    rebuild_docker=rebuild_docker,
+                    force=rebuild_singularity,
+                    method=method,
+                    update_docker=update_docker
             )
 
+            if converted and not start:
+                logger.info("singularity: image has been converted again - restarting the instance")
+                Singularity.stop(instance_name)
+                start = True
+
         if build_only:
             return
 
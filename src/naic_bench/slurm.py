@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import logging
+import shlex
+from pathlib import Path
+from typing import Any, Iterable
+
+import yaml
+from pydantic import BaseModel, Field
+
+from naic_bench.results import ResultsIndex
+from naic_bench.utils import Command
+
+logger = logging.getLogger(__name__)
+
+# Assumed runtime of a benchmark variant without any previous run
+DEFAULT_RUNTIME_IN_S = 3600
+
+# Factor on the estimated runtime for the time limit of a job
+RUNTIME_MARGIN = 1.5
+
+# Additional time per job, e.g., to set up the venvs
+JOB_OVERHEAD_IN_S = 600
+
+# Record of the submitted jobs (in the scripts directory)
+SUBMISSIONS_FILENAME = "submissions.yaml"
+
+def format_time_limit(seconds: float) -> str:
+    """
+    Format as slurm time limit, i.e., D-HH:MM:SS
+    """
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{days}-{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+class RuntimeHistory:
+    """
+    Runtimes of previous benchmark runs, to size the time limit of jobs
+    """
+    runtimes: dict[tuple[str, str, int], float]
+
+    def __init__(self, runtimes: dict[tuple[str, str, int], float] = {}):
+        self.runtimes = dict(runtimes)
+
+    @classmethod
+    def from_results(cls, results: Iterable[dict[str, Any]]) -> RuntimeHistory:
+        """
+        Collect the longest runtime per benchmark, variant and gpu count
+        """
+        runtimes = {}
+        for result in results:
+            try:
+                key = (result['benchmark'], result['variant'], int(result['gpu_count']))
+                runtime = float(result['end_time']) - float(result['start_time'])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+            runtimes[key] = max(runtime, runtimes.get(key, 0.0))
+        return RuntimeHistory(runtimes)
+
+    @classmethod
+    def load(cls, results_dir: Path | str | None) -> RuntimeHistory:
+        if results_dir is None or not Path(results_dir).is_dir():
+            return RuntimeHistory()
+
+        with ResultsIndex(results_dir) as index:
+            index.update()
+            return cls.from_results(index.results())
+
+    def estimate(self, benchmark: str, variant: str, gpu_count: int) -> float:
+        """
+        Estimate the runtime - falls back to the runs with other gpu counts, and then to DEFAULT_RUNTIME_IN_S
+        """
+        if (benchmark, variant, gpu_count) in self.runtimes:
+            return self.runtimes[(benchmark, variant, gpu_count)]
+
+        others = [runtime for (b, v, _), runtime in self.runtimes.items() if b == benchmark and v == variant]
+        if others:
+            return max(others)
+        return DEFAULT_RUNTIME_IN_S
+
+class SlurmJob(BaseModel):
+    """
+    A job that runs 'naic-bench run' for a selection of benchmark variants on a node or partition
+
+    As job array, each array task runs a single benchmark variant.
+    """
+    name: str
+    node: str | None = Field(default=None)
+    partition: str | None = Field(default=None)
+    account: str | None = Field(default=None)
+    gpu_count: int = Field(default=1)
+
+    selection: list[tuple[str, str]] = Field(default=[], description="benchmark and variant")
+    array: bool = Field(default=False)
+    time_limit_in_s: int = Field(default=DEFAULT_RUNTIME_IN_S)
+
+    run_args: list[str] = Field(default=[], description="Arguments of 'naic-bench run', except the benchmark selection")
+    prolog: list[str] = Field(default=[], description="Commands to run first, e.g., to activate a venv")
+    log_dir: Path | None = Field(default=None)
+
+    script: Path | None = Field(default=None)
+    job_id: str | None = Field(default=None)
+
+    def script_content(self) -> str:
+        lines = ["#!/bin/bash",
+                 f"#SBATCH --job-name={self.name}"]
+        if self.account:
+            lines.append(f"#SBATCH --account={self.account}")
+        if self.partition:
+            lines.append(f"#SBATCH --partition={self.partition}")
+        if self.node:
+            lines.append(f"#SBATCH --nodelist={self.node}")
+        lines += ["#SBATCH --ntasks=1",
+                  f"#SBATCH --time={format_time_limit(self.time_limit_in_s)}"]
+        if self.gpu_count > 0:
+            lines.append(f"#SBATCH --gres=gpu:{self.gpu_count}")
+        if self.array:
+            lines.append(f"#SBATCH --array=0-{len(self.selection) - 1}")
+        if self.log_dir:
+            lines.append(f"#SBATCH --output={self.log_dir}/{self.name}-{'%A_%a' if self.array else '%j'}.log")
+
+        lines += ["", "set -e", 'echo "Starting job $SLURM_JOB_ID at $(date +%Y-%m-%d_%H:%M:%S) on $(hostname)"']
+        lines += self.prolog
+        lines.append("")
+
+        run = "naic-bench run " + " ".join(shlex.quote(x) for x in self.run_args)
+        if self.array:
+            benchmarks = " ".join(shlex.quote(benchmark) for benchmark, _ in self.selection)
+            variants = " ".join(shlex.quote(variant) for _, variant in self.selection)
+            lines += [f"BENCHMARKS=({benchmarks})",
+                      f"VARIANTS=({variants})",
+                      "",
+                      f'{run} --benchmark "${{BENCHMARKS[$SLURM_ARRAY_TASK_ID]}}" --variant "${{VARIANTS[$SLURM_ARRAY_TASK_ID]}}"']
+        else:
+            # one run per benchmark, since the selection of benchmarks and variants is combined otherwise
+            variants = {}
+            for benchmark, variant in self.selection:
+                variants.setdefault(benchmark, []).append(variant)
+
+            for benchmark, benchmark_variants in variants.items():
+                lines.append(f"{run} --benchmark {shlex.quote(benchmark)}"
+                             f" --variant {' '.join(shlex.quote(x) for x in benchmark_variants)}")
+        return "\n".join(lines) + "\n"
+
+class SlurmSubmitter:
+    """
+    Generate the sbatch scripts for a benchmark sweep over nodes or partitions and submit them
+    """
+    scripts_dir: Path
+
+    def __init__(self, scripts_dir: Path | str):
+        self.scripts_dir = Path(scripts_dir).resolve()
+
+    def plan(self,
+            selection: list[tuple[str, str]],
+            nodes: list[str] = [],
+            partitions: list[str] = [],
+            gpu_count: int = 1,
+            history: RuntimeHistory | None = None,
+            repeat: int = 1,
+            array: bool = False,
+            **kwargs) -> list[SlurmJob]:
+        """
+        Create one job (or job array) per node and partition
+
+        The time limit of a job is the estimated runtime of its benchmark variants (all, or the longest for an
+        array) - times RUNTIME_MARGIN and plus JOB_OVERHEAD_IN_S
+
+        :param selection: the benchmark variants to run
+        :param kwargs: further attributes of the jobs, see SlurmJob
+        """
+        if not selection:
+            raise ValueError("SlurmSubmitter.plan: no benchmarks selected")
+
+        if not nodes and not partitions:
+            raise ValueError("SlurmSubmitter.plan: requires at least one node or partition")
+
+        history = history or RuntimeHistory()
+        runtimes = [history.estimate(benchmark, variant, gpu_count) * repeat for benchmark, variant in selection]
+        runtime = max(runtimes) if array else sum(runtimes)
+        time_limit_in_s = int(runtime * RUNTIME_MARGIN + JOB_OVERHEAD_IN_S)
+
+        jobs = []
+        targets = [dict(node=x) for x in nodes] + [dict(partition=x) for x in partitions]
+        for target in targets:
+            name = f"naic-bench-{target.get('node') or target.get('partition')}"
+            jobs.append(SlurmJob(name=name,
+                                 gpu_count=gpu_count,
+                                 selection=selection,
+                                 array=array,
+                                 time_limit_in_s=time_limit_in_s,
+                                 **target,
+                                 **kwargs))
+        return jobs
+
+    def write(self, jobs: list[SlurmJob]) -> list[SlurmJob]:
+        self.scripts_dir.mkdir(parents=True, exist_ok=True)
+        for job in jobs:
+            job.script = self.scripts_dir / f"{job.name}.sh"
+            with open(job.script, "w") as f:
+                f.write(job.script_content())
+            job.script.chmod(0o755)
+            if job.log_dir:
+                job.log_dir.mkdir(parents=True, exist_ok=True)
+            logger.info(f"SlurmSubmitter.write: generated {job.script}")
+        return jobs
+
+    def submit(self, jobs: list[SlurmJob]) -> list[SlurmJob]:
+        """
+        Write and submit all jobs, and record the job ids in the submissions file
+
+        Each job is recorded once it has been submitted, so that the jobs submitted before a failing
+        submission are still known.
+        """
+        Command.find(command="sbatch", do_throw=True)
+
+        self.write(jobs)
+        for idx, job in enumerate(jobs):
+            try:
+                # --parsable prints '<job id>[;<cluster>]'
+                output = Command.run(["sbatch", "--parsable", str(job.script)])
+            except RuntimeError as e:
+                submitted = ", ".join(f"{x.name} ({x.job_id})" for x in jobs[:idx]) or "none"
+                raise RuntimeError(f"SlurmSubmitter.submit: submission of {job.script} failed -- {e}"
+                                   f" (already submitted: {submitted})") from e
+
+            job.job_id = output.strip().split(";")[0]
+            logger.info(f"SlurmSubmitter.submit: submitted {job.script} as job {job.job_id}")
+            self.record([job])
+
+        return jobs
+
+    @property
+    def submissions_file(self) -> Path:
+        return self.scripts_dir / SUBMISSIONS_FILENAME
+
+    def record(self, jobs: list[SlurmJob]):
+        submissions = self.submissions()
+        submissions += [x for x in jobs if x.job_id]
+        with open(self.submissions_file, "w") as f:
+            yaml.dump([x.model_dump(mode="json") for x in submissions], f)
+
+    def submissions(self) -> list[SlurmJob]:
+        if not self.submissions_file.exists():
+            return []
+
+        with open(self.submissions_file, "r") as f:
+            return [SlurmJob(**x) for x in yaml.safe_load(f) or []]
+
+    @classmethod
+    def status(cls, job_ids: list[str]) -> dict[str, str]:
+        """
+        Get the state of the jobs (array tasks are reported individually) - finished jobs are not listed by squeue
+        """
+        if not job_ids:
+            return {}
+
+        Command.find(command="squeue", do_throw=True)
+        output = Command.run(["squeue", "--noheader", "--jobs", ",".join(job_ids), "--format", "%i %T"])
+        states = {}
+        for line in output.splitlines():
+            fields = line.split()
+            if len(fields) == 2:
+                states[fields[0]] = fields[1]
+        return states
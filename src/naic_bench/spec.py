@@ -1,11 +1,12 @@
 from __future__ import annotations
 
+from array import array
+from collections import deque
 from pathlib import Path
-import subprocess
-import logging
 import os
+import logging
 import yaml
-from pydantic import BaseModel, Extra, Field, computed_field, SkipValidation
+from pydantic import BaseModel, Extra, Field, PrivateAttr, computed_field, SkipValidation
 from typing import Any
 from typing_extensions import Annotated
 import re
@@ -13,34 +14,39 @@ import math
 import platform
 
 from naic_bench.package_manager import PackageManager
+from naic_bench.repository import MIRRORS_DIR, RepositoryMirror
 from naic_bench.settings import Config
+from naic_bench.statistics import MetricStatistics
+from naic_bench.telemetry import TelemetrySummary
+from naic_bench.template import Placeholder, Template
 
 logger = logging.getLogger(__name__)
 
 BENCHMARK_SPEC_SUFFIX = ".yaml"
 
+# Use the libyaml based loader if available
+SpecLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 class Repository(BaseModel):
     url: str
     branch: str = Field(default=None)
     commit: str | None = Field(default=None)
 
-    def clone(self, workdir: Path | str, name: str | None = None):
-        cmd = ["git", "clone"]
-        if self.branch:
-            cmd += ["-b", self.branch]
-        cmd += [self.url]
-
+    def clone(self, workdir: Path | str, name: str | None = None) -> Path:
+        """
+        Check out the repository into workdir/name, using a mirror in workdir which is shared by all checkouts
+        """
         if name is None:
             name = Path(self.url).stem
 
-        repo_dir = str(Path(workdir) / name)
-        cmd += [ repo_dir ]
+        return self.checkout(Path(workdir) / name, mirrors_dir=Path(workdir) / MIRRORS_DIR)
 
-        subprocess.run(cmd)
-
-        if self.commit:
-            logger.info(f"Setting repo={repo_dir} to {self.commit}")
-            subprocess.Popen(["git", "reset", "--hard", self.commit], cwd=repo_dir)
+    def checkout(self, target_dir: Path | str, mirrors_dir: Path | str) -> Path:
+        """
+        Check out branch and commit of the repository as worktree of the mirror in mirrors_dir
+        """
+        mirror = RepositoryMirror(self.url, mirrors_dir=mirrors_dir)
+        return mirror.checkout(target_dir, branch=self.branch, commit=self.commit)
 
 class VirtualEnv(BaseModel):
     python_path: str
@@ -51,12 +57,121 @@ class VirtualEnv(BaseModel):
     def name(self) -> str:
         return self.path.name
 
+    def env(self) -> dict[str, str]:
+        """
+        Environment to run commands in this venv without activating it
+        """
+        env = dict(os.environ)
+        env['VIRTUAL_ENV'] = str(self.path)
+        env['PATH'] = f"{self.path / 'bin'}:{env.get('PATH', '')}"
+        env['PYTHONPATH'] = self.python_path
+        return env
+
 class Metric(BaseModel, extra=Extra.forbid):
     name: str
     pattern: str
     split_by: str | None = Field(default=None)
     match_group_index: int = Field(default=0)
 
+    _regex: re.Pattern | None = PrivateAttr(default=None)
+
+    @property
+    def regex(self) -> re.Pattern:
+        if self._regex is None:
+            self._regex = re.compile(self.pattern)
+        return self._regex
+
+    def parse(self, line: str) -> list[float]:
+        """
+        Extract all values of this metric from a single line of output
+        """
+        values = []
+        for m in self.regex.finditer(line):
+            if self.split_by is not None:
+                values.append(float(m.group().split(self.split_by)[self.match_group_index]))
+            else:
+                values.append(float(m.groups()[self.match_group_index]))
+        return values
+
+class MetricAggregate(BaseModel):
+    """
+    Running aggregate of all values that have been seen for a metric
+    """
+    last: float | None = Field(default=None)
+    count: int = Field(default=0)
+    total: float = Field(default=0.0)
+    min: float | None = Field(default=None)
+    max: float | None = Field(default=None)
+
+    @computed_field
+    @property
+    def mean(self) -> float | None:
+        if self.count == 0:
+            return None
+        return self.total / self.count
+
+    def add(self, value: float):
+        self.last = value
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+class MetricsExtractor:
+    """
+    Extract metrics incrementally, i.e., line by line while a benchmark is running
+    """
+    metrics: list[Metric]
+    aggregates: dict[str, MetricAggregate]
+    recent: dict[str, deque[float]]
+    samples: dict[str, array]
+
+    def __init__(self, metrics: dict[str, Metric], window: int | None = None):
+        """
+        :param window: number of the most recent values per metric to keep, see stable
+        """
+        self.metrics = list(metrics.values())
+        self.aggregates = { metric.name: MetricAggregate() for metric in self.metrics }
+        self.recent = { metric.name: deque(maxlen=window) for metric in self.metrics } if window else {}
+        self.samples = { metric.name: array('d') for metric in self.metrics }
+
+    def feed(self, line: str):
+        for metric in self.metrics:
+            for value in metric.parse(line):
+                self.aggregates[metric.name].add(value)
+                self.samples[metric.name].append(value)
+                if self.recent:
+                    self.recent[metric.name].append(value)
+
+    def values(self) -> dict[str, float | None]:
+        """
+        Get the last value that has been extracted per metric
+        """
+        return { name: aggregate.last for name, aggregate in self.aggregates.items() }
+
+    def complete(self, min_samples: int = 1) -> bool:
+        """
+        Check if all metrics have been seen at least min_samples times
+        """
+        return all(x.count >= min_samples for x in self.aggregates.values())
+
+    def stable(self, tolerance: float = 0.05) -> bool:
+        """
+        Check if all metrics have stabilised, i.e., the most recent values (a full window) deviate
+        from their mean by at most the relative tolerance
+        """
+        if not self.recent:
+            raise RuntimeError("MetricsExtractor.stable: requires a window")
+
+        for values in self.recent.values():
+            if len(values) < values.maxlen:
+                return False
+
+            mean = sum(values) / len(values)
+            if mean == 0 or (max(values) - min(values)) / abs(mean) > tolerance:
+                return False
+        return True
+
 class GPUAttribute(BaseModel, extra=Extra.forbid):
     default: float = Field(default=1.0, description="Default value that holds if no other device spec is given")
     overrides: dict[str, float] | None = Field(default=None, description="Overrides by model name or 'device_type'")
@@ -76,27 +191,32 @@ class BatchSize(BaseModel, extra=Extra.forbid):
 
     apply_via: str = Field(default="--batch-size")
 
-    @computed_field
-    @property
-    def device_memory_in_gb(self) -> int:
-        if "GPU_SIZE_IN_GB" not in os.environ:
-            from slurm_monitor.utils.system_info import SystemInfo
-
-            si = SystemInfo()
-            gpu_size_in_gb = int(si.gpu_info.memory_total / 1024**3)
-        else:
-            gpu_size_in_gb = int(os.environ["GPU_SIZE_IN_GB"])
-
-        return gpu_size_in_gb
+    @classmethod
+    def detect_device_memory_in_gb(cls) -> int:
+        """
+        Get the memory of a single device, either from the environment variable GPU_SIZE_IN_GB or from the
+        hardware inventory
+        """
+        from naic_bench.hardware import HardwareInventory
+        return HardwareInventory.get_instance().device_memory_in_gb
+
+    def estimate(self,
+                 gpu_count: int = 0,
+                 device_type: str | None = None,
+                 gpu_model: str | None = None,
+                 device_memory_in_gb: int | None = None):
+        """
+        Estimate the batch size
 
-    def estimate(self, gpu_count: int = 0, device_type: str | None = None, gpu_model: str | None = None):
+        :param device_memory_in_gb: memory of a single device, will be detected if not given
+        """
         if device_type == 'cpu':
             if gpu_count != 0:
                 raise ValueError("If device type is cpu, then gpu_count must be 0")
 
             device_memory_in_gb = 24
-        else:
-            device_memory_in_gb = self.device_memory_in_gb
+        elif device_memory_in_gb is None:
+            device_memory_in_gb = self.detect_device_memory_in_gb()
 
         batch_size = self.size_1gb.get(device_type=device_type, gpu_model=gpu_model) * device_memory_in_gb
         if gpu_count > 1 and self.multiple_gpu_scaling_factor:
@@ -119,7 +239,16 @@ class Report(BaseModel):
     device_type: str
     gpu_model: str | None = Field(default=None)
     gpu_count: int
-    metrics: dict[str, float]
+    metrics: dict[str, float | None]
+
+    idle_wait_in_s: float = Field(default=0.0, description="Time waited for the devices to become idle before the start")
+    batch_size: int | None = Field(default=None)
+
+    statistics: dict[str, MetricStatistics] = Field(default={}, description="Statistics of the samples within a run, or across the repeated runs")
+    repeats: int = Field(default=1)
+    warmup_runs: int = Field(default=0)
+
+    telemetry: TelemetrySummary | None = Field(default=None)
 
     @computed_field
     @property
@@ -152,35 +281,83 @@ class BenchmarkSpec(BaseModel):
         name = self.name.replace('/','_')
         return f"{name}_{self.variant}"
 
-    def expand_placeholders(self, *args, **kwargs):
-        updated_arguments = {}
-        for k,v in kwargs.items():
-            pattern = "{{" + f"{k}" + "(:([<=>]+)(.*))?}}"
+    _command_template: Template | None = PrivateAttr(default=None)
+    _command_distributed_template: Template | None = PrivateAttr(default=None)
+    _argument_templates: dict[str, Template | Any] = PrivateAttr(default={})
 
-            for argument_name, argument_value in self.arguments.items():
-                if argument_value is None or type(argument_value) is not str:
-                    updated_arguments[argument_name] = argument_value
-                    continue
-                else:
-                    m = re.match(pattern, argument_value)
-                    if m and m.groups()[1] is not None:
-                        operator = m.groups()[1]
-                        rhs = m.groups()[2]
-                        if '.' in rhs:
-                            rhs = float(rhs)
-                        else:
-                            rhs = int(rhs)
-
-                        if operator == "<=":
-                            v = min(v, rhs)
-                        elif operator == ">=":
-                            v = max(v, rhs)
-
-                    updated_arguments[argument_name] = re.sub(pattern, str(v), argument_value)
-
-            self.command = re.sub(pattern, str(v), self.command)
-            self.command_distributed = re.sub(pattern, str(v), self.command_distributed)
-            self.arguments = updated_arguments
+    def model_post_init(self, __context: Any):
+        self.compile_templates()
+
+    def compile_templates(self):
+        """
+        Parse the placeholders of command and arguments once, so that they can be rendered cheaply
+        """
+        self._command_template = Template(self.command)
+        self._command_distributed_template = Template(self.command_distributed)
+        self._argument_templates = {
+            name: Template(value) if type(value) is str else value
+            for name, value in self.arguments.items()
+        }
+
+    @property
+    def placeholders(self) -> set[str]:
+        """
+        Names of all placeholders in command and arguments
+        """
+        names = self._command_template.names | self._command_distributed_template.names
+        for template in self._argument_templates.values():
+            if isinstance(template, Template):
+                names |= template.names
+        return names
+
+    def data_paths(self) -> list[str]:
+        """
+        Top-level directories (relative to DATA_DIR) which are used by this benchmark, e.g., 'squad' for
+        an argument '{{DATA_DIR}}/squad/v1.1/train-v1.1.json'
+        """
+        paths = set()
+        for template in self._argument_templates.values():
+            if not isinstance(template, Template):
+                continue
+
+            segments = template.segments
+            for idx, segment in enumerate(segments[:-1]):
+                if isinstance(segment, Placeholder) and segment.name == "DATA_DIR":
+                    suffix = segments[idx + 1]
+                    if isinstance(suffix, str) and suffix.startswith("/"):
+                        top_level = suffix.lstrip("/").split("/")[0].strip()
+                        if top_level:
+                            paths.add(top_level)
+        return sorted(paths)
+
+    def placeholder_values(self, gpu_count: int = 0, **kwargs) -> dict[str, Any]:
+        """
+        Get the values for the placeholders, i.e., GPU_COUNT, CPU_COUNT, DATA_DIR and TMP_DIR
+        """
+        values = {
+            'GPU_COUNT': gpu_count,
+            'DATA_DIR': self.data_dir,
+            'TMP_DIR': str(self.temp_dir)
+        }
+        values.update(kwargs)
+        return values
+
+    def render_arguments(self, values: dict[str, Any]) -> dict[str, Any]:
+        return {
+            name: template.render(values) if isinstance(template, Template) else template
+            for name, template in self._argument_templates.items()
+        }
+
+    def expand_placeholders(self, **kwargs):
+        """
+        Expand the given placeholders in place
+
+        Prefer get_command(placeholders=...), which leaves the spec unchanged
+        """
+        self.command = self._command_template.render(kwargs)
+        self.command_distributed = self._command_distributed_template.render(kwargs)
+        self.arguments = self.render_arguments(kwargs)
+        self.compile_templates()
 
     def device_arguments(self, device_type: str | None = None):
         extra_args = ""
@@ -199,14 +376,25 @@ class BenchmarkSpec(BaseModel):
     def get_command(self, *,
                     gpu_count: int = 0,
                     device_type: str = "cpu",
-                    gpu_model: str | None = None
-        ):
+                    gpu_model: str | None = None,
+                    device_memory_in_gb: int | None = None,
+                    placeholders: dict[str, Any] | None = None,
+                    batch_size: int | None = None
+        ) -> str:
+        """
+        Render the command for a run, without modifying this spec
+
+        :param placeholders: values for placeholders, e.g., CPU_COUNT, see placeholder_values
+        :param batch_size: batch size to apply, e.g., a tuned one - estimated if not given
+        """
+        values = self.placeholder_values(gpu_count=gpu_count, **(placeholders or {}))
+
         if gpu_count <= 1:
-            cmd = self.command.strip()
+            cmd = self._command_template.render(values).strip()
         else:
-            cmd = self.command_distributed.strip()
+            cmd = self._command_distributed_template.render(values).strip()
 
-        for argument_name, argument_value in self.arguments.items():
+        for argument_name, argument_value in self.render_arguments(values).items():
             if argument_value is not None:
                 cmd += f" --{argument_name} {argument_value}"
             else:
@@ -214,34 +402,58 @@ class BenchmarkSpec(BaseModel):
 
         # Required interface "--device-type <device-type>"
         cmd += f" {self.device_arguments(device_type=device_type)}"
-        cmd += f" {self.batch_size.apply_via} {self.batch_size.estimate(gpu_count=gpu_count, device_type=device_type, gpu_model=gpu_model)}"
+        if batch_size is None:
+            batch_size = self.estimate_batch_size(gpu_count=gpu_count,
+                                                  device_type=device_type,
+                                                  gpu_model=gpu_model,
+                                                  device_memory_in_gb=device_memory_in_gb)
+        cmd += f" {self.batch_size.apply_via} {batch_size}"
         return cmd
 
+    def estimate_batch_size(self, *,
+                            gpu_count: int = 0,
+                            device_type: str = "cpu",
+                            gpu_model: str | None = None,
+                            device_memory_in_gb: int | None = None) -> int:
+        return self.batch_size.estimate(gpu_count=gpu_count,
+                                        device_type=device_type,
+                                        gpu_model=gpu_model,
+                                        device_memory_in_gb=device_memory_in_gb)
+
     def get_prepare(self, category: str) -> str:
         """
         Retrieve the list of preparation scripts that need to be run
         """
         return self.prepare.get(category, [])
 
+    def metrics_extractor(self, window: int | None = None) -> MetricsExtractor:
+        return MetricsExtractor(self.metrics, window=window)
+
     def extract_metrics(self, output: list[str]):
-        metrics = {}
-        for metric in self.metrics.values():
-            value = None
-            for i, line in enumerate(output):
-                for m in re.finditer(metric.pattern, line):
-                    if metric.split_by is not None:
-                        value = float(m.group().split(metric.split_by)[metric.match_group_index])
-                    else:
-                        value = float(m.groups()[metric.match_group_index])
-            metrics[metric.name] = value
-        return metrics
+        extractor = self.metrics_extractor()
+        for line in output:
+            extractor.feed(line)
+        return extractor.values()
+
+    def extract_samples(self, output: list[str]) -> dict[str, array]:
+        """
+        Extract all values per metric (in the order of their appearance)
+        """
+        extractor = self.metrics_extractor()
+        for line in output:
+            extractor.feed(line)
+        return extractor.samples
 
-    @computed_field
     @property
     def temp_dir(self) -> Path:
+        """
+        Output directory for a run of this benchmark - see create_temp_dir
+        """
         config = Config.initialize()
+        return config.output_base_dir / f"{self.identifier}"
 
-        temp_dir = config.output_base_dir / f"{self.identifier}"
+    def create_temp_dir(self) -> Path:
+        temp_dir = self.temp_dir
         temp_dir.mkdir(parents=True, exist_ok=True)
         return temp_dir
 
@@ -249,7 +461,7 @@ class BenchmarkSpec(BaseModel):
     def load(cls, config_filename: Path | str, data_dir: Path | str):
         benchmark_specs = {}
         with open(config_filename, 'r') as f:
-            data = yaml.load(f, Loader=yaml.SafeLoader)
+            data = yaml.load(f, Loader=SpecLoader)
 
         for framework, benchmarks in data.items():
             if framework not in benchmark_specs:
@@ -303,12 +515,9 @@ class BenchmarkSpec(BaseModel):
                     run_config['repo'] = repo
                     run_config['metrics'] = metrics
 
+                    # placeholders are only rendered for a particular run, see get_command
+                    run_config['data_dir'] = str(data_dir)
                     bc = BenchmarkSpec(**run_config)
-                    bc.expand_placeholders(
-                            DATA_DIR=data_dir,
-                            TMP_DIR=str(bc.temp_dir)
-                    )
-                    bc.data_dir = data_dir
                     benchmark_specs[framework][benchmark_name][variant] = bc
             return benchmark_specs
 
@@ -322,6 +531,15 @@ class BenchmarkSpec(BaseModel):
                     specs.append([framework, benchmark_name, variant, benchmark_spec])
         return specs
 
+    @classmethod
+    def spec_files(cls, confd_dir: Path | str) -> list[Path]:
+        confd_dir = Path(confd_dir)
+
+        if not confd_dir.exists():
+            raise FileNotFoundError(f"BenchmarkSpec.spec_files: could not find {confd_dir}")
+
+        return sorted(confd_dir.glob(f"*{BENCHMARK_SPEC_SUFFIX}"))
+
     @classmethod
     def load_all(cls, confd_dir: Path | str, data_dir: Path | str) -> dict[str, BenchmarkSpec]:
         confd_dir = Path(confd_dir)
@@ -330,7 +548,7 @@ class BenchmarkSpec(BaseModel):
             raise FileNotFoundError(f"BenchmarkSpec.load_all: could not find {confd_dir}")
 
         benchmark_specs = {}
-        run_configs = [x for x in confd_dir.glob(f"*{BENCHMARK_SPEC_SUFFIX}")]
+        run_configs = cls.spec_files(confd_dir)
 
         for config in run_configs:
             loaded_specs = cls.load(config, data_dir=data_dir)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import math
+from pathlib import Path
+from statistics import NormalDist
+from typing import Sequence
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+# Subdirectory of a benchmark's output directory for the individual runs of a repeated benchmark
+REPEATS_DIR = "runs"
+
+# Archive with all samples per metric (next to the report)
+SAMPLES_FILENAME = "samples.npz"
+
+# Multiple of the interquartile range beyond the quartiles from which on a value is an outlier (Tukey's fences)
+OUTLIER_IQR_FACTOR = 1.5
+
+# Maximum number of outlier indices that are listed
+MAX_LISTED_OUTLIERS = 100
+
+# Metrics whose name contains one of these markers are better when lower, all others when higher
+LOWER_IS_BETTER_MARKERS = ("latency", "time", "duration", "loss")
+
+def lower_is_better(metric: str) -> bool:
+    return any(marker in metric.lower() for marker in LOWER_IS_BETTER_MARKERS)
+
+def t_quantile(p: float, df: int) -> float:
+    """
+    Quantile of Student's t-distribution - exact for df <= 2, otherwise using the
+    Cornish-Fisher expansion (Abramowitz and Stegun 26.7.5), which is accurate to < 1% for df >= 3
+    """
+    if df < 1:
+        raise ValueError(f"t_quantile: requires df >= 1, got {df=}")
+
+    if df == 1:
+        return math.tan(math.pi*(p - 0.5))
+    if df == 2:
+        return (2*p - 1) / math.sqrt(2*p*(1 - p))
+
+    z = NormalDist().inv_cdf(p)
+    g1 = (z**3 + z) / 4
+    g2 = (5*z**5 + 16*z**3 + 3*z) / 96
+    g3 = (3*z**7 + 19*z**5 + 17*z**3 - 15*z) / 384
+    g4 = (79*z**9 + 776*z**7 + 1482*z**5 - 1920*z**3 - 945*z) / 92160
+    return z + g1/df + g2/df**2 + g3/df**3 + g4/df**4
+
+class MetricStatistics(BaseModel):
+    count: int
+    mean: float | None = Field(default=None)
+    median: float | None = Field(default=None)
+    stddev: float | None = Field(default=None, description="Sample standard deviation")
+    min: float | None = Field(default=None)
+    max: float | None = Field(default=None)
+
+    confidence: float = Field(default=0.95)
+    ci_low: float | None = Field(default=None, description="Lower bound of the confidence interval of the mean")
+    ci_high: float | None = Field(default=None, description="Upper bound of the confidence interval of the mean")
+
+    outlier_count: int = Field(default=0)
+    outliers: list[int] = Field(default=[], description="Indices of the (first) outliers")
+
+    @property
+    def relative_ci(self) -> float | None:
+        """
+        Half-width of the confidence interval relative to the mean
+        """
+        if self.ci_high is None or not self.mean:
+            return None
+        return (self.ci_high - self.ci_low) / 2 / abs(self.mean)
+
+    @classmethod
+    def from_samples(cls, samples: Sequence[float], confidence: float = 0.95) -> MetricStatistics:
+        """
+        Compute the statistics of the samples - missing samples (None or NaN) are ignored
+        """
+        import numpy as np
+
+        all_values = np.asarray([np.nan if x is None else x for x in samples], dtype=np.float64)
+        values = all_values[~np.isnan(all_values)]
+
+        n = values.size
+        if n == 0:
+            return MetricStatistics(count=0, confidence=confidence)
+
+        mean = float(values.mean())
+        statistics = MetricStatistics(count=n,
+                mean=mean,
+                median=float(np.median(values)),
+                min=float(values.min()),
+                max=float(values.max()),
+                confidence=confidence
+        )
+
+        if n > 1:
+            stddev = float(values.std(ddof=1))
+            half_width = t_quantile(0.5 + confidence/2, df=n - 1) * stddev / math.sqrt(n)
+            statistics.stddev = stddev
+            statistics.ci_low = mean - half_width
+            statistics.ci_high = mean + half_width
+
+        if n >= 4:
+            q1, q3 = np.percentile(values, [25, 75])
+            iqr = q3 - q1
+            # indices refer to the samples (including missing ones), since NaN never compares as outlier
+            outliers = np.flatnonzero((all_values < q1 - OUTLIER_IQR_FACTOR*iqr) | (all_values > q3 + OUTLIER_IQR_FACTOR*iqr))
+            statistics.outlier_count = int(outliers.size)
+            statistics.outliers = outliers[:MAX_LISTED_OUTLIERS].tolist()
+
+        return statistics
+
+def summarize(samples: dict[str, Sequence[float]], confidence: float = 0.95) -> dict[str, MetricStatistics]:
+    return {name: MetricStatistics.from_samples(values, confidence=confidence) for name, values in samples.items()}
+
+def save_samples(filename: Path | str, samples: dict[str, Sequence[float]]):
+    """
+    Save all samples per metric as (compressed) numpy archive
+    """
+    import numpy as np
+
+    np.savez_compressed(filename, **{name: np.asarray(values, dtype=np.float64) for name, values in samples.items()})
+
+def load_samples(filename: Path | str) -> dict[str, Sequence[float]]:
+    import numpy as np
+
+    with np.load(filename) as data:
+        return {name: data[name] for name in data.files}
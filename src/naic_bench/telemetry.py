@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+import warnings
+from array import array
+from pathlib import Path
+
+import psutil
+from pydantic import BaseModel, Field
+
+from naic_bench.utils.gpus import GPU
+
+logger = logging.getLogger(__name__)
+
+# Time series of the telemetry (next to the report)
+TELEMETRY_FILENAME = "telemetry.npz"
+
+# Fields of the device status that are recorded per device
+DEVICE_FIELDS = ["utilization", "memory_used_in_mb", "power_in_w", "clock_in_mhz", "temperature"]
+
+class TelemetrySummary(BaseModel):
+    """
+    Summary of the hardware telemetry of a benchmark run - device values are aggregated over all sampled devices
+    """
+    interval_in_s: float
+    sample_count: int = Field(default=0)
+    duration_in_s: float | None = Field(default=None)
+
+    gpu_utilization_mean: float | None = Field(default=None, description="Mean utilization (in percent) of the devices")
+    gpu_memory_used_max_in_mb: float | None = Field(default=None, description="Peak memory use of a single device")
+    gpu_power_mean_in_w: float | None = Field(default=None, description="Mean power draw of all devices")
+    gpu_power_max_in_w: float | None = Field(default=None, description="Peak power draw of all devices")
+    gpu_clock_mean_in_mhz: float | None = Field(default=None)
+    gpu_clock_min_in_mhz: float | None = Field(default=None, description="Lowest clock of a device, e.g., to spot throttling")
+    gpu_temperature_max: float | None = Field(default=None)
+    gpu_energy_in_j: float | None = Field(default=None, description="Energy used by all devices (integrated power draw)")
+
+    cpu_utilization_mean: float | None = Field(default=None, description="Mean utilization (in percent) of the host cpus")
+    rss_max_in_mb: float | None = Field(default=None, description="Peak resident memory of the benchmark's process tree")
+
+    samples_per_joule: float | None = Field(default=None, description="Throughput relative to the mean power draw of the devices")
+
+    def set_throughput(self, throughput: float | None):
+        if throughput is not None and self.gpu_power_mean_in_w:
+            self.samples_per_joule = throughput / self.gpu_power_mean_in_w
+
+class TelemetrySampler:
+    """
+    Record the device status (via the vendor's SMI), the host cpu utilization and the memory use
+    of the benchmark's process tree in a background thread
+
+    The time series is kept in compact arrays, one per column - 'time', 'cpu_utilization', 'rss_in_mb' and
+    'gpu<index>.<field>' for each device. Missing values are NaN.
+    """
+    device_type: str | None
+    devices: list[str] | None
+    interval_in_s: float
+
+    series: dict[str, array]
+    count: int
+
+    def __init__(self,
+            device_type: str | None = None,
+            devices: list[str] | None = None,
+            interval_in_s: float = 1.0):
+        """
+        :param devices: device indexes to record, default is all
+        """
+        if interval_in_s <= 0:
+            raise ValueError(f"TelemetrySampler: requires interval_in_s > 0, got {interval_in_s}")
+
+        self.device_type = device_type
+        self.devices = devices
+        self.interval_in_s = interval_in_s
+
+        self.series = {}
+        self.count = 0
+
+        self._query_devices = device_type is not None and device_type != "cpu"
+        self._process: psutil.Process | None = None
+        self._start = None
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def attach(self, pid: int):
+        """
+        Record the memory use of this process (including its children)
+        """
+        try:
+            self._process = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            logger.warning(f"TelemetrySampler.attach: process {pid} does not exist")
+
+    def rss_in_mb(self) -> float | None:
+        if self._process is None:
+            return None
+
+        try:
+            processes = [self._process] + self._process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return None
+
+        rss = 0
+        for process in processes:
+            try:
+                rss += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return rss / 1024**2
+
+    def append(self, name: str, value: float | None):
+        column = self.series.get(name)
+        if column is None:
+            column = self.series[name] = array('d', [math.nan] * self.count)
+        column.append(math.nan if value is None else value)
+
+    def sample(self):
+        """
+        Record a single sample
+        """
+        if self._start is None:
+            self._start = time.monotonic()
+            # the first call of cpu_percent only initializes the measurement
+            psutil.cpu_percent(interval=None)
+
+        self.append("time", time.monotonic() - self._start)
+        self.append("cpu_utilization", psutil.cpu_percent(interval=None))
+        self.append("rss_in_mb", self.rss_in_mb())
+
+        if self._query_devices:
+            try:
+                for status in GPU.device_status(device_type=self.device_type):
+                    if self.devices is not None and status.index not in self.devices:
+                        continue
+                    for field in DEVICE_FIELDS:
+                        self.append(f"gpu{status.index}.{field}", getattr(status, field))
+            except Exception as e:
+                logger.warning(f"TelemetrySampler.sample: cannot query the device status ({e}) - recording host telemetry only")
+                self._query_devices = False
+
+        self.count += 1
+        # pad the columns of devices that did not report
+        for column in self.series.values():
+            if len(column) < self.count:
+                column.append(math.nan)
+
+    def run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"TelemetrySampler.run: sampling failed -- {e}")
+
+            if self._stop_event.wait(self.interval_in_s):
+                break
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="telemetry-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> TelemetrySampler:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def save(self, filename: Path | str):
+        import numpy as np
+
+        np.savez_compressed(filename, **{name: np.frombuffer(column, dtype=np.float64) for name, column in self.series.items()})
+
+    def summary(self) -> TelemetrySummary:
+        return summarize_telemetry({name: column for name, column in self.series.items()}, interval_in_s=self.interval_in_s)
+
+def summarize_telemetry(series: dict[str, array], interval_in_s: float) -> TelemetrySummary:
+    """
+    Compute the summary of a telemetry time series, see TelemetrySampler
+    """
+    import numpy as np
+
+    summary = TelemetrySummary(interval_in_s=interval_in_s)
+    if not series or len(series.get("time", [])) == 0:
+        return summary
+
+    columns = {name: np.asarray(values, dtype=np.float64) for name, values in series.items()}
+    t = columns["time"]
+    summary.sample_count = int(t.size)
+    summary.duration_in_s = float(t[-1] - t[0])
+
+    def stack(field: str) -> np.ndarray | None:
+        """
+        Values of a device field as array with one row per sample and one column per device
+        """
+        values = [x for name, x in sorted(columns.items()) if name.startswith("gpu") and name.endswith(f".{field}")]
+        if not values:
+            return None
+        values = np.column_stack(values)
+        if np.isnan(values).all():
+            return None
+        return values
+
+    def value(x) -> float | None:
+        return None if x is None or np.isnan(x) else float(x)
+
+    # the nan-functions warn about all-NaN columns, which yield None
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+
+        utilization = stack("utilization")
+        if utilization is not None:
+            summary.gpu_utilization_mean = value(np.nanmean(utilization))
+
+        memory = stack("memory_used_in_mb")
+        if memory is not None:
+            summary.gpu_memory_used_max_in_mb = value(np.nanmax(memory))
+
+        clock = stack("clock_in_mhz")
+        if clock is not None:
+            summary.gpu_clock_mean_in_mhz = value(np.nanmean(clock))
+            summary.gpu_clock_min_in_mhz = value(np.nanmin(clock))
+
+        temperature = stack("temperature")
+        if temperature is not None:
+            summary.gpu_temperature_max = value(np.nanmax(temperature))
+
+        power = stack("power_in_w")
+        if power is not None:
+            # total power of all devices per sample - samples without any power reading are skipped
+            valid = ~np.isnan(power).all(axis=1)
+            total_power = np.nansum(power[valid], axis=1)
+            summary.gpu_power_mean_in_w = value(total_power.mean())
+            summary.gpu_power_max_in_w = value(total_power.max())
+            if total_power.size > 1:
+                # trapezoidal rule
+                summary.gpu_energy_in_j = float(np.sum((total_power[1:] + total_power[:-1]) / 2 * np.diff(t[valid])))
+
+        if "cpu_utilization" in columns:
+            summary.cpu_utilization_mean = value(np.nanmean(columns["cpu_utilization"]))
+        if "rss_in_mb" in columns:
+            summary.rss_max_in_mb = value(np.nanmax(columns["rss_in_mb"]))
+
+    return summary
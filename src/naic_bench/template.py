@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Mapping, NamedTuple
+
+# {{NAME}} or with constraint {{NAME:<=N}}, {{NAME:>=N}}
+PLACEHOLDER_PATTERN = re.compile(r"{{([A-Za-z_][A-Za-z0-9_]*)(?::([<>]=)([^}]*))?}}")
+
+class Placeholder(NamedTuple):
+    name: str
+    operator: str | None = None
+    bound: int | float | None = None
+
+    def apply(self, value: Any) -> Any:
+        """
+        Apply the constraint to the value
+        """
+        if self.operator is None or not isinstance(value, (int, float)):
+            return value
+
+        if self.operator == "<=":
+            return min(value, self.bound)
+        elif self.operator == ">=":
+            return max(value, self.bound)
+
+        return value
+
+    def __str__(self):
+        if self.operator is None:
+            return "{{" + self.name + "}}"
+        return "{{" + f"{self.name}:{self.operator}{self.bound}" + "}}"
+
+def parse_bound(value: str) -> int | float:
+    if '.' in value:
+        return float(value)
+    return int(value)
+
+class Template:
+    """
+    A text with placeholders, e.g., '--workers {{CPU_COUNT:<=32}}', which is parsed only once,
+    so that it can be rendered cheaply for different values
+    """
+    text: str
+    segments: tuple[str | Placeholder, ...]
+
+    __slots__ = ["text", "segments"]
+
+    def __init__(self, text: str):
+        self.text = text
+
+        segments = []
+        position = 0
+        for m in PLACEHOLDER_PATTERN.finditer(text):
+            if m.start() > position:
+                segments.append(text[position:m.start()])
+
+            name, operator, bound = m.groups()
+            if operator is None:
+                segments.append(Placeholder(name=name))
+            else:
+                segments.append(Placeholder(name=name, operator=operator, bound=parse_bound(bound)))
+
+            position = m.end()
+
+        if position < len(text):
+            segments.append(text[position:])
+
+        self.segments = tuple(segments)
+
+    def __getstate__(self):
+        return (self.text, self.segments)
+
+    def __setstate__(self, state):
+        self.text, self.segments = state
+
+    @property
+    def placeholders(self) -> list[Placeholder]:
+        return [x for x in self.segments if isinstance(x, Placeholder)]
+
+    @property
+    def names(self) -> set[str]:
+        return {x.name for x in self.placeholders}
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """
+        Render the template - placeholders without a value remain unchanged
+        """
+        result = []
+        for segment in self.segments:
+            if isinstance(segment, Placeholder):
+                if segment.name in values and values[segment.name] is not None:
+                    result.append(str(segment.apply(values[segment.name])))
+                else:
+                    result.append(str(segment))
+            else:
+                result.append(segment)
+        return ''.join(result)
+
+    def __repr__(self):
+        return f"Template({self.text!r})"
@@ -1,5 +1,18 @@
 import re
+import yaml
 from naic_bench.utils.command import ( ExecutionResult, Command, find_confd ) # noqa
 
 def canonized_name(name: str):
     return re.sub(r"[/:]",'-', name)
+
+class CustomSafeLoader(yaml.SafeLoader):
+    """
+    SafeLoader which tolerates python specific tags, e.g., as written for the torch version
+    """
+    def construct_unknown(self, node):
+        if "torch.torch_version.TorchVersion" in node.tag:
+            return node.value[0].value
+
+        return None
+
+CustomSafeLoader.add_constructor(None, CustomSafeLoader.construct_unknown)
@@ -1,25 +1,90 @@
+import codecs
+from collections import deque
 import datetime as dt
+import gzip
 import subprocess
 import logging
 import os
 import selectors
 import shutil
 import sys
-import time
 from pathlib import Path
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Callable, Iterator, TextIO
+import psutil
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of bytes read from a pipe in a single call
+CAPTURE_READ_SIZE = 1024**2
+# Wakeup interval to check for a terminated process when no output arrives
+CAPTURE_POLL_INTERVAL_IN_S = 1.0
+# Buffer size for writing spooled output to log files
+LOG_BUFFER_SIZE = 1024**2
+
+LOG_COMPRESSION_SUFFIXES = {
+    'gzip': '.gz',
+    'zstd': '.zst'
+}
+
+def open_log(path: Path | str, mode: str = "r") -> TextIO:
+    """
+    Open a (compressed) log file in text mode - the compression is identified by the file suffix
+    """
+    path = Path(path)
+    if path.suffix == LOG_COMPRESSION_SUFFIXES['gzip']:
+        return gzip.open(path, mode=f"{mode}t", encoding="UTF-8")
+
+    if path.suffix == LOG_COMPRESSION_SUFFIXES['zstd']:
+        try:
+            # Python >= 3.14
+            from compression import zstd
+        except ImportError:
+            try:
+                import zstandard as zstd
+            except ImportError:
+                raise RuntimeError(f"open_log: {path} requires zstd support - please install 'zstandard'")
+        return zstd.open(path, mode=f"{mode}t", encoding="UTF-8")
+
+    return open(path, mode=mode, encoding="UTF-8", buffering=LOG_BUFFER_SIZE)
+
 class ExecutionResult(BaseModel):
     pid: int
     returncode: int
 
+    # Output lines, limited to the last lines when a log is being written
     stdout: list[str] | None
     stderr: list[str] | None
     start_time: dt.datetime
     end_time: dt.datetime
 
+    stopped_early: bool = Field(default=False, description="Process was terminated since the stop condition was met")
+
+    stdout_log: Path | None = Field(default=None, description="Log file containing the complete stdout")
+    stderr_log: Path | None = Field(default=None, description="Log file containing the complete stderr")
+
+    def iter_stdout(self) -> Iterator[str]:
+        """
+        Iterate over all lines of stdout - reading from the log file if available
+        """
+        return self._iter_lines(self.stdout_log, self.stdout)
+
+    def iter_stderr(self) -> Iterator[str]:
+        """
+        Iterate over all lines of stderr - reading from the log file if available
+        """
+        return self._iter_lines(self.stderr_log, self.stderr)
+
+    @classmethod
+    def _iter_lines(cls, log: Path | None, lines: list[str] | None) -> Iterator[str]:
+        if log is None:
+            yield from lines or []
+            return
+
+        with open_log(log, "r") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
 class Command:
     @classmethod
     def find(cls, *, command, hints: list[str] | None = None, do_throw = True ) -> str | None:
@@ -72,7 +137,29 @@ class Command:
                           env: dict[str, any] = {},
                           shell: bool = False,
                           requires_root: bool = False,
-                          raise_on_error: bool = True) -> ExecutionResult:
+                          raise_on_error: bool = True,
+                          echo: bool = True,
+                          line_handler: Callable[[str], None] | None = None,
+                          stop_condition: Callable[[], bool] | None = None,
+                          stdout_log: Path | str | None = None,
+                          stderr_log: Path | str | None = None,
+                          max_lines_in_memory: int | None = None,
+                          on_start: Callable[[int], None] | None = None) -> ExecutionResult:
+        """
+        Run a command while forwarding its output as it arrives
+
+        Both pipes of the child are served by a single selector: every wakeup drains all
+        bytes that are available, so that a chatty benchmark never blocks on a full pipe.
+
+        :param echo: print the captured lines to sys.stdout / sys.stderr
+        :param line_handler: called for every line of stdout and stderr in order of arrival
+        :param stop_condition: checked after each batch of output, the process (tree) is
+            terminated once it returns True
+        :param stdout_log: stream stdout to this file (compressed if it ends with .gz or .zst)
+        :param stderr_log: stream stderr to this file (compressed if it ends with .gz or .zst)
+        :param max_lines_in_memory: keep only the last lines per stream in memory, default is all
+        :param on_start: called with the pid of the process once it has been started
+        """
         environ = os.environ.copy()
         for k,v in env.items():
             environ[k] = v
@@ -92,9 +179,6 @@ class Command:
 
         start_time = dt.datetime.now(tz=dt.timezone.utc)
 
-        stdout = []
-        stderr = []
-
         if shell and type(cmd) is list[str]:
             cmd = ' '.join(cmd)
 
@@ -106,64 +190,201 @@ class Command:
                     stderr=subprocess.PIPE,
                 ) as process:
 
-            os.set_blocking(process.stdout.fileno(), False)
-            stdout_selector = selectors.DefaultSelector()
-            stdout_selector.register(process.stdout, selectors.EVENT_READ)
-
-            os.set_blocking(process.stderr.fileno(), False)
-            stderr_selector = selectors.DefaultSelector()
-            stderr_selector.register(process.stderr, selectors.EVENT_READ)
-
-            while process.poll() is None:
-                if pipe_has_data(process.stdout, stdout_selector):
-                    stdout_line = process.stdout.readline()
-                    if stdout_line:
-                        output_line = stdout_line.decode("UTF-8").rstrip()
-                        print(output_line, flush=True, file=sys.stdout)
-                        stdout.append(output_line)
-
-                if pipe_has_data(process.stderr, stderr_selector):
-                    stderr_line = process.stderr.readline()
-                    if stderr_line:
-                        output_line = stderr_line.decode("UTF-8").rstrip()
-                        print(output_line, flush=True, file=sys.stderr)
-                        stderr.append(output_line)
-
-                time.sleep(0.05)
-
+            if on_start:
+                on_start(process.pid)
+
+            stdout = OutputStream(process.stdout,
+                                  echo_to=sys.stdout if echo else None,
+                                  line_handler=line_handler,
+                                  log=stdout_log,
+                                  max_lines=max_lines_in_memory)
+            stderr = OutputStream(process.stderr,
+                                  echo_to=sys.stderr if echo else None,
+                                  line_handler=line_handler,
+                                  log=stderr_log,
+                                  max_lines=max_lines_in_memory)
+            stopped_early = capture_output(process, [stdout, stderr], stop_condition=stop_condition)
+
+            process.wait()
             end_time = dt.datetime.now(tz=dt.timezone.utc)
 
-            # Get remaining lines
-            for line in process.stdout:
-                output_line = line.decode("UTF-8").rstrip()
-                stdout.append(output_line)
-                print(output_line, flush=True, file=sys.stdout)
-
-            for line in process.stderr:
-                output_line = line.decode("UTF-8").rstrip()
-                stderr.append(output_line)
-                print(output_line, flush=True, file=sys.stderr)
-
-            if raise_on_error and process.returncode != 0:
-                error_details = '\n'.join(stderr)
+            if raise_on_error and process.returncode != 0 and not stopped_early:
+                error_details = '\n'.join(stderr.lines)
                 raise RuntimeError(f"Execution of '{' '.join(cmd)}' failed -- details: {error_details}")
 
             return ExecutionResult(
                        pid=process.pid,
                        returncode=process.returncode,
-                       stdout=stdout,
-                       stderr=stderr,
+                       stdout=list(stdout.lines),
+                       stderr=list(stderr.lines),
                        start_time=start_time,
-                       end_time=end_time
+                       end_time=end_time,
+                       stopped_early=stopped_early,
+                       stdout_log=stdout_log,
+                       stderr_log=stderr_log
                    )
 
-def pipe_has_data(pipe, selector) -> bool:
-    """Check if the pipe has data available for reading (Linux/macOS)."""
-    events = selector.select(timeout=0)  # Non-blocking check
-    for key, _ in events:
-        if key.fileobj == pipe:
-            return True
-    return False
+class LineSplitter:
+    """
+    Incrementally decode a byte stream and split it into lines
+    """
+    def __init__(self, encoding: str = "UTF-8"):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._pending = ""
+
+    def feed(self, data: bytes) -> list[str]:
+        """
+        Add data and return all lines that have been completed by it
+        """
+        lines = (self._pending + self._decoder.decode(data)).split("\n")
+        # the last element is the (possibly empty) start of an incomplete line
+        self._pending = lines.pop()
+        return [x.rstrip() for x in lines]
+
+    def flush(self) -> list[str]:
+        """
+        Return the remaining incomplete line (if any) once the stream has ended
+        """
+        text = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        if text:
+            return [text.rstrip()]
+        return []
+
+class OutputStream:
+    """
+    One captured pipe of a process, collecting its lines and optionally echoing
+    and spooling them to a log file
+    """
+    def __init__(self, pipe,
+                 echo_to = None,
+                 line_handler: Callable[[str], None] | None = None,
+                 log: Path | str | None = None,
+                 max_lines: int | None = None):
+        self.pipe = pipe
+        self.echo_to = echo_to
+        self.line_handler = line_handler
+        self.line_handler_errors = 0
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self.splitter = LineSplitter()
+
+        self.log = None
+        if log is not None:
+            Path(log).parent.mkdir(parents=True, exist_ok=True)
+            self.log = open_log(log, "w")
+
+    def feed(self, data: bytes):
+        self.handle(self.splitter.feed(data))
+
+    def close(self):
+        self.handle(self.splitter.flush())
+        if self.log:
+            self.log.close()
+            self.log = None
+
+    def handle(self, lines: list[str]):
+        if not lines:
+            return
+
+        self.lines.extend(lines)
+        if self.log:
+            self.log.write('\n'.join(lines) + '\n')
+
+        if self.line_handler:
+            for line in lines:
+                try:
+                    self.line_handler(line)
+                except Exception as e:
+                    # a failing handler, e.g., for an unexpected line, must not affect the capturing of the output
+                    self.line_handler_errors += 1
+                    if self.line_handler_errors == 1:
+                        logger.warning(f"OutputStream.handle: line handler failed for {line=} -- {e}", exc_info=True)
+                    else:
+                        logger.debug(f"OutputStream.handle: line handler failed for {line=} -- {e}")
+
+        if self.echo_to:
+            self.echo_to.write('\n'.join(lines) + '\n')
+            self.echo_to.flush()
+
+def terminate_process_tree(process: subprocess.Popen, timeout_in_s: float = 10):
+    """
+    Terminate a process and all its children, e.g., the actual benchmark started via a shell
+    """
+    try:
+        children = psutil.Process(process.pid).children(recursive=True)
+    except psutil.NoSuchProcess:
+        children = []
+
+    for child in children:
+        try:
+            child.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    process.terminate()
+
+    _, alive = psutil.wait_procs(children, timeout=timeout_in_s)
+    for child in alive:
+        logger.warning(f"terminate_process_tree: process {child.pid} did not terminate - killing")
+        try:
+            child.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+    try:
+        process.wait(timeout=timeout_in_s)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"terminate_process_tree: process {process.pid} did not terminate - killing")
+        process.kill()
+
+def capture_output(process: subprocess.Popen,
+                   streams: list[OutputStream],
+                   stop_condition: Callable[[], bool] | None = None) -> bool:
+    """
+    Read all pipes of the process until they are closed
+
+    If the process has exited, but a detached child still holds a pipe open,
+    the capture stops once no further data arrives.
+
+    :return True if the process has been terminated due to the stop condition
+    """
+    stopped_early = False
+    selector = selectors.DefaultSelector()
+    for stream in streams:
+        os.set_blocking(stream.pipe.fileno(), False)
+        selector.register(stream.pipe, selectors.EVENT_READ, data=stream)
+
+    try:
+        while selector.get_map():
+            events = selector.select(timeout=CAPTURE_POLL_INTERVAL_IN_S)
+            if not events and process.poll() is not None:
+                break
+
+            for key, _ in events:
+                stream = key.data
+                while True:
+                    try:
+                        data = os.read(key.fd, CAPTURE_READ_SIZE)
+                    except BlockingIOError:
+                        break
+
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        break
+
+                    stream.feed(data)
+                    if len(data) < CAPTURE_READ_SIZE:
+                        break
+
+            if stop_condition and not stopped_early and stop_condition():
+                logger.info(f"capture_output: stop condition met - terminating process {process.pid}")
+                terminate_process_tree(process)
+                stopped_early = True
+    finally:
+        selector.close()
+        for stream in streams:
+            stream.close()
+
+    return stopped_early
 
 def find_confd() -> Path | None:
     hints = [
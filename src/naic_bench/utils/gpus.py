@@ -1,38 +1,218 @@
 from naic_bench.utils import Command
+from pydantic import BaseModel, Field
+import json
+import logging
 import re
 
-from slurm_monitor.utils.system_info import SystemInfo
-from slurm_monitor.devices.gpu import GPUInfo
+logger = logging.getLogger(__name__)
+
+class DeviceStatus(BaseModel):
+    """
+    Momentary state of a single device
+    """
+    index: str
+    utilization: float | None = Field(default=None, description="Utilization in percent")
+    memory_used_in_mb: float | None = Field(default=None)
+    memory_total_in_mb: float | None = Field(default=None)
+    temperature: float | None = Field(default=None, description="Temperature in degree Celsius")
+    power_in_w: float | None = Field(default=None)
+    clock_in_mhz: float | None = Field(default=None)
+
+def parse_number(value: str) -> float | None:
+    """
+    Parse the leading number of an SMI field, e.g., '35 C', while 'N/A' is None
+    """
+    m = re.match(r"\s*([-+]?[0-9]*\.?[0-9]+)", str(value))
+    if m:
+        return float(m.groups()[0])
+    return None
+
+class DeviceProperties(BaseModel):
+    """
+    Static properties of a single device
+    """
+    index: str
+    uuid: str | None = Field(default=None)
+    model: str | None = Field(default=None)
+    memory_total_in_mb: float | None = Field(default=None)
+    architecture: str | None = Field(default=None)
+
+# Nvidia architectures by (major) compute capability
+NVIDIA_ARCHITECTURES = {
+    "3": "kepler",
+    "5": "maxwell",
+    "6": "pascal",
+    "7.0": "volta",
+    "7.2": "volta",
+    "7.5": "turing",
+    "8.0": "ampere",
+    "8.6": "ampere",
+    "8.7": "ampere",
+    "8.9": "ada lovelace",
+    "9.0": "hopper",
+    "10": "blackwell",
+    "12": "blackwell",
+}
+
+def nvidia_architecture(compute_capability: str) -> str | None:
+    if compute_capability in NVIDIA_ARCHITECTURES:
+        return NVIDIA_ARCHITECTURES[compute_capability]
+    return NVIDIA_ARCHITECTURES.get(compute_capability.split('.')[0])
 
 class Nvidia:
+    STATUS_FIELDS = ["index", "utilization.gpu", "memory.used", "memory.total", "temperature.gpu", "power.draw", "clocks.sm"]
+    PROPERTY_FIELDS = ["index", "uuid", "name", "memory.total", "compute_cap"]
+
     @classmethod
     def device_uuids(cls):
-        result = Command.run(["nvidia-smi", "--query-gpu=uuid", "--format=csv,noheader"])
-        return result.splitlines()
+        return [x.uuid for x in cls.device_properties()]
+
+    @classmethod
+    def device_properties(cls) -> list[DeviceProperties]:
+        fields = cls.PROPERTY_FIELDS
+        try:
+            result = Command.run(["nvidia-smi",
+                                  f"--query-gpu={','.join(fields)}",
+                                  "--format=csv,noheader,nounits"])
+        except RuntimeError as e:
+            # older versions of nvidia-smi do not support querying compute_cap
+            logger.warning(f"Nvidia.device_properties: query failed -- {e} (retrying without compute_cap)")
+            fields = [x for x in fields if x != "compute_cap"]
+            result = Command.run(["nvidia-smi",
+                                  f"--query-gpu={','.join(fields)}",
+                                  "--format=csv,noheader,nounits"])
+
+        properties = []
+        for line in result.splitlines():
+            values = dict(zip(fields, [x.strip() for x in line.split(',')]))
+            compute_capability = values.get("compute_cap")
+            properties.append(DeviceProperties(
+                index=values["index"],
+                uuid=values.get("uuid"),
+                model=values.get("name"),
+                memory_total_in_mb=parse_number(values.get("memory.total")),
+                architecture=nvidia_architecture(compute_capability) if compute_capability else None
+            ))
+        return properties
 
     @classmethod
-    def device_architecture(cls) -> str:
+    def device_status(cls) -> list[DeviceStatus]:
+        result = Command.run(["nvidia-smi",
+                              f"--query-gpu={','.join(cls.STATUS_FIELDS)}",
+                              "--format=csv,noheader,nounits"])
+        status = []
+        for line in result.splitlines():
+            index, utilization, memory_used, memory_total, temperature, power, clock = \
+                    [x.strip() for x in line.split(',')]
+            status.append(DeviceStatus(
+                index=index,
+                utilization=parse_number(utilization),
+                memory_used_in_mb=parse_number(memory_used),
+                memory_total_in_mb=parse_number(memory_total),
+                temperature=parse_number(temperature),
+                power_in_w=parse_number(power),
+                clock_in_mhz=parse_number(clock)
+            ))
+        return status
+
+    @classmethod
+    def device_architecture(cls) -> str | None:
         """
         Get device architecture if this is available
         """
-        result = Command.run(["nvidia-smi", "-q"])
-        for line in result.splitlines():
-            m = re.search(r"Product Architecture\s+:\s+(.*)", line)
-            if m:
-                return m.groups()[0].lower()
+        for x in cls.device_properties():
+            if x.architecture:
+                return x.architecture
 
         return None
 
+class Rocm:
+    @classmethod
+    def device_status(cls) -> list[DeviceStatus]:
+        result = Command.run(["rocm-smi", "--showuse", "--showmeminfo", "vram", "--showtemp", "--showpower",
+                              "--showclocks", "--json"])
+        status = []
+        for card, values in json.loads(result).items():
+            m = re.match(r"card([0-9]+)", card)
+            if not m:
+                continue
+
+            device = DeviceStatus(index=m.groups()[0])
+            for key, value in values.items():
+                if "GPU use" in key:
+                    device.utilization = parse_number(value)
+                elif "VRAM Total Used Memory" in key:
+                    device.memory_used_in_mb = parse_number(value) / 1024**2
+                elif "VRAM Total Memory" in key:
+                    device.memory_total_in_mb = parse_number(value) / 1024**2
+                elif "Temperature" in key and (device.temperature is None or "edge" in key):
+                    device.temperature = parse_number(value)
+                elif "Power" in key and "(W)" in key:
+                    device.power_in_w = parse_number(value)
+                elif key.startswith("sclk"):
+                    m = re.search(r"([0-9]+)\s*Mhz", value)
+                    if m:
+                        device.clock_in_mhz = float(m.groups()[0])
+            status.append(device)
+        return status
 
+class Habana:
+    STATUS_FIELDS = ["index", "utilization.aip", "memory.used", "memory.total", "temperature.aip", "power.draw", "clocks.soc"]
+
+    @classmethod
+    def device_status(cls) -> list[DeviceStatus]:
+        result = Command.run(["hl-smi", "-Q", ','.join(cls.STATUS_FIELDS), "-f", "csv,noheader,nounits"])
+        status = []
+        for line in result.splitlines():
+            index, utilization, memory_used, memory_total, temperature, power, clock = \
+                    [x.strip() for x in line.split(',')]
+            status.append(DeviceStatus(
+                index=index,
+                utilization=parse_number(utilization),
+                memory_used_in_mb=parse_number(memory_used),
+                memory_total_in_mb=parse_number(memory_total),
+                temperature=parse_number(temperature),
+                power_in_w=parse_number(power),
+                clock_in_mhz=parse_number(clock)
+            ))
+        return status
+
+# Vendor implementation to query the device status by device type / framework
+DEVICE_STATUS_PROVIDERS = {
+    'cuda': Nvidia,
+    'nvidia': Nvidia,
+    'rocm': Rocm,
+    'habana': Habana,
+    'hpu': Habana,
+}
 
 class GPU:
+    @classmethod
+    def device_status(cls, device_type: str | None = None) -> list[DeviceStatus]:
+        """
+        Query the current status of all devices
+
+        :param device_type: device type or framework, autodetected if not given
+        """
+        if device_type is None:
+            from naic_bench.hardware import HardwareInventory
+            device_type = HardwareInventory.get_instance().framework
+
+        if device_type is None:
+            raise RuntimeError("GPU.device_status: querying the status of devices is not supported - no device type detected")
+
+        for prefix, provider in DEVICE_STATUS_PROVIDERS.items():
+            if device_type.startswith(prefix):
+                return provider.device_status()
+
+        raise RuntimeError(f"GPU.device_status: querying the status of '{device_type}' devices is not supported")
+
     @classmethod
     def get_device_type(cls) -> tuple[str,str]:
-        si = SystemInfo()
+        from naic_bench.hardware import HardwareInventory
 
-        if si.gpu_info.framework == GPUInfo.Framework.CUDA:
-            architecture = Nvidia.device_architecture()
-            return 'nvidia', architecture
+        inventory = HardwareInventory.get_instance()
+        if inventory.framework == "cuda":
+            return 'nvidia', inventory.architecture
 
-        else:
-            return si.gpu_info.framework.value, None
+        return inventory.framework, None
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+class FileLock:
+    """
+    Exclusive lock between processes - also between nodes on a shared filesystem, since it relies on
+    POSIX record locks (lockf), which are supported by NFS and Lustre.
+
+    Note that the lock is per process: threads of the same process have to synchronize separately.
+    """
+    path: Path
+    timeout_in_s: float | None
+
+    def __init__(self, path: Path | str, timeout_in_s: float | None = None, poll_interval_in_s: float = 0.5):
+        """
+        :param timeout_in_s: maximum time to wait for the lock, None to wait indefinitely
+        """
+        self.path = Path(path)
+        self.timeout_in_s = timeout_in_s
+        self.poll_interval_in_s = poll_interval_in_s
+        self._fd = None
+
+    def acquire(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o664)
+
+        start = time.monotonic()
+        waiting = False
+        while True:
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                if self.timeout_in_s is not None and time.monotonic() - start > self.timeout_in_s:
+                    os.close(fd)
+                    raise TimeoutError(f"FileLock.acquire: could not acquire {self.path} within {self.timeout_in_s} s")
+
+                if not waiting:
+                    logger.info(f"FileLock.acquire: waiting for {self.path}")
+                    waiting = True
+                time.sleep(self.poll_interval_in_s)
+
+        self._fd = fd
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.uname().nodename}:{os.getpid()}\n".encode("UTF-8"))
+
+    def release(self):
+        if self._fd is None:
+            return
+
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def __enter__(self) -> FileLock:
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import platform
+import shutil
+import site
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import ClassVar
+
+import yaml
+
+from naic_bench.settings import Config
+from naic_bench.spec import VirtualEnv
+from naic_bench.utils.locking import FileLock
+
+logger = logging.getLogger(__name__)
+
+# Increase when the layout of the cached venvs changes
+VENV_CACHE_FORMAT = 1
+
+# Written once a venv has been completely set up
+VENV_COMPLETE_MARKER = ".naic-bench-complete"
+
+class Wheelhouse:
+    """
+    Local directory of prebuilt wheels for the benchmarks' requirements, so that venvs can be installed offline
+    """
+    path: Path
+
+    def __init__(self, path: Path | str | None = None):
+        if path is None:
+            config = Config.initialize()
+            path = config.cache_dir / "wheelhouse" / f"python{VenvCache.python_version()}-{platform.machine()}"
+        self.path = Path(path).resolve()
+
+    @classmethod
+    def requirements_hash(cls, requirements_txt: Path) -> str:
+        return hashlib.sha256(requirements_txt.read_bytes()).hexdigest()[:16]
+
+    def stamp(self, requirements_txt: Path) -> Path:
+        return self.path / f".complete-{self.requirements_hash(requirements_txt)}"
+
+    def contains(self, requirements_txt: Path) -> bool:
+        """
+        Check if all wheels for the requirements have been built
+        """
+        return self.stamp(requirements_txt).exists()
+
+    def build(self, requirements_txt: Path, force: bool = False) -> float:
+        """
+        Download or build the wheels for all requirements (including dependencies)
+
+        :return: duration in seconds
+        """
+        if self.contains(requirements_txt) and not force:
+            logger.info(f"Wheelhouse.build: wheels for {requirements_txt} already exist in {self.path}")
+            return 0.0
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        start = time.monotonic()
+        with FileLock(self.path / ".lock"):
+            result = subprocess.run([sys.executable, "-m", "pip", "wheel",
+                                     "--wheel-dir", str(self.path),
+                                     "-r", str(requirements_txt)])
+            if result.returncode != 0:
+                raise RuntimeError(f"Wheelhouse.build: building wheels for {requirements_txt} failed")
+
+            self.stamp(requirements_txt).touch()
+
+        duration_in_s = time.monotonic() - start
+        logger.info(f"Wheelhouse.build: wheels for {requirements_txt} built in {duration_in_s:.1f} s")
+        return duration_in_s
+
+def installer_backend() -> str:
+    """
+    Get the installer for requirements: 'uv' (which installs in parallel) if available, otherwise 'pip'
+    """
+    return "uv" if shutil.which("uv") else "pip"
+
+def install_command(venv: VirtualEnv,
+                    requirements_txt: Path,
+                    wheelhouse: Wheelhouse | None = None,
+                    backend: str | None = None) -> list[str]:
+    """
+    Get the command to install the requirements into the venv - offline if all wheels are in the wheelhouse
+    """
+    if backend is None:
+        backend = installer_backend()
+
+    if backend == "uv":
+        cmd = ["uv", "pip", "install", "--python", str(venv.path / "bin" / "python")]
+    elif backend == "pip":
+        cmd = [str(venv.path / "bin" / "python"), "-m", "pip", "install"]
+    else:
+        raise ValueError(f"install_command: unknown installer backend '{backend}' - select from uv, pip")
+
+    if wheelhouse is not None and wheelhouse.contains(requirements_txt):
+        cmd += ["--no-index", "--find-links", str(wheelhouse.path)]
+
+    return cmd + ["-r", str(requirements_txt)]
+
+class VenvCache:
+    """
+    Content-addressed cache of benchmark venvs.
+
+    A venv is identified by the hash of the benchmark's requirements.txt, the Python version, the machine architecture
+    and the device type, so that benchmarks (and working directories) with identical requirements share one venv.
+    Using a shared cache directory, e.g., via NAIC_BENCH__VENV_CACHE_DIR, parallel jobs on different nodes reuse
+    a single build: the build is guarded by a lock file and a venv is used only once its completion marker exists.
+    Each build goes into a new versioned directory, which is published by atomically replacing the symlink
+    'venv-<machine>-<key>', so that recreating a venv does not affect jobs which are running from the previous version.
+    """
+    cache_dir: Path
+
+    # lockf locks are held per process, so threads have to be synchronized separately
+    _thread_locks: ClassVar[dict[Path, threading.Lock]] = {}
+    _thread_locks_guard: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, cache_dir: Path | str | None = None, wheelhouse: Wheelhouse | None = None):
+        if cache_dir is None:
+            config = Config.initialize()
+            cache_dir = config.venv_cache_dir or config.cache_dir / "venvs"
+        self.cache_dir = Path(cache_dir).resolve()
+        self.wheelhouse = wheelhouse if wheelhouse is not None else Wheelhouse()
+
+    @classmethod
+    def python_version(cls) -> str:
+        return '.'.join(platform.python_version_tuple()[:2])
+
+    @classmethod
+    def compute_key(cls, requirements_txt: Path | None, device_type: str | None = None) -> str:
+        sha = hashlib.sha256()
+        for x in [str(VENV_CACHE_FORMAT), platform.python_version(), platform.machine(), device_type or "cpu"]:
+            sha.update(x.encode("UTF-8"))
+            sha.update(b"\0")
+
+        if requirements_txt is not None and requirements_txt.exists():
+            sha.update(requirements_txt.read_bytes())
+        return sha.hexdigest()[:16]
+
+    def venv(self, key: str) -> VirtualEnv:
+        return self.virtual_env(self.cache_dir / f"venv-{platform.machine()}-{key}")
+
+    def virtual_env(self, venv_path: Path) -> VirtualEnv:
+        # packages of the venv first, then the ones of the system (e.g., torch of a container)
+        site_packages = f"lib/python{self.python_version()}/site-packages"
+        python_site_packages = str(Path(sys.executable).parent.parent / site_packages)
+        python_path = f"{venv_path}/{site_packages}:{python_site_packages}:{':'.join(site.getsitepackages())}"
+
+        return VirtualEnv(path=venv_path, python_path=python_path)
+
+    @classmethod
+    def thread_lock(cls, path: Path) -> threading.Lock:
+        with cls._thread_locks_guard:
+            return cls._thread_locks.setdefault(path, threading.Lock())
+
+    @classmethod
+    def is_complete(cls, venv: VirtualEnv) -> bool:
+        return (venv.path / VENV_COMPLETE_MARKER).exists()
+
+    def get(self,
+            benchmark_name: str,
+            benchmark_dir: Path | str,
+            device_type: str | None = None,
+            force: bool = False) -> VirtualEnv:
+        """
+        Get the venv for the benchmark, and create it if it does not exist yet
+
+        :param force: recreate the venv
+        """
+        requirements_txt = Path(benchmark_dir) / "requirements.txt"
+        key = self.compute_key(requirements_txt, device_type=device_type)
+        venv = self.venv(key)
+
+        if self.is_complete(venv) and not force:
+            logger.info(f"VenvCache[{benchmark_name}]: venv: {venv.path} already exists (reusing)")
+            return self.resolve(venv)
+
+        with self.thread_lock(venv.path), FileLock(venv.path.with_name(f"{venv.name}.lock")):
+            # another job might have completed the venv while waiting for the lock
+            if self.is_complete(venv) and not force:
+                logger.info(f"VenvCache[{benchmark_name}]: venv: {venv.path} has been created by another job (reusing)")
+                return self.resolve(venv)
+
+            self.remove_stale_builds(venv)
+
+            # build a new version next to the current one, which jobs might still be using
+            build = self.virtual_env(venv.path.with_name(f"{venv.name}.{time.time_ns()}"))
+            try:
+                self.create(build,
+                            benchmark_name=benchmark_name,
+                            requirements_txt=requirements_txt if requirements_txt.exists() else None,
+                            device_type=device_type)
+            except Exception:
+                shutil.rmtree(build.path, ignore_errors=True)
+                raise
+
+            self.publish(venv, build)
+        return build
+
+    def resolve(self, venv: VirtualEnv) -> VirtualEnv:
+        """
+        Get the current version of the venv, so that a job keeps using it even if the venv is recreated meanwhile
+        """
+        if venv.path.is_symlink():
+            return self.virtual_env(venv.path.resolve())
+        return venv
+
+    def publish(self, venv: VirtualEnv, build: VirtualEnv):
+        """
+        Make the (complete) build the current version of the venv, by atomically replacing the symlink venv.path
+
+        Previous versions are kept, since running jobs might still use them.
+        """
+        link = venv.path.with_name(f"{venv.name}.link")
+        link.unlink(missing_ok=True)
+        link.symlink_to(build.path.name)
+
+        if venv.path.is_dir() and not venv.path.is_symlink():
+            # a venv that has been built in place
+            replaced = venv.path.with_name(f"{venv.name}.replaced-{time.time_ns()}")
+            logger.warning(f"VenvCache: moving {venv.path} aside to {replaced}")
+            os.replace(venv.path, replaced)
+
+        os.replace(link, venv.path)
+        logger.info(f"VenvCache: {venv.path} now refers to {build.path}")
+
+    def remove_stale_builds(self, venv: VirtualEnv):
+        """
+        Remove the incomplete builds of a venv, e.g., of interrupted jobs - requires to hold the lock of the venv
+        """
+        for path in venv.path.parent.glob(f"{venv.name}.*"):
+            if path.is_dir() and not path.is_symlink() and path.suffix[1:].isdigit() \
+                    and not (path / VENV_COMPLETE_MARKER).exists():
+                logger.info(f"VenvCache: removing incomplete build {path}")
+                shutil.rmtree(path, ignore_errors=True)
+
+    def create(self,
+               venv: VirtualEnv,
+               benchmark_name: str,
+               requirements_txt: Path | None,
+               device_type: str | None = None) -> dict[str, float]:
+        """
+        Create the venv and install the requirements
+
+        :return: duration in seconds per phase
+        """
+        logger.info(f"VenvCache[{benchmark_name}]: preparing venv: {venv.path}")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        timings_in_s = {}
+
+        start = time.monotonic()
+        result = subprocess.run([sys.executable, "-m", "venv", str(venv.path)],
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"VenvCache[{benchmark_name}]: preparing venv: {venv.path} failed"
+                               f" -- {result.stderr.decode('UTF-8')}")
+        timings_in_s['create'] = time.monotonic() - start
+
+        backend = installer_backend()
+        offline = False
+        if requirements_txt is not None:
+            offline = self.wheelhouse.contains(requirements_txt)
+            cmd = install_command(venv, requirements_txt, wheelhouse=self.wheelhouse, backend=backend)
+            logger.info(f"VenvCache[{benchmark_name}]: {' '.join(cmd)}")
+
+            start = time.monotonic()
+            result = subprocess.run(cmd, env=venv.env())
+            if result.returncode != 0:
+                raise RuntimeError(f"VenvCache[{benchmark_name}]: installing {requirements_txt} into {venv.path} failed")
+            timings_in_s['install'] = time.monotonic() - start
+
+        logger.info(f"VenvCache[{benchmark_name}]: venv {venv.path} ready -"
+                    f" {', '.join(f'{k}: {v:.1f} s' for k, v in timings_in_s.items())} ({backend=}, {offline=})")
+
+        with open(venv.path / VENV_COMPLETE_MARKER, "w") as f:
+            yaml.dump({
+                'benchmark': benchmark_name,
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'device_type': device_type or "cpu",
+                'requirements': requirements_txt.read_text() if requirements_txt else None,
+                'installer': backend,
+                'offline': offline,
+                'timings_in_s': timings_in_s
+            }, f)
+        return timings_in_s
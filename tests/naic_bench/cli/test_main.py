@@ -0,0 +1,70 @@
+import subprocess
+import sys
+
+import pytest
+
+from naic_bench.cli.main import SUBCOMMANDS, load_parser_class, selected_subcommand
+
+# Budget for the imports of 'naic-bench --version' (measured via python -X importtime), which
+# is called, e.g., from slurm prolog and epilog hooks
+IMPORT_TIME_BUDGET_IN_MS = 150
+
+# Dependencies that only the subcommands requiring them may import
+HEAVY_MODULES = ["docker", "pandas", "pyarrow", "numpy", "pydantic_settings", "slurm_monitor", "naic_bench.settings"]
+
+def import_times(args: list[str]) -> dict[str, float]:
+    """
+    Run the cli and get the cumulative import time (in ms) of the top-level imports after the interpreter startup
+    """
+    code = f"import sys; sys.argv = ['naic-bench'] + {args!r}; from naic_bench.cli.main import run; run()"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+
+    times = {}
+    startup = True
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+
+        _, cumulative, name = line.split("|")
+        # top-level imports are indented by a single space
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+
+        if startup:
+            startup = name.strip() != "site"
+            continue
+        times[name.strip()] = int(cumulative) / 1000.0
+    return times
+
+def imported_modules(args: list[str]) -> set[str]:
+    code = (f"import sys; sys.argv = ['naic-bench'] + {args!r}; from naic_bench.cli.main import run\n"
+            "try:\n    run()\nexcept SystemExit:\n    pass\n"
+            "print(' '.join(sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    # the modules are printed last, i.e., after the output of the cli
+    return set(result.stdout.splitlines()[-1].split())
+
+def test_selected_subcommand():
+    assert selected_subcommand(["--log-level", "DEBUG", "run", "--benchmark", "show"]) == "run"
+    assert selected_subcommand(["--version"]) is None
+
+@pytest.mark.parametrize("subcommand", SUBCOMMANDS.keys())
+def test_load_parser_class(subcommand):
+    parser_klass, _ = SUBCOMMANDS[subcommand]
+    assert load_parser_class(parser_klass).__name__ == parser_klass.split(":")[1]
+
+def test_lazy_imports():
+    modules = imported_modules(["--version"])
+    assert "naic_bench.cli.main" in modules
+    assert not [x for x in HEAVY_MODULES if x in modules]
+    assert not [x for x in modules if x.startswith("naic_bench.cli.") and x not in ["naic_bench.cli.main", "naic_bench.cli.base"]]
+
+    modules = imported_modules(["show", "--help"])
+    assert "naic_bench.cli.show" in modules
+    assert "naic_bench.cli.run" not in modules
+    assert "docker" not in modules
+
+def test_import_time_budget():
+    # best of several runs, to be robust against a busy machine
+    total = min(sum(import_times(["--version"]).values()) for _ in range(3))
+    assert total < IMPORT_TIME_BUDGET_IN_MS, f"'naic-bench --version' spends {total:.1f} ms on imports"
@@ -1,6 +1,27 @@
+import os
 from pathlib import Path
 import pytest
 
 @pytest.fixture
 def testdir() -> Path:
     return Path(__file__).parent
+
+@pytest.fixture
+def fake_smi(testdir, tmp_path, monkeypatch) -> Path:
+    """
+    Put fake vendor SMI tools (see data/bin) first into the PATH
+    """
+    monkeypatch.setenv("PATH", f"{testdir / 'data' / 'bin'}:{os.environ['PATH']}")
+    state_file = tmp_path / "fake-smi.state"
+    monkeypatch.setenv("FAKE_SMI_STATE_FILE", str(state_file))
+    return state_file
+
+@pytest.fixture
+def fake_slurm(testdir, tmp_path, monkeypatch) -> Path:
+    """
+    Put fake slurm tools (sbatch and squeue, see data/bin) first into the PATH
+    """
+    monkeypatch.setenv("PATH", f"{testdir / 'data' / 'bin'}:{os.environ['PATH']}")
+    state_file = tmp_path / "fake-slurm.state"
+    monkeypatch.setenv("FAKE_SLURM_STATE_FILE", str(state_file))
+    return state_file
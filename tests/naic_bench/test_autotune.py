@@ -0,0 +1,69 @@
+import pytest
+
+from naic_bench.autotune import BatchSizeSearch, ProbeResult, TuningCache, TuningResult, is_out_of_memory
+
+def synthetic_probe(oom_above: int, saturation: int):
+    """
+    Throughput grows with the batch size up to saturation, a larger batch size than oom_above fails
+    """
+    def probe(batch_size: int) -> ProbeResult:
+        if batch_size > oom_above:
+            return ProbeResult(batch_size=batch_size, out_of_memory=True)
+        return ProbeResult(batch_size=batch_size, throughput=float(min(batch_size, saturation)))
+    return probe
+
+def test_search_oom_bound():
+    search = BatchSizeSearch(probe=synthetic_probe(oom_above=100, saturation=1000), resolution=0.0)
+    best = search.search(start=16)
+    assert best.batch_size == 100
+    assert any(x.out_of_memory for x in search.probes)
+
+def test_search_start_fails():
+    search = BatchSizeSearch(probe=synthetic_probe(oom_above=20, saturation=1000), resolution=0.0)
+    assert search.search(start=64).batch_size == 20
+
+    search = BatchSizeSearch(probe=synthetic_probe(oom_above=0, saturation=1000))
+    assert search.search(start=8) is None
+
+def test_search_keeps_largest_without_throughput_loss():
+    def probe(batch_size: int) -> ProbeResult:
+        # throughput saturates at 64 and drops beyond 128
+        throughput = min(batch_size, 64) if batch_size <= 128 else 32
+        return ProbeResult(batch_size=batch_size, throughput=float(throughput))
+
+    search = BatchSizeSearch(probe=probe, resolution=0.0, max_probes=20)
+    assert search.search(start=8).batch_size == 128
+
+def test_search_max_probes():
+    search = BatchSizeSearch(probe=synthetic_probe(oom_above=10000, saturation=100000), max_probes=3)
+    search.search(start=1)
+    assert len(search.probes) == 3
+
+def test_is_out_of_memory():
+    assert is_out_of_memory(["torch.OutOfMemoryError: CUDA out of memory. Tried to allocate 2.00 GiB"])
+    assert not is_out_of_memory(["RuntimeError: shape mismatch"])
+
+def test_tuning_cache(tmp_path):
+    filename = tmp_path / "tuning.yaml"
+
+    TuningCache.clear()
+    cache = TuningCache.get_instance(filename)
+    assert cache.get("resnet", "fp16", "H100", 1) is None
+
+    result = TuningResult(benchmark="resnet", variant="fp16", gpu_model="H100", gpu_count=1,
+                          batch_size=512, metric="throughput", throughput=2500.0, estimated_batch_size=256,
+                          probes=[ProbeResult(batch_size=256, throughput=2000.0)])
+    cache.put(result)
+
+    # an independent cache (e.g. of another process) adds an entry
+    other = TuningCache(filename)
+    other.put(result.model_copy(update={"gpu_count": 2, "batch_size": 1024}))
+
+    cache.put(result.model_copy(update={"variant": "fp32", "batch_size": 256}))
+
+    TuningCache.clear()
+    reloaded = TuningCache.get_instance(filename)
+    assert reloaded.get("resnet", "fp16", "H100", 1).batch_size == 512
+    assert reloaded.get("resnet", "fp16", "H100", 2).batch_size == 1024
+    assert reloaded.get("resnet", "fp32", "H100", 1).batch_size == 256
+    assert reloaded.get("resnet", "fp16", "H100", 1).probes[0].throughput == pytest.approx(2000.0)
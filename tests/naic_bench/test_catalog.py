@@ -0,0 +1,40 @@
+import shutil
+
+from naic_bench.catalog import BenchmarkCatalog
+from naic_bench.settings import Config
+from naic_bench.spec import BenchmarkSpec
+
+def test_catalog(testdir, tmp_path, monkeypatch):
+    config = Config.initialize()
+    monkeypatch.setattr(config, "cache_dir", tmp_path / "cache")
+
+    confd_dir = tmp_path / "conf.d"
+    shutil.copytree(testdir / "data" / "conf.d", confd_dir)
+
+    BenchmarkCatalog.clear()
+    catalog = BenchmarkCatalog.get_instance(confd_dir=confd_dir, data_dir=tmp_path)
+    assert [x[:3] for x in catalog.as_list()] == [["pytorch", "a", "fp16"]]
+    assert BenchmarkCatalog.cache_file(confd_dir=confd_dir, data_dir=tmp_path).exists()
+
+    # loaded only once per process
+    assert BenchmarkCatalog.get_instance(confd_dir=confd_dir, data_dir=tmp_path) is catalog
+
+    # a new process uses the snapshot without parsing the spec files
+    BenchmarkCatalog.clear()
+    def fail_load_all(*args, **kwargs):
+        raise AssertionError("spec files should not be parsed")
+
+    with monkeypatch.context() as m:
+        m.setattr(BenchmarkSpec, "load_all", fail_load_all)
+        cached = BenchmarkCatalog.get_instance(confd_dir=confd_dir, data_dir=tmp_path)
+        assert cached.fingerprint == catalog.fingerprint
+        assert cached.specs["pytorch"]["a"]["fp16"].command == catalog.specs["pytorch"]["a"]["fp16"].command
+
+    # a modified spec file invalidates the snapshot
+    spec_file = confd_dir / "a.yaml"
+    spec_file.write_text(spec_file.read_text().replace("epochs: 2", "epochs: 3"))
+
+    BenchmarkCatalog.clear()
+    updated = BenchmarkCatalog.get_instance(confd_dir=confd_dir, data_dir=tmp_path)
+    assert updated.fingerprint != catalog.fingerprint
+    assert updated.specs["pytorch"]["a"]["fp16"].arguments["epochs"] == 3
@@ -0,0 +1,116 @@
+import json
+import time
+
+import pytest
+import yaml
+
+from naic_bench.compare import FAILED, IMPROVEMENT, MISSING, NEW, OK, REGRESSION, compare, flat_frame, load_results
+from naic_bench.results import ResultFilter
+from naic_bench.spec import Report
+from naic_bench.statistics import MetricStatistics
+
+def result(variant: str = "fp32",
+           throughput: float | None = 100.0,
+           samples: list[float] | None = None,
+           gpu_count: int = 1,
+           exit_code: int = 0,
+           **metrics) -> dict:
+    report = Report(benchmark="resnet",
+                    variant=variant,
+                    start_time=0,
+                    end_time=1,
+                    exit_code=exit_code,
+                    device_type="cuda",
+                    gpu_model="H100",
+                    gpu_count=gpu_count,
+                    metrics={"throughput": throughput, **metrics}
+    )
+    if samples:
+        report.statistics = {"throughput": MetricStatistics.from_samples(samples)}
+    return report.model_dump()
+
+def status(comparison, variant: str = "fp32", metric: str = "throughput") -> str:
+    row = comparison[(comparison["variant"] == variant) & (comparison["metric"] == metric)]
+    assert len(row) == 1
+    return row["status"].iloc[0]
+
+def test_compare_threshold():
+    baseline = flat_frame([result("fp32", 100.0), result("fp16", 200.0), result("amp", 100.0)])
+    candidate = flat_frame([result("fp32", 90.0), result("fp16", 198.0), result("amp", 120.0)])
+
+    comparison = compare(baseline, candidate, threshold=0.05)
+    assert status(comparison, "fp32") == REGRESSION
+    assert comparison[comparison["variant"] == "fp32"]["change"].iloc[0] == pytest.approx(-0.1)
+    assert status(comparison, "fp16") == OK
+    assert status(comparison, "amp") == IMPROVEMENT
+
+def test_compare_statistics():
+    noisy = [80.0, 120.0, 90.0, 110.0, 100.0]
+    stable = [100.0, 101.0, 99.0, 100.5, 99.5]
+    baseline = flat_frame([result("noisy", samples=noisy), result("stable", samples=stable)])
+    candidate = flat_frame([result("noisy", samples=[x - 8 for x in noisy]),
+                            result("stable", samples=[x - 8 for x in stable])])
+
+    comparison = compare(baseline, candidate, threshold=0.05)
+    # the same drop is not significant for noisy samples
+    assert status(comparison, "noisy") == OK
+    assert status(comparison, "stable") == REGRESSION
+
+def test_compare_pooled_baseline():
+    # multiple baseline runs form the samples of the baseline
+    baseline = flat_frame([result(throughput=x) for x in [100.0, 101.0, 99.0]])
+    candidate = flat_frame([result(throughput=x) for x in [90.0, 91.0, 89.0]])
+
+    comparison = compare(baseline, candidate)
+    row = comparison.iloc[0]
+    assert row["count_baseline"] == 3
+    assert row["mean_baseline"] == pytest.approx(100.0)
+    assert row["variance_baseline"] == pytest.approx(1.0)
+    assert row["status"] == REGRESSION
+
+def test_compare_failed_missing_new():
+    baseline = flat_frame([result("fp32"), result("fp16"), result("amp", latency=10.0)])
+    candidate = flat_frame([result("fp32", exit_code=1), result("bf16"), result("amp", latency=12.0)])
+
+    comparison = compare(baseline, candidate)
+    assert status(comparison, "fp32") == FAILED
+    assert status(comparison, "fp16") == MISSING
+    assert status(comparison, "bf16") == NEW
+    # lower is better for a latency
+    assert status(comparison, "amp", metric="latency") == REGRESSION
+
+def test_compare_matches_gpu_count():
+    baseline = flat_frame([result(gpu_count=1, throughput=100.0), result(gpu_count=2, throughput=200.0)])
+    candidate = flat_frame([result(gpu_count=2, throughput=199.0)])
+
+    comparison = compare(baseline, candidate)
+    assert comparison[comparison["gpu_count"] == 2]["status"].iloc[0] == OK
+    assert comparison[comparison["gpu_count"] == 1]["status"].iloc[0] == MISSING
+
+def test_load_results(tmp_path):
+    results = [result("fp32"), result("fp16")]
+    with open(tmp_path / "reports.json", "w") as f:
+        json.dump(results, f)
+
+    df = load_results(tmp_path / "reports.json", result_filter=ResultFilter(variants=["fp16"]))
+    assert list(df["variant"]) == ["fp16"]
+
+    result_dir = tmp_path / "results" / "resnet_fp32"
+    result_dir.mkdir(parents=True)
+    with open(result_dir / "report.yaml", "w") as f:
+        yaml.dump(results[0], f)
+
+    df = load_results(tmp_path / "results")
+    assert list(df["metrics.throughput"]) == [100.0]
+
+    with pytest.raises(ValueError):
+        load_results(tmp_path / "reports.txt")
+
+def test_compare_many_results():
+    baseline = flat_frame([result(f"v{i}", samples=[100.0, 101.0, 99.0]) for i in range(5000)])
+    candidate = flat_frame([result(f"v{i}", samples=[90.0, 91.0, 89.0]) for i in range(5000)])
+
+    start = time.monotonic()
+    comparison = compare(baseline, candidate)
+    assert time.monotonic() - start < 1.0
+    assert (comparison["status"] == REGRESSION).all()
@@ -1,5 +1,9 @@
 import pytest
-from naic_bench.docker import Docker
+from docker.errors import ImageNotFound
+
+from naic_bench.docker import CONTEXT_HASH_LABEL, NAIC_BENCH_COMMIT_LABEL, Docker, context_hash
+from naic_bench.settings import Config
+from naic_bench.utils import Command
 
 @pytest.mark.parametrize("device_type",[
     "nvidia",
@@ -11,3 +15,109 @@ from naic_bench.docker import Docker
 def test_dockerfile(device_type):
     dockerfile = Docker.dockerfile(device_type)
     assert dockerfile.exists()
+
+def test_context_hash(tmp_path):
+    (tmp_path / "Dockerfile.cpu").write_text("FROM python:3.10\n")
+    (tmp_path / "Dockerfile.rocm").write_text("FROM rocm\n")
+    (tmp_path / "requirements.txt").write_text("numpy\n")
+
+    digest = context_hash(tmp_path / "Dockerfile.cpu")
+    assert digest == context_hash(tmp_path / "Dockerfile.cpu")
+    assert digest != context_hash(tmp_path / "Dockerfile.cpu", build_args={"NAIC_BENCH_COMMIT": "abc"})
+
+    # other Dockerfiles are not part of the context
+    (tmp_path / "Dockerfile.rocm").write_text("FROM rocm:latest\n")
+    assert digest == context_hash(tmp_path / "Dockerfile.cpu")
+
+    (tmp_path / "requirements.txt").write_text("numpy\npandas\n")
+    assert digest != context_hash(tmp_path / "Dockerfile.cpu")
+
+def test_build_command(tmp_path):
+    dockerfile = tmp_path / "Dockerfile.cpu"
+    cmd = Docker.build_command("naic-bench/cpu", dockerfile, "1234", build_args={"NAIC_BENCH_COMMIT": "abc"}, cache_dir=tmp_path / "cache")
+    assert cmd[:3] == ["docker", "buildx", "build"]
+    assert f"type=local,src={tmp_path / 'cache'}" in cmd
+    assert f"{CONTEXT_HASH_LABEL}=1234" in cmd
+    assert "NAIC_BENCH_COMMIT=abc" in cmd
+    assert f"{NAIC_BENCH_COMMIT_LABEL}=abc" in cmd
+    assert "--no-cache" not in cmd
+    assert cmd[-1] == str(tmp_path)
+
+    cmd = Docker.build_command("naic-bench/cpu", dockerfile, "1234", no_cache=True)
+    assert cmd[:2] == ["docker", "build"]
+    assert "--no-cache" in cmd
+
+class FakeImage:
+    def __init__(self, labels: dict[str, str]):
+        self.labels = labels
+
+class FakeImages:
+    def __init__(self, images: dict[str, FakeImage]):
+        self.images = images
+
+    def get(self, name: str) -> FakeImage:
+        if name not in self.images:
+            raise ImageNotFound(name)
+        return self.images[name]
+
+class FakeClient:
+    def __init__(self, images: dict[str, FakeImage]):
+        self.images = FakeImages(images)
+
+def test_build_skips_up_to_date_image(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config.initialize(), "cache_dir", tmp_path)
+    monkeypatch.setattr(Docker, "naic_bench_commit", classmethod(lambda cls: "abc"))
+    monkeypatch.setattr(Docker, "buildx_available", classmethod(lambda cls: False))
+    monkeypatch.setattr(Command, "find", classmethod(lambda cls, **kwargs: "docker"))
+
+    commands = []
+    monkeypatch.setattr(Command, "run_with_progress", classmethod(lambda cls, cmd, **kwargs: commands.append(cmd)))
+
+    digest = context_hash(Docker.dockerfile("cpu"), build_args={"NAIC_BENCH_COMMIT": "abc"})
+    docker = Docker.__new__(Docker)
+    docker.client = FakeClient({"naic-bench/cpu": FakeImage({CONTEXT_HASH_LABEL: digest, NAIC_BENCH_COMMIT_LABEL: "abc"}),
+                                "naic-bench/outdated": FakeImage({CONTEXT_HASH_LABEL: "0000", NAIC_BENCH_COMMIT_LABEL: "abc"})})
+
+    assert not docker.build("cpu", image_name="naic-bench/cpu")
+    assert not docker.build("cpu", image_name="naic-bench/cpu", update=True)
+    assert commands == []
+
+    assert docker.build("cpu", image_name="naic-bench/cpu", force=True)
+    assert docker.build("cpu", image_name="naic-bench/outdated")
+    assert docker.build("cpu", image_name="naic-bench/missing")
+    assert len(commands) == 3
+    assert f"{CONTEXT_HASH_LABEL}={digest}" in commands[-1]
+
+def test_build_keeps_commit(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config.initialize(), "cache_dir", tmp_path)
+    monkeypatch.setattr(Docker, "buildx_available", classmethod(lambda cls: False))
+    monkeypatch.setattr(Command, "find", classmethod(lambda cls, **kwargs: "docker"))
+
+    commands = []
+    monkeypatch.setattr(Command, "run_with_progress", classmethod(lambda cls, cmd, **kwargs: commands.append(cmd)))
+
+    resolved = []
+    def naic_bench_commit(cls):
+        resolved.append(cls)
+        return "def"
+    monkeypatch.setattr(Docker, "naic_bench_commit", classmethod(naic_bench_commit))
+
+    digest = context_hash(Docker.dockerfile("cpu"), build_args={"NAIC_BENCH_COMMIT": "abc"})
+    docker = Docker.__new__(Docker)
+    docker.client = FakeClient({"naic-bench/cpu": FakeImage({CONTEXT_HASH_LABEL: digest, NAIC_BENCH_COMMIT_LABEL: "abc"}),
+                                "naic-bench/unlabeled": FakeImage({CONTEXT_HASH_LABEL: context_hash(Docker.dockerfile("cpu"))})})
+
+    # a newer commit of naic-bench is neither resolved nor built, unless requested
+    assert not docker.build("cpu", image_name="naic-bench/cpu")
+    assert not docker.build("cpu", image_name="naic-bench/unlabeled")
+    assert resolved == []
+    assert commands == []
+
+    assert docker.build("cpu", image_name="naic-bench/cpu", update=True)
+    assert "NAIC_BENCH_COMMIT=def" in commands[-1]
+
+    # offline, the commit of the existing image is kept
+    monkeypatch.setattr(Docker, "naic_bench_commit", classmethod(lambda cls: None))
+    assert not docker.build("cpu", image_name="naic-bench/cpu", update=True)
+    assert docker.build("cpu", image_name="naic-bench/cpu", force=True)
+    assert "NAIC_BENCH_COMMIT=abc" in commands[-1]
@@ -0,0 +1,42 @@
+import pytest
+
+from naic_bench.export import export_columnar, flatten
+
+def results():
+    for i in range(10):
+        yield {
+            "benchmark": "resnet",
+            "variant": "fp16" if i % 2 else "fp32",
+            "gpu_count": 1 + i,
+            "metrics": {"throughput": 100.0 + i if i != 3 else None},
+            "system_info": {"inventory": {"gpu_model": "H100", "uuids": ["GPU-1"]}}
+        }
+    # a result with an additional metric
+    yield {"benchmark": "bert", "variant": "fp16", "gpu_count": 2, "metrics": {"throughput": 5, "latency": 0.1}}
+
+def test_flatten():
+    assert flatten({"a": {"b": 1, "c": {"d": "x"}}, "e": [1, 2]}) == {"a.b": 1, "a.c.d": "x", "e": "[1, 2]"}
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_export_columnar(tmp_path, suffix):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    filename = tmp_path / f"reports{suffix}"
+    assert export_columnar(filename, results, row_group_size=4) == 11
+
+    if suffix == ".parquet":
+        table = pq.read_table(filename)
+        assert pq.ParquetFile(filename).num_row_groups == 3
+    else:
+        table = ipc.open_file(filename).read_all()
+
+    assert table.num_rows == 11
+    assert table.schema.field("gpu_count").type == pa.int64()
+    assert table.schema.field("metrics.throughput").type == pa.float64()
+    assert table.column("metrics.latency").to_pylist()[-1] == 0.1
+    assert table.column("system_info.inventory.uuids").to_pylist()[0] == '["GPU-1"]'
+
+    with pytest.raises(ValueError):
+        export_columnar(tmp_path / "reports.csv", results)
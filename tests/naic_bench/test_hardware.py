@@ -0,0 +1,58 @@
+import pytest
+
+from naic_bench.hardware import HardwareInventory
+from naic_bench.utils.gpus import GPU, Nvidia, nvidia_architecture
+
+def test_nvidia_device_properties(fake_smi):
+    properties = Nvidia.device_properties()
+    assert [x.index for x in properties] == ["0", "1"]
+    assert properties[0].uuid == "GPU-11111111-2222-3333-4444-555555555555"
+    assert properties[0].model == "NVIDIA H100 80GB HBM3"
+    assert properties[0].architecture == "hopper"
+    assert Nvidia.device_architecture() == "hopper"
+
+def test_nvidia_device_properties_without_compute_cap(fake_smi, monkeypatch):
+    monkeypatch.setenv("FAKE_SMI_NO_COMPUTE_CAP", "1")
+    properties = Nvidia.device_properties()
+    assert [x.index for x in properties] == ["0", "1"]
+    assert properties[0].model == "NVIDIA H100 80GB HBM3"
+    assert properties[0].memory_total_in_mb == 81559
+    assert properties[0].architecture is None
+
+def test_device_status_without_device_type(monkeypatch):
+    monkeypatch.setattr(HardwareInventory, "get_instance", classmethod(lambda cls: HardwareInventory(node="n001", framework=None, cpu_count=1)))
+    with pytest.raises(RuntimeError, match="not supported"):
+        GPU.device_status()
+
+def test_nvidia_architecture():
+    assert nvidia_architecture("7.0") == "volta"
+    assert nvidia_architecture("8.6") == "ampere"
+    assert nvidia_architecture("12.0") == "blackwell"
+    assert nvidia_architecture("1.0") is None
+
+def test_inventory(tmp_path, monkeypatch):
+    inventory = HardwareInventory(node="n001",
+            framework="cuda",
+            gpu_model="NVIDIA H100 80GB HBM3",
+            gpu_count=2,
+            gpu_memory_in_gb=79,
+            architecture="hopper",
+            uuids=["GPU-1", "GPU-2"],
+            cpu_count=64
+    )
+
+    monkeypatch.delenv("GPU_SIZE_IN_GB", raising=False)
+    assert inventory.device_memory_in_gb == 79
+    monkeypatch.setenv("GPU_SIZE_IN_GB", "40")
+    assert inventory.device_memory_in_gb == 40
+
+    inventory.save(tmp_path / "system_info.yaml", software={"torch": "2.9.0"})
+    loaded = HardwareInventory.load(tmp_path / "system_info.yaml")
+    assert loaded == inventory
+
+    try:
+        HardwareInventory.set_instance(inventory)
+        assert HardwareInventory.get_instance() is inventory
+        assert GPU.get_device_type() == ("nvidia", "hopper")
+    finally:
+        HardwareInventory.set_instance(None)
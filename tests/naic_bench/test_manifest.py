@@ -0,0 +1,54 @@
+import hashlib
+import os
+
+from naic_bench.manifest import DataVerifier, Manifest, sha256sum
+
+def test_sha256sum(tmp_path):
+    data = os.urandom(3*1024 + 17)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+
+    assert sha256sum(path, block_size=1024) == hashlib.sha256(data).hexdigest()
+
+def test_manifest(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    (data_dir / "bert" / "checkpoints").mkdir(parents=True)
+    (data_dir / "squad").mkdir()
+    (data_dir / "bert" / "checkpoints" / "bert.pt").write_bytes(os.urandom(4096))
+    (data_dir / "bert" / "vocab.txt").write_text("a\nb\n")
+    (data_dir / "squad" / "train.json").write_text("{}")
+
+    verifier = DataVerifier(data_dir, workers=4)
+    manifest = verifier.create_manifest("bert", ["bert", "squad"])
+    assert sorted(manifest.files) == ["bert/checkpoints/bert.pt", "bert/vocab.txt", "squad/train.json"]
+
+    manifest = Manifest.load(verifier.manifest_file("bert"))
+    assert verifier.verify(manifest).ok
+
+    # data that has not been prepared gets no manifest, and an empty manifest does not verify
+    assert verifier.create_manifest("gnmt", ["wmt16"]) is None
+    assert not verifier.manifest_file("gnmt").exists()
+    assert verifier.verify(Manifest(benchmark="gnmt", data_paths=["wmt16"])).unverified
+
+    # unchanged files are not hashed again
+    hashed = []
+    def counting_sha256sum(path):
+        hashed.append(path)
+        return sha256sum(path)
+    monkeypatch.setattr("naic_bench.manifest.sha256sum", counting_sha256sum)
+
+    train_json = data_dir / "squad" / "train.json"
+    mtime_ns = train_json.stat().st_mtime_ns
+    train_json.write_text("[]")
+    os.utime(train_json, ns=(mtime_ns, mtime_ns + 10**9))
+    (data_dir / "bert" / "vocab.txt").write_text("a\n")
+    (data_dir / "bert" / "checkpoints" / "bert.pt").unlink()
+    (data_dir / "bert" / "extra.txt").write_text("extra")
+
+    result = DataVerifier(data_dir).verify(manifest)
+    assert not result.ok
+    assert result.missing == ["bert/checkpoints/bert.pt"]
+    assert result.size_mismatch == ["bert/vocab.txt"]
+    assert result.checksum_mismatch == ["squad/train.json"]
+    assert result.unexpected == ["bert/extra.txt"]
+    assert [x.name for x in hashed] == ["train.json"]
@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from naic_bench.catalog import BenchmarkCatalog
+from naic_bench.manifest import DataVerifier
+from naic_bench.prepare import BenchmarkPrepare
+from naic_bench.settings import Config
+
+SPEC = """
+pytorch:
+  {name}:
+    repo:
+      url: https://github.com/2maz/naic-DeepLearningExamples.git
+    prepare:
+      data: {name}.prepare
+    command: python train.py
+    command_distributed: python train.py
+    metrics:
+      throughput:
+        pattern: "throughput: ([0-9.]+)"
+    variants:
+      fp16:
+        base_dir: PyTorch
+        batch_size:
+          size_1gb:
+            default: 8
+"""
+
+@pytest.fixture
+def benchmark_prepare(tmp_path, monkeypatch) -> BenchmarkPrepare:
+    confd_dir = tmp_path / "conf.d"
+    confd_dir.mkdir()
+    for name in ["a", "b", "c"]:
+        (confd_dir / f"{name}.yaml").write_text(SPEC.format(name=name))
+        script = confd_dir / f"{name}.prepare"
+        script.write_text(f"#!/bin/sh\nsleep 0.5\necho {name} >> $DATA_DIR/calls\n")
+        script.chmod(0o755)
+
+    monkeypatch.setattr(Config.initialize(), "cache_dir", tmp_path / "cache")
+    monkeypatch.setattr(BenchmarkPrepare, "clone", lambda self, spec: tmp_path / "benchmarks")
+    BenchmarkCatalog.clear()
+    return BenchmarkPrepare(data_dir=tmp_path / "data", benchmarks_dir=tmp_path / "benchmarks", confd_dir=confd_dir)
+
+def test_prepare_parallel_and_resumable(benchmark_prepare):
+    data_dir = benchmark_prepare.data_dir
+    data_dir.mkdir()
+
+    start = time.monotonic()
+    tasks = benchmark_prepare.prepare(jobs=3)
+    assert time.monotonic() - start < 1.4
+    assert sorted(x.name for x in tasks) == ["a.prepare", "b.prepare", "c.prepare"]
+    assert sorted((data_dir / "calls").read_text().split()) == ["a", "b", "c"]
+    assert (benchmark_prepare.state_dir / "a.prepare.log").exists()
+
+    # completed scripts are skipped, unless they change
+    assert benchmark_prepare.prepare(jobs=3) == []
+
+    script = benchmark_prepare.confd_dir / "b.prepare"
+    script.write_text(script.read_text() + "echo changed\n")
+    assert [x.name for x in benchmark_prepare.prepare(jobs=3)] == ["b.prepare"]
+
+    assert [x.name for x in benchmark_prepare.prepare(["a"], force=True)] == ["a.prepare"]
+
+def test_prepare_fail_fast(benchmark_prepare):
+    benchmark_prepare.data_dir.mkdir()
+    (benchmark_prepare.confd_dir / "a.prepare").write_text("#!/bin/sh\necho 'download failed'\nexit 3\n")
+    (benchmark_prepare.confd_dir / "b.prepare").write_text("#!/bin/sh\nsleep 30\n")
+
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="a.prepare"):
+        benchmark_prepare.prepare(jobs=2)
+    assert time.monotonic() - start < 10
+
+    state_dir = benchmark_prepare.state_dir
+    assert "download failed" in (state_dir / "a.prepare.log").read_text()
+    assert not (state_dir / "a.prepare.stamp").exists()
+    assert not (state_dir / "b.prepare.stamp").exists()
+    assert not (state_dir / "c.prepare.stamp").exists()
+
+def test_prepare_manifests(benchmark_prepare, monkeypatch):
+    data_dir = benchmark_prepare.data_dir
+    data_dir.mkdir()
+    for name in ["a", "b", "c"]:
+        (data_dir / name).mkdir()
+        (data_dir / name / "data.bin").write_text(name)
+    monkeypatch.setattr(BenchmarkPrepare, "data_paths",
+                        lambda self, names=None: {x: [x] for x in ["a", "b", "c"] if not names or x in names})
+
+    # without a manifest the data cannot be verified
+    results = benchmark_prepare.verify()
+    assert [x.unverified for x in results] == [True, True, True]
+    assert not any(x.ok for x in results)
+    assert not DataVerifier(data_dir).manifest_file("a").exists()
+
+    tasks = benchmark_prepare.prepare(jobs=3)
+    assert benchmark_prepare.prepared_benchmarks(tasks) == ["a", "b", "c"]
+    benchmark_prepare.create_manifests()
+    assert all(x.ok for x in benchmark_prepare.verify())
+
+    # the manifest of data that has not been prepared again is kept, so that corrupted data is detected
+    (data_dir / "a" / "data.bin").write_text("corrupted")
+    script = benchmark_prepare.confd_dir / "b.prepare"
+    script.write_text(script.read_text() + "echo changed\n")
+    tasks = benchmark_prepare.prepare(jobs=3)
+    assert benchmark_prepare.prepared_benchmarks(tasks) == ["b"]
+    benchmark_prepare.create_manifests(benchmark_prepare.prepared_benchmarks(tasks), force=True)
+
+    results = {x.benchmark: x for x in benchmark_prepare.verify()}
+    assert not results["a"].ok
+    assert results["b"].ok and results["c"].ok
@@ -0,0 +1,54 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from naic_bench.repository import RepositoryMirror
+from naic_bench.spec import Repository
+
+def git(*args, cwd: Path) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, stdout=subprocess.PIPE, text=True).stdout.strip()
+
+@pytest.fixture
+def upstream(tmp_path) -> Path:
+    path = tmp_path / "upstream"
+    path.mkdir()
+    git("init", "-q", "-b", "main", cwd=path)
+    git("config", "user.email", "test@example.com", cwd=path)
+    git("config", "user.name", "test", cwd=path)
+    for i in range(2):
+        (path / "README.md").write_text(f"version {i}\n")
+        git("add", "README.md", cwd=path)
+        git("commit", "-q", "-m", f"version {i}", cwd=path)
+    git("branch", "feature", cwd=path)
+    return path
+
+def test_mirror_checkout(upstream, tmp_path):
+    url = f"file://{upstream}"
+    first_commit = git("rev-parse", "HEAD~1", cwd=upstream)
+
+    mirror = RepositoryMirror(url, mirrors_dir=tmp_path / "benchmarks" / ".mirrors")
+    main = mirror.checkout(tmp_path / "benchmarks" / "main", branch="main")
+    pinned = mirror.checkout(tmp_path / "benchmarks" / "pinned", branch="main", commit=first_commit)
+    assert (main / "README.md").read_text() == "version 1\n"
+    assert (pinned / "README.md").read_text() == "version 0\n"
+
+    # all checkouts share the mirror
+    assert len(list((tmp_path / "benchmarks" / ".mirrors").glob("*.git"))) == 1
+    assert (main / ".git").is_file()
+
+    # a new upstream commit is fetched, once it is required
+    (upstream / "README.md").write_text("version 2\n")
+    git("commit", "-q", "-am", "version 2", cwd=upstream)
+    latest = git("rev-parse", "HEAD", cwd=upstream)
+
+    checkout = Repository(url=url, branch="main", commit=latest).checkout(main, mirrors_dir=mirror.path.parent)
+    assert checkout == main
+    assert git("rev-parse", "HEAD", cwd=main) == latest
+    assert (main / "README.md").read_text() == "version 2\n"
+
+def test_repository_clone(upstream, tmp_path):
+    repo = Repository(url=f"file://{upstream}", branch="feature")
+    checkout = repo.clone(tmp_path / "work", name="upstream")
+    assert checkout == tmp_path / "work" / "upstream"
+    assert (checkout / "README.md").read_text() == "version 1\n"
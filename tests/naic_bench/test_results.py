@@ -0,0 +1,63 @@
+import os
+
+import yaml
+
+from naic_bench.results import ResultFilter, ResultsIndex
+from naic_bench.spec import Report
+
+def write_result(result_dir, benchmark: str, variant: str, throughput: float):
+    result_dir.mkdir(parents=True, exist_ok=True)
+    report = Report(benchmark=benchmark, variant=variant, start_time=0, end_time=10,
+                    device_type="cuda", gpu_count=1, metrics={"throughput": throughput})
+    with open(result_dir / "report.yaml", "w") as f:
+        yaml.dump(report.model_dump(), f)
+    with open(result_dir / "system_info.yaml", "w") as f:
+        yaml.dump({"inventory": {"node": "n001", "gpu_model": "H100"}}, f)
+
+def test_results_index(tmp_path):
+    base_dir = tmp_path / "results"
+    write_result(base_dir / "pytorch-gpus:1" / "resnet_fp16", "resnet", "fp16", 100.0)
+    write_result(base_dir / "pytorch-gpus:1" / "resnet_fp32", "resnet", "fp32", 50.0)
+    # probe runs of the batch size search are not results
+    write_result(base_dir / "pytorch-gpus:1" / "resnet_fp32" / "autotune" / "batch_size-8", "resnet", "fp32", 10.0)
+
+    with ResultsIndex(base_dir) as index:
+        assert index.update(workers=2) == (2, 0)
+        results = list(index.results())
+        assert [x["variant"] for x in results] == ["fp16", "fp32"]
+        assert results[0]["system_info"]["inventory"]["gpu_model"] == "H100"
+
+    report_file = base_dir / "pytorch-gpus:1" / "resnet_fp16" / "report.yaml"
+    write_result(report_file.parent, "resnet", "fp16", 120.0)
+    mtime_ns = report_file.stat().st_mtime_ns
+    os.utime(report_file, ns=(mtime_ns, mtime_ns + 10**9))
+    write_result(base_dir / "pytorch-gpus:2" / "resnet_fp16", "resnet", "fp16", 190.0)
+
+    with ResultsIndex(base_dir) as index:
+        # only new or modified results are parsed again
+        assert index.update() == (2, 0)
+        assert [x["metrics"]["throughput"] for x in index.results()] == [120.0, 50.0, 190.0]
+
+        (base_dir / "pytorch-gpus:1" / "resnet_fp32" / "report.yaml").unlink()
+        assert index.update() == (0, 1)
+        assert len(index) == 2
+
+def test_results_filter(tmp_path):
+    base_dir = tmp_path / "results"
+    write_result(base_dir / "pytorch-gpus:1" / "resnet_fp16", "resnet", "fp16", 100.0)
+    write_result(base_dir / "pytorch-gpus:1" / "resnet_fp32", "resnet", "fp32", 50.0)
+    write_result(base_dir / "pytorch-gpus:1" / "bert_large_fp16", "bert_large", "fp16", 20.0)
+
+    result_filter = ResultFilter(benchmarks=["resnet"], variants=["fp16"])
+    assert result_filter.matches_dir("resnet_fp16")
+    assert not result_filter.matches_dir("resnet_fp32")
+    assert not result_filter.matches_dir("bert_large_fp16")
+
+    with ResultsIndex(base_dir) as index:
+        # directories that do not match are not parsed
+        assert index.update(result_filter=result_filter) == (1, 0)
+        assert [x["benchmark"] for x in index.results(result_filter)] == ["resnet"]
+
+        assert index.update() == (2, 0)
+        assert len(list(index.results(ResultFilter(variants=["fp16"])))) == 2
+        assert len(list(index.results(ResultFilter(device_types=["xpu"])))) == 0
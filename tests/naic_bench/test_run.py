@@ -0,0 +1,34 @@
+import time
+
+from naic_bench.run import BenchmarkRunner
+from naic_bench.spec import Report
+
+def test_execute_repeated_tunes_once(tmp_path, monkeypatch):
+    runner = BenchmarkRunner(data_dir=tmp_path, benchmarks_dir=tmp_path, confd_dir=None)
+
+    tunings = []
+    def tuned_batch_size(**kwargs):
+        tunings.append(kwargs)
+        return 48
+
+    runs = []
+    def execute(output_dir, **kwargs):
+        runs.append(kwargs)
+        output_dir.mkdir(parents=True)
+        (output_dir / "system_info.yaml").touch()
+        now = int(time.time())
+        return Report(benchmark=kwargs["name"], variant=kwargs["variant"], start_time=now, end_time=now,
+                      device_type="cpu", gpu_count=1, metrics={"throughput": 1.0}, batch_size=kwargs["batch_size"])
+
+    monkeypatch.setattr(runner, "tuned_batch_size", tuned_batch_size)
+    monkeypatch.setattr(runner, "execute", execute)
+
+    report = runner.execute_repeated(framework="pytorch", name="gnmt", variant="fp32",
+                    repeat=3, warmup_runs=2, output_dir=tmp_path / "output",
+                    device_type="cpu", autotune=True, retune=True)
+
+    assert len(tunings) == 1
+    assert tunings[0]["retune"]
+    assert len(runs) == 5
+    assert all(x["batch_size"] == 48 and not x["retune"] and not x["autotune"] for x in runs)
+    assert report.batch_size == 48
@@ -0,0 +1,59 @@
+import pytest
+
+from naic_bench.scaling import ScalingReport
+from naic_bench.spec import Report
+
+def report(variant: str, gpu_count: int, throughput: float | None, exit_code: int = 0) -> Report:
+    return Report(benchmark="resnet",
+                  variant=variant,
+                  start_time=0,
+                  end_time=1,
+                  exit_code=exit_code,
+                  device_type="cuda",
+                  gpu_count=gpu_count,
+                  metrics={"throughput": throughput}
+    )
+
+def test_scaling_report(tmp_path):
+    reports = [report("fp32", 1, 100.0),
+               report("fp32", 2, 190.0),
+               report("fp32", 4, 360.0),
+               report("fp16", 1, 200.0),
+               report("fp16", 2, 300.0, exit_code=1)
+    ]
+
+    scaling = ScalingReport.from_reports(reports)
+    assert scaling.baseline_gpu_count == 1
+
+    entries = {(x.variant, x.gpu_count): x for x in scaling.entries}
+    assert entries[("fp32", 1)].speedup == pytest.approx(1.0)
+    assert entries[("fp32", 2)].speedup == pytest.approx(1.9)
+    assert entries[("fp32", 2)].efficiency == pytest.approx(0.95)
+    assert entries[("fp32", 4)].efficiency == pytest.approx(0.9)
+
+    # failed runs do not contribute a value
+    assert entries[("fp16", 2)].value is None
+    assert entries[("fp16", 2)].efficiency is None
+
+    scaling.save(tmp_path / "scaling.yaml")
+    assert ScalingReport.load(tmp_path / "scaling.yaml") == scaling
+
+def test_scaling_report_baseline():
+    scaling = ScalingReport.from_reports([report("fp32", 2, 100.0), report("fp32", 8, 350.0)])
+    assert scaling.baseline_gpu_count == 2
+    assert scaling.entries[1].speedup == pytest.approx(3.5)
+    assert scaling.entries[1].efficiency == pytest.approx(0.875)
+
+    with pytest.raises(ValueError):
+        ScalingReport.from_reports([])
+
+def test_scaling_report_lower_is_better():
+    reports = [report("fp32", 1, 100.0), report("fp32", 4, 320.0)]
+    reports[0].metrics["latency_in_s"] = 2.0
+    reports[1].metrics["latency_in_s"] = 0.8
+
+    entries = {(x.metric, x.gpu_count): x for x in ScalingReport.from_reports(reports).entries}
+    assert entries[("throughput", 4)].speedup == pytest.approx(3.2)
+    # a lower latency is a speedup
+    assert entries[("latency_in_s", 4)].speedup == pytest.approx(2.5)
+    assert entries[("latency_in_s", 4)].efficiency == pytest.approx(0.625)
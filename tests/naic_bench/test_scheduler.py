@@ -0,0 +1,89 @@
+import pytest
+import threading
+import time
+
+from naic_bench.scheduler import DevicePool, ReadinessProbe, available_devices, used_devices, visible_devices_env
+from naic_bench.utils.gpus import GPU
+
+@pytest.mark.parametrize("device_type,expected", [
+    ["cuda", "CUDA_VISIBLE_DEVICES"],
+    ["nvidia-volta", "CUDA_VISIBLE_DEVICES"],
+    ["rocm", "HIP_VISIBLE_DEVICES"],
+    ["hpu", "HABANA_VISIBLE_DEVICES"],
+])
+def test_visible_devices_env(device_type, expected):
+    assert visible_devices_env(device_type, ["0", "3"]) == { expected: "0,3" }
+
+def test_available_devices(monkeypatch):
+    monkeypatch.delenv("CUDA_VISIBLE_DEVICES", raising=False)
+    assert available_devices("cuda", 4) == ["0", "1", "2", "3"]
+
+    monkeypatch.setenv("CUDA_VISIBLE_DEVICES", "2,5")
+    assert available_devices("cuda", 4) == ["2", "5"]
+
+def test_used_devices(monkeypatch):
+    monkeypatch.delenv("CUDA_VISIBLE_DEVICES", raising=False)
+    assert used_devices("cuda", gpu_count=2) == ["0", "1"]
+    assert used_devices("cuda", gpu_count=1, env={"CUDA_VISIBLE_DEVICES": "3,1"}) == ["3"]
+    assert used_devices("cpu", gpu_count=1) is None
+    assert used_devices("unknown", gpu_count=1) is None
+
+def test_device_pool_disjoint():
+    pool = DevicePool(devices=["0", "1", "2", "3"])
+
+    a = pool.acquire(2)
+    b = pool.acquire(2)
+    assert len(set(a + b)) == 4
+
+    with pytest.raises(ValueError):
+        pool.acquire(5)
+
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(pool.acquire(1)))
+    thread.start()
+    time.sleep(0.1)
+    assert not acquired
+
+    pool.release(b)
+    thread.join(timeout=5)
+    assert acquired and acquired[0][0] in b
+
+def test_device_pool_cooldown():
+    pool = DevicePool(devices=["0", "1"], cooldown_in_s=0.5)
+
+    first = pool.acquire(1)
+    pool.release(first)
+
+    # the other device has not been used, so it is ready immediately
+    start = time.monotonic()
+    second = pool.acquire(1)
+    assert second != first
+    assert time.monotonic() - start < 0.2
+
+    # the first device needs to cool down
+    third = pool.acquire(1)
+    assert third == first
+    assert time.monotonic() - start >= 0.4
+
+def test_device_status(fake_smi):
+    status = GPU.device_status(device_type="cuda")
+    assert [x.index for x in status] == ["0", "1"]
+    assert status[0].temperature == 38
+    assert status[0].power_in_w == 61.2
+    assert status[1].utilization is None
+
+def test_readiness_probe(fake_smi, monkeypatch):
+    monkeypatch.setenv("FAKE_SMI_BUSY_CALLS", "2")
+
+    probe = ReadinessProbe(device_type="cuda", max_wait_in_s=10, poll_interval_in_s=0.1)
+    # device 1 is idle from the start
+    assert probe.wait(devices=["1"]) < 0.1
+
+    waited = probe.wait(devices=["0"])
+    assert 0.05 < waited < 5
+
+def test_readiness_probe_upper_bound(fake_smi, monkeypatch):
+    monkeypatch.setenv("FAKE_SMI_BUSY_CALLS", "1000")
+
+    probe = ReadinessProbe(device_type="cuda", max_wait_in_s=0.3, poll_interval_in_s=0.1)
+    assert 0.3 <= probe.wait() < 1.0
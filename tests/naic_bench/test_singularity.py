@@ -0,0 +1,109 @@
+import os
+import stat
+
+import pytest
+
+import naic_bench.singularity
+from naic_bench.singularity import SifSource, Singularity
+from naic_bench.utils import Command
+
+FAKE_SINGULARITY = """#!/bin/bash
+# Fake singularity: record the arguments and create the image (build --force <image> <source>)
+echo "$@" >> $FAKE_SINGULARITY_LOG
+echo "sif" > $3
+"""
+
+@pytest.fixture
+def fake_singularity(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    singularity = bin_dir / "singularity"
+    singularity.write_text(FAKE_SINGULARITY)
+    singularity.chmod(singularity.stat().st_mode | stat.S_IEXEC)
+
+    log = tmp_path / "singularity.log"
+    monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_SINGULARITY_LOG", str(log))
+    return log
+
+class FakeImage:
+    def __init__(self, id: str):
+        self.id = id
+        self.attrs = {"Size": 2 * 1024**3}
+
+class FakeDocker:
+    image_id = "sha256:1111"
+
+    def build(self, device_type: str, image_name: str, force: bool = False, update: bool = False):
+        return False
+
+    def image(self, name: str):
+        return FakeImage(self.image_id)
+
+def test_sif_source(tmp_path):
+    sif_image = tmp_path / "image.sif"
+    source = SifSource(docker_image="naic-bench/cpu", image_id="sha256:1111", method="docker-daemon")
+    source.save(sif_image)
+
+    # the image itself is missing
+    assert SifSource.load(sif_image) is None
+
+    sif_image.write_text("sif")
+    assert SifSource.load(sif_image) == source
+
+def test_convert(fake_singularity, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sif_image = tmp_path / "images" / "image.sif"
+    Singularity.convert("naic-bench/cpu-x86_64", sif_image, scratch_dir=tmp_path / "scratch")
+
+    assert sif_image.read_text() == "sif\n"
+    args = fake_singularity.read_text().split()
+    assert args[-1] == "docker-daemon://naic-bench/cpu-x86_64:latest"
+
+    # no intermediate archive or temporary image is left
+    assert not list(tmp_path.glob("*.tar"))
+    assert [x.name for x in sif_image.parent.iterdir()] == ["image.sif"]
+    assert not list((tmp_path / "scratch").iterdir())
+
+    with pytest.raises(ValueError):
+        Singularity.convert("naic-bench/cpu", sif_image, method="docker-archive")
+
+def test_build_skips_converted_image(fake_singularity, tmp_path, monkeypatch):
+    monkeypatch.setattr(naic_bench.singularity, "Docker", FakeDocker)
+    monkeypatch.setattr(Command, "find", classmethod(lambda cls, **kwargs: "docker"))
+
+    sif_image = tmp_path / "image.sif"
+    assert Singularity.build("cpu", sif_image=str(sif_image), docker_image="naic-bench/cpu")
+    assert SifSource.load(sif_image).image_id == "sha256:1111"
+    assert SifSource.load(sif_image).image_size_in_bytes == 2 * 1024**3
+
+    assert not Singularity.build("cpu", sif_image=str(sif_image), docker_image="naic-bench/cpu")
+    assert Singularity.build("cpu", sif_image=str(sif_image), docker_image="naic-bench/cpu", force=True)
+
+    monkeypatch.setattr(FakeDocker, "image_id", "sha256:2222")
+    assert Singularity.build("cpu", sif_image=str(sif_image), docker_image="naic-bench/cpu")
+    assert len(fake_singularity.read_text().splitlines()) == 3
+
+def test_run_converts_only_changed_images(fake_singularity, tmp_path, monkeypatch):
+    monkeypatch.setattr(naic_bench.singularity, "Docker", FakeDocker)
+    monkeypatch.setattr(Command, "find", classmethod(lambda cls, **kwargs: "docker"))
+    monkeypatch.setattr(Singularity, "status", classmethod(lambda cls, instance_name, image_name: (image_name, False)))
+
+    sif_image = tmp_path / "image.sif"
+    run = dict(data_dir=None, device_type="cpu", docker_image="naic-bench/cpu", image_name=str(sif_image), build_only=True)
+    Singularity.run(**run)
+    Singularity.run(**run)
+    assert len(fake_singularity.read_text().splitlines()) == 1
+
+    # an existing image is converted again once the docker image changes
+    monkeypatch.setattr(FakeDocker, "image_id", "sha256:2222")
+    Singularity.run(**run)
+    assert len(fake_singularity.read_text().splitlines()) == 2
+
+    Singularity.run(**run, rebuild_singularity=True)
+    assert len(fake_singularity.read_text().splitlines()) == 3
+
+    # without docker (e.g., on a compute node) the existing image is used
+    monkeypatch.setattr(Command, "find", classmethod(lambda cls, **kwargs: None))
+    Singularity.run(**run)
+    assert len(fake_singularity.read_text().splitlines()) == 3
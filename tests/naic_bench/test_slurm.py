@@ -0,0 +1,123 @@
+import subprocess
+
+import pytest
+
+from naic_bench.slurm import (
+    DEFAULT_RUNTIME_IN_S,
+    JOB_OVERHEAD_IN_S,
+    RUNTIME_MARGIN,
+    RuntimeHistory,
+    SlurmJob,
+    SlurmSubmitter,
+    format_time_limit,
+)
+
+SELECTION = [("resnet50", "fp32"), ("resnet50", "amp"), ("bert", "fp16")]
+
+def result(benchmark: str, variant: str, gpu_count: int, runtime: int) -> dict:
+    return {"benchmark": benchmark, "variant": variant, "gpu_count": gpu_count, "start_time": 1000, "end_time": 1000 + runtime}
+
+def test_format_time_limit():
+    assert format_time_limit(59) == "0-00:00:59"
+    assert format_time_limit(3 * 3600 + 61) == "0-03:01:01"
+    assert format_time_limit(2 * 86400 + 3600) == "2-01:00:00"
+
+def test_runtime_history():
+    history = RuntimeHistory.from_results([
+        result("resnet50", "fp32", 1, 100),
+        result("resnet50", "fp32", 1, 300),
+        result("resnet50", "fp32", 4, 50),
+        {"benchmark": "bert", "variant": "fp16"}
+    ])
+
+    assert history.estimate("resnet50", "fp32", 1) == 300
+    assert history.estimate("resnet50", "fp32", 4) == 50
+    # falls back to the runs with other gpu counts, and then to the default
+    assert history.estimate("resnet50", "fp32", 2) == 300
+    assert history.estimate("bert", "fp16", 1) == DEFAULT_RUNTIME_IN_S
+
+def test_plan():
+    history = RuntimeHistory.from_results([result("resnet50", "fp32", 1, 100), result("resnet50", "amp", 1, 200)])
+    submitter = SlurmSubmitter(scripts_dir="slurm")
+
+    jobs = submitter.plan(SELECTION, nodes=["n001", "n002"], partitions=["hgx2q"], history=history, repeat=2)
+    assert [x.name for x in jobs] == ["naic-bench-n001", "naic-bench-n002", "naic-bench-hgx2q"]
+    assert [x.node for x in jobs] == ["n001", "n002", None]
+    assert jobs[2].partition == "hgx2q"
+
+    expected = int((100 + 200 + DEFAULT_RUNTIME_IN_S) * 2 * RUNTIME_MARGIN + JOB_OVERHEAD_IN_S)
+    assert all(x.time_limit_in_s == expected for x in jobs)
+
+    # array tasks only need to cover the longest benchmark variant
+    jobs = submitter.plan(SELECTION, nodes=["n001"], history=history, array=True)
+    assert jobs[0].time_limit_in_s == int(DEFAULT_RUNTIME_IN_S * RUNTIME_MARGIN + JOB_OVERHEAD_IN_S)
+
+    with pytest.raises(ValueError):
+        submitter.plan(SELECTION)
+
+    with pytest.raises(ValueError):
+        submitter.plan([], nodes=["n001"])
+
+@pytest.mark.parametrize("array", [False, True])
+def test_script_content(tmp_path, array):
+    job = SlurmJob(name="naic-bench-n001",
+                   node="n001",
+                   account="ec12",
+                   gpu_count=2,
+                   selection=SELECTION,
+                   array=array,
+                   time_limit_in_s=5400,
+                   run_args=["--data-dir", "/data dir", "--gpu-count", "2"],
+                   prolog=["source venv/bin/activate"],
+                   log_dir=tmp_path / "logs")
+
+    content = job.script_content()
+    assert "#SBATCH --nodelist=n001" in content
+    assert "#SBATCH --account=ec12" in content
+    assert "#SBATCH --gres=gpu:2" in content
+    assert "#SBATCH --time=0-01:30:00" in content
+    assert "source venv/bin/activate" in content
+    assert "naic-bench run --data-dir '/data dir' --gpu-count 2" in content
+
+    if array:
+        assert "#SBATCH --array=0-2" in content
+        assert "%A_%a.log" in content
+        assert "BENCHMARKS=(resnet50 resnet50 bert)" in content
+        assert "VARIANTS=(fp32 amp fp16)" in content
+    else:
+        assert "--array" not in content
+        assert "--benchmark resnet50 --variant fp32 amp" in content
+        assert "--benchmark bert --variant fp16" in content
+
+    script = tmp_path / "job.sh"
+    script.write_text(content)
+    subprocess.run(["bash", "-n", str(script)], check=True)
+
+def test_submit(fake_slurm, tmp_path):
+    submitter = SlurmSubmitter(scripts_dir=tmp_path / "slurm")
+    jobs = submitter.submit(submitter.plan(SELECTION, nodes=["n001", "n002"], array=True))
+
+    assert [x.job_id for x in jobs] == ["1001", "1002"]
+    assert all(x.script.exists() for x in jobs)
+    submitted = fake_slurm.with_suffix(".state.jobs").read_text().splitlines()
+    assert submitted == [f"1001 {jobs[0].script}", f"1002 {jobs[1].script}"]
+
+    # submissions are accumulated
+    submitter.submit(submitter.plan(SELECTION, partitions=["hgx2q"]))
+    submissions = submitter.submissions()
+    assert [x.job_id for x in submissions] == ["1001", "1002", "1003"]
+    assert submissions[0].selection == SELECTION
+
+    assert SlurmSubmitter.status([x.job_id for x in submissions]) == {"1001": "PENDING", "1002": "PENDING", "1003": "PENDING"}
+    assert SlurmSubmitter.status([]) == {}
+
+def test_submit_failure(fake_slurm, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_SBATCH_FAIL", "naic-bench-invalid")
+    submitter = SlurmSubmitter(scripts_dir=tmp_path / "slurm")
+    jobs = submitter.plan(SELECTION, nodes=["n001"], partitions=["invalid", "hgx2q"])
+
+    with pytest.raises(RuntimeError, match=r"naic-bench-invalid\.sh failed .* Invalid partition .*already submitted: naic-bench-n001 \(1001\)"):
+        submitter.submit(jobs)
+
+    # the jobs submitted before the failure are recorded
+    assert [x.job_id for x in submitter.submissions()] == ["1001"]
@@ -1,4 +1,5 @@
 import pytest
+from naic_bench.settings import Config
 from naic_bench.spec import BenchmarkSpec
 from naic_bench.utils import find_confd
 
@@ -37,3 +38,86 @@ def test_metrics(name, metric, expected, teststring, tmp_path):
 
     for variant, spec in config.items():
         assert spec.extract_metrics(teststring)[metric] == expected
+
+def test_metrics_extractor(tmp_path):
+    benchmarks = BenchmarkSpec.load_all(confd_dir=find_confd(), data_dir=tmp_path)
+    spec = benchmarks["pytorch"]["transformerxl_base"]["fp16"]
+
+    extractor = spec.metrics_extractor()
+    assert not extractor.complete()
+    assert extractor.values() == {"throughput": None}
+
+    for line in ["Training throughput: 100 Tok/s", "some other output", "Training throughput: 300 Tok/s"]:
+        extractor.feed(line)
+
+    assert extractor.complete()
+    assert not extractor.complete(min_samples=3)
+    assert extractor.values() == {"throughput": 300.0}
+
+    aggregate = extractor.aggregates["throughput"]
+    assert aggregate.count == 2
+    assert aggregate.mean == 200.0
+    assert aggregate.min == 100.0
+    assert aggregate.max == 300.0
+
+    assert list(extractor.samples["throughput"]) == [100.0, 300.0]
+    assert list(spec.extract_samples(["Training throughput: 5 Tok/s", "Training throughput: 7 Tok/s"])["throughput"]) == [5.0, 7.0]
+
+def test_metrics_extractor_stable(tmp_path):
+    benchmarks = BenchmarkSpec.load_all(confd_dir=find_confd(), data_dir=tmp_path)
+    spec = benchmarks["pytorch"]["transformerxl_base"]["fp16"]
+
+    extractor = spec.metrics_extractor(window=3)
+    for value in [100, 1000, 1010]:
+        extractor.feed(f"Training throughput: {value} Tok/s")
+    assert not extractor.stable(tolerance=0.05)
+
+    extractor.feed("Training throughput: 1005 Tok/s")
+    assert extractor.stable(tolerance=0.05)
+
+    with pytest.raises(RuntimeError):
+        spec.metrics_extractor().stable()
+
+def test_load_without_side_effects(testdir, tmp_path, monkeypatch):
+    config = Config.initialize()
+    monkeypatch.setattr(config, "output_base_dir", tmp_path / "output")
+
+    specfile = testdir / "data" / "conf.d" / "a.yaml"
+    bc = BenchmarkSpec.load(config_filename=specfile, data_dir=tmp_path)["pytorch"]["a"]["fp16"]
+
+    data = bc.model_dump()
+    assert "temp_dir" not in data
+    assert "device_memory_in_gb" not in data["batch_size"]
+    assert bc.arguments["save-dir"] == "{{TMP_DIR}}"
+    assert not bc.temp_dir.exists()
+
+    assert bc.create_temp_dir() == tmp_path / "output" / "a_fp16"
+    assert bc.temp_dir.exists()
+
+def test_batch_size_estimate(testdir, tmp_path):
+    specfile = testdir / "data" / "conf.d" / "a.yaml"
+    bc = BenchmarkSpec.load(config_filename=specfile, data_dir=tmp_path)["pytorch"]["a"]["fp16"]
+
+    assert bc.batch_size.estimate(gpu_count=1, device_type="cuda", device_memory_in_gb=10) == 80
+    assert bc.batch_size.estimate(gpu_count=2, device_type="cuda", device_memory_in_gb=10) == 112
+    assert bc.get_command(gpu_count=1, device_type="cuda", device_memory_in_gb=10).endswith("--train-batch-size 80")
+    assert bc.get_command(gpu_count=1, device_type="cuda", batch_size=96).endswith("--train-batch-size 96")
+
+def test_get_command_does_not_modify_spec(testdir, tmp_path):
+    specfile = testdir / "data" / "conf.d" / "a.yaml"
+    bc = BenchmarkSpec.load(config_filename=specfile, data_dir=tmp_path)["pytorch"]["a"]["fp16"]
+    assert bc.placeholders == {"GPU_COUNT", "CPU_COUNT", "DATA_DIR", "TMP_DIR"}
+
+    for gpu_count in [1, 2, 8]:
+        cmd = bc.get_command(gpu_count=gpu_count,
+                             device_type="cuda",
+                             device_memory_in_gb=10,
+                             placeholders={"CPU_COUNT": 16, "TMP_DIR": "/tmp/a"})
+        if gpu_count > 1:
+            assert f"--nproc_per_node={gpu_count} train.py" in cmd
+        assert f"--dataset-dir {tmp_path}/gnmt/wmt16_de_en" in cmd
+        assert "--train-loader-workers 16" in cmd
+        assert "--save-dir /tmp/a" in cmd
+
+    assert "{{GPU_COUNT}}" in bc.command_distributed
+    assert bc.arguments["train-loader-workers"] == "{{CPU_COUNT:<=32}}"
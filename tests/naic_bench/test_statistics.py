@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+from naic_bench.statistics import MetricStatistics, load_samples, save_samples, summarize, t_quantile
+
+@pytest.mark.parametrize("df,expected", [
+    (1, 12.706),
+    (2, 4.303),
+    (5, 2.571),
+    (10, 2.228),
+    (30, 2.042)
+])
+def test_t_quantile(df, expected):
+    assert t_quantile(0.975, df=df) == pytest.approx(expected, rel=5e-3)
+
+def test_t_quantile_invalid():
+    with pytest.raises(ValueError):
+        t_quantile(0.975, df=0)
+
+def test_statistics():
+    samples = [10.0, 12.0, 11.0, 13.0, 9.0, 11.0]
+    statistics = MetricStatistics.from_samples(samples)
+
+    assert statistics.count == 6
+    assert statistics.mean == pytest.approx(11.0)
+    assert statistics.median == pytest.approx(11.0)
+    assert statistics.min == 9.0
+    assert statistics.max == 13.0
+    assert statistics.stddev == pytest.approx(math.sqrt(2.0))
+
+    half_width = 2.571 * math.sqrt(2.0) / math.sqrt(6)
+    assert statistics.ci_low == pytest.approx(11.0 - half_width, rel=1e-3)
+    assert statistics.ci_high == pytest.approx(11.0 + half_width, rel=1e-3)
+    assert statistics.relative_ci == pytest.approx(half_width / 11.0, rel=1e-3)
+    assert statistics.outlier_count == 0
+
+def test_statistics_outliers():
+    samples = [100.0, 101.0, None, 99.0, 100.5, 20.0, 100.0, float('nan'), 99.5]
+    statistics = MetricStatistics.from_samples(samples)
+
+    assert statistics.count == 7
+    assert statistics.outlier_count == 1
+    assert statistics.outliers == [5]
+
+def test_statistics_few_samples():
+    assert MetricStatistics.from_samples([]).mean is None
+
+    statistics = MetricStatistics.from_samples([None, 5.0])
+    assert statistics.count == 1
+    assert statistics.mean == 5.0
+    assert statistics.stddev is None
+    assert statistics.ci_low is None
+
+def test_samples(tmp_path):
+    samples = {"throughput": [1.0, 2.0, 3.0], "latency": []}
+    save_samples(tmp_path / "samples.npz", samples)
+
+    loaded = load_samples(tmp_path / "samples.npz")
+    assert list(loaded["throughput"]) == [1.0, 2.0, 3.0]
+    assert len(loaded["latency"]) == 0
+
+    statistics = summarize(loaded)
+    assert statistics["throughput"].mean == pytest.approx(2.0)
+    assert statistics["latency"].count == 0
@@ -0,0 +1,81 @@
+import math
+import subprocess
+import time
+from array import array
+
+import numpy as np
+import pytest
+
+from naic_bench.telemetry import TelemetrySampler, summarize_telemetry
+
+def test_sampler(fake_smi, monkeypatch, tmp_path):
+    # devices report busy for all calls
+    monkeypatch.setenv("FAKE_SMI_BUSY_CALLS", "1000")
+
+    process = subprocess.Popen(["sleep", "5"])
+    try:
+        with TelemetrySampler(device_type="cuda", devices=["0"], interval_in_s=0.05) as sampler:
+            sampler.attach(process.pid)
+            time.sleep(0.4)
+    finally:
+        process.kill()
+        process.wait()
+
+    assert sampler.count >= 3
+    assert all(len(x) == sampler.count for x in sampler.series.values())
+    # only the selected device is recorded
+    assert "gpu0.power_in_w" in sampler.series
+    assert "gpu1.power_in_w" not in sampler.series
+
+    summary = sampler.summary()
+    assert summary.sample_count == sampler.count
+    assert summary.gpu_utilization_mean == pytest.approx(98.0)
+    assert summary.gpu_power_mean_in_w == pytest.approx(350.12)
+    assert summary.gpu_clock_min_in_mhz == pytest.approx(1980)
+    assert summary.gpu_temperature_max == pytest.approx(75)
+    assert summary.gpu_energy_in_j == pytest.approx(350.12 * summary.duration_in_s)
+    assert summary.rss_max_in_mb > 0
+
+    summary.set_throughput(700.24)
+    assert summary.samples_per_joule == pytest.approx(2.0)
+
+    sampler.save(tmp_path / "telemetry.npz")
+    with np.load(tmp_path / "telemetry.npz") as data:
+        assert len(data["time"]) == sampler.count
+        assert data["gpu0.utilization"][0] == 98.0
+
+def test_sampler_without_smi(monkeypatch):
+    monkeypatch.setenv("PATH", "")
+    sampler = TelemetrySampler(device_type="cuda", interval_in_s=0.05)
+    sampler.sample()
+    sampler.sample()
+
+    assert set(sampler.series) == {"time", "cpu_utilization", "rss_in_mb"}
+    summary = sampler.summary()
+    assert summary.sample_count == 2
+    assert summary.gpu_power_mean_in_w is None
+    assert summary.rss_max_in_mb is None
+
+def test_summarize_telemetry():
+    nan = math.nan
+    series = {
+        "time": array('d', [0.0, 1.0, 2.0, 3.0]),
+        "gpu0.power_in_w": array('d', [100.0, 200.0, 200.0, nan]),
+        "gpu1.power_in_w": array('d', [100.0, 100.0, nan, nan]),
+        "gpu0.utilization": array('d', [50.0, 100.0, 100.0, 50.0]),
+        "gpu1.utilization": array('d', [nan, nan, nan, nan]),
+    }
+    summary = summarize_telemetry(series, interval_in_s=1.0)
+    assert summary.duration_in_s == 3.0
+    assert summary.gpu_utilization_mean == pytest.approx(75.0)
+    # the last sample has no power reading
+    assert summary.gpu_power_mean_in_w == pytest.approx(700.0 / 3)
+    assert summary.gpu_power_max_in_w == pytest.approx(300.0)
+    assert summary.gpu_energy_in_j == pytest.approx((200 + 300) / 2 + (300 + 200) / 2)
+    assert summary.gpu_clock_mean_in_mhz is None
+
+    assert summarize_telemetry({}, interval_in_s=1.0).sample_count == 0
+
+def test_sampler_invalid_interval():
+    with pytest.raises(ValueError):
+        TelemetrySampler(interval_in_s=0)
@@ -0,0 +1,29 @@
+import pickle
+import pytest
+
+from naic_bench.template import Placeholder, Template
+
+@pytest.mark.parametrize("text,values,expected", [
+    ["{{CPU_COUNT:<=32}}", {"CPU_COUNT": 128}, "32"],
+    ["{{CPU_COUNT:<=32}}", {"CPU_COUNT": 8}, "8"],
+    ["{{GPU_COUNT:>=2}}", {"GPU_COUNT": 1}, "2"],
+    ["{{BOUND:<=0.5}}", {"BOUND": 1}, "0.5"],
+    ["--nproc_per_node={{GPU_COUNT}} train.py", {"GPU_COUNT": 8}, "--nproc_per_node=8 train.py"],
+    ["{{DATA_DIR}}/gnmt/{{DATA_DIR}}", {"DATA_DIR": "/data"}, "/data/gnmt//data"],
+    ["{{TMP_DIR}}/models", {}, "{{TMP_DIR}}/models"],
+    ["no placeholder", {"GPU_COUNT": 1}, "no placeholder"],
+])
+def test_template(text, values, expected):
+    assert Template(text).render(values) == expected
+
+def test_template_parse_once():
+    template = Template("python -m torch.distributed.run --nproc_per_node={{GPU_COUNT}} --workers {{CPU_COUNT:<=32}}")
+    assert template.names == {"GPU_COUNT", "CPU_COUNT"}
+    assert template.placeholders == [Placeholder("GPU_COUNT"), Placeholder("CPU_COUNT", "<=", 32)]
+
+    for gpu_count in [1, 2, 4, 8]:
+        assert template.render({"GPU_COUNT": gpu_count, "CPU_COUNT": 64}) == \
+                f"python -m torch.distributed.run --nproc_per_node={gpu_count} --workers 32"
+
+    restored = pickle.loads(pickle.dumps(template))
+    assert restored.segments == template.segments
@@ -0,0 +1,120 @@
+import threading
+import time
+
+from naic_bench.venv import VENV_COMPLETE_MARKER, VenvCache, Wheelhouse, install_command
+
+def test_compute_key(tmp_path):
+    requirements_txt = tmp_path / "requirements.txt"
+    requirements_txt.write_text("numpy\n")
+
+    key = VenvCache.compute_key(requirements_txt, device_type="cuda")
+    assert key == VenvCache.compute_key(requirements_txt, device_type="cuda")
+    assert key != VenvCache.compute_key(requirements_txt, device_type="xpu")
+
+    requirements_txt.write_text("numpy\npandas\n")
+    assert key != VenvCache.compute_key(requirements_txt, device_type="cuda")
+
+def test_get_builds_once(tmp_path, monkeypatch):
+    benchmark_dirs = [tmp_path / "a", tmp_path / "b"]
+    for benchmark_dir in benchmark_dirs:
+        benchmark_dir.mkdir()
+        (benchmark_dir / "requirements.txt").write_text("numpy\n")
+
+    created = []
+    def create(self, venv, benchmark_name, requirements_txt, device_type=None):
+        created.append(benchmark_name)
+        time.sleep(0.2)
+        venv.path.mkdir(parents=True)
+        (venv.path / VENV_COMPLETE_MARKER).touch()
+
+    monkeypatch.setattr(VenvCache, "create", create)
+
+    cache = VenvCache(cache_dir=tmp_path / "venvs")
+    venvs = []
+    def get(benchmark_dir):
+        venvs.append(cache.get(benchmark_name=benchmark_dir.name, benchmark_dir=benchmark_dir, device_type="cuda"))
+
+    # benchmarks with identical requirements share the venv
+    threads = [threading.Thread(target=get, args=[x]) for x in benchmark_dirs * 2]
+    [x.start() for x in threads]
+    [x.join() for x in threads]
+
+    assert len(created) == 1
+    assert len({x.path for x in venvs}) == 1
+
+    # an incomplete venv, e.g., from an interrupted job, is recreated
+    (venvs[0].path / VENV_COMPLETE_MARKER).unlink()
+    cache.get(benchmark_name="a", benchmark_dir=benchmark_dirs[0], device_type="cuda")
+    assert len(created) == 2
+
+    current = cache.get(benchmark_name="a", benchmark_dir=benchmark_dirs[0], device_type="cuda")
+    forced = cache.get(benchmark_name="a", benchmark_dir=benchmark_dirs[0], device_type="cuda", force=True)
+    assert len(created) == 3
+
+    # a recreated venv is published as new version, the previous version remains for running jobs
+    assert forced.path != current.path
+    assert (current.path / VENV_COMPLETE_MARKER).exists()
+    assert cache.get(benchmark_name="b", benchmark_dir=benchmark_dirs[1], device_type="cuda").path == forced.path
+    assert len(created) == 3
+
+def test_get_replaces_legacy_venv(tmp_path, monkeypatch):
+    def create(self, venv, benchmark_name, requirements_txt, device_type=None):
+        if benchmark_name == "fail":
+            venv.path.mkdir(parents=True)
+            raise RuntimeError("installation failed")
+        venv.path.mkdir(parents=True)
+        (venv.path / VENV_COMPLETE_MARKER).touch()
+
+    monkeypatch.setattr(VenvCache, "create", create)
+
+    cache = VenvCache(cache_dir=tmp_path / "venvs")
+    venv = cache.venv(VenvCache.compute_key(tmp_path / "requirements.txt", device_type="cuda"))
+
+    # a venv built in place is moved aside, not deleted
+    venv.path.mkdir(parents=True)
+    (venv.path / "in-use").touch()
+    built = cache.get(benchmark_name="a", benchmark_dir=tmp_path, device_type="cuda")
+    assert venv.path.is_symlink()
+    assert venv.path.resolve() == built.path
+    assert [x.name for x in venv.path.parent.glob(f"{venv.name}.replaced-*/in-use")] == ["in-use"]
+
+    # a failed build does not affect the published version
+    try:
+        cache.get(benchmark_name="fail", benchmark_dir=tmp_path, device_type="cuda", force=True)
+    except RuntimeError:
+        pass
+    assert venv.path.resolve() == built.path
+    assert sorted(x.name for x in venv.path.parent.iterdir() if x.is_dir() and not x.is_symlink()
+                  and not x.name.startswith(f"{venv.name}.replaced-")) == [built.path.name]
+
+def test_install_command(tmp_path):
+    requirements_txt = tmp_path / "requirements.txt"
+    requirements_txt.write_text("numpy\n")
+
+    wheelhouse = Wheelhouse(tmp_path / "wheels")
+    venv = VenvCache(cache_dir=tmp_path / "venvs", wheelhouse=wheelhouse).venv("abc")
+
+    cmd = install_command(venv, requirements_txt, wheelhouse=wheelhouse, backend="uv")
+    assert cmd[:5] == ["uv", "pip", "install", "--python", str(venv.path / "bin" / "python")]
+    assert "--no-index" not in cmd
+
+    # offline, once the wheelhouse contains all wheels
+    wheelhouse.path.mkdir()
+    wheelhouse.stamp(requirements_txt).touch()
+    cmd = install_command(venv, requirements_txt, wheelhouse=wheelhouse, backend="pip")
+    assert cmd == [str(venv.path / "bin" / "python"), "-m", "pip", "install",
+                   "--no-index", "--find-links", str(wheelhouse.path),
+                   "-r", str(requirements_txt)]
+
+    # a modified requirements.txt requires a new build
+    requirements_txt.write_text("numpy\npandas\n")
+    assert not wheelhouse.contains(requirements_txt)
+
+def test_wheelhouse_build(tmp_path):
+    requirements_txt = tmp_path / "requirements.txt"
+    requirements_txt.write_text("# no requirements\n")
+
+    wheelhouse = Wheelhouse(tmp_path / "wheels")
+    wheelhouse.build(requirements_txt)
+    assert wheelhouse.contains(requirements_txt)
+    assert wheelhouse.build(requirements_txt) == 0.0
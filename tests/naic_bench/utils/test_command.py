@@ -1,4 +1,96 @@
-from naic_bench.utils.command import find_confd
+import pytest
+import sys
+import time
+
+from naic_bench.utils.command import Command, LineSplitter, find_confd
 
 def test_find_confd():
     assert find_confd() is not None
+
+def test_line_splitter():
+    splitter = LineSplitter()
+    assert splitter.feed(b"first\nsec") == ["first"]
+    assert splitter.feed(b"ond\r\nthi") == ["second"]
+    # split multi-byte character
+    assert splitter.feed("rd ü".encode()[:-1]) == []
+    assert splitter.feed("ü".encode()[-1:] + b"\n\n") == ["third ü", ""]
+    assert splitter.flush() == []
+
+    splitter.feed(b"no newline")
+    assert splitter.flush() == ["no newline"]
+
+def test_run_with_progress():
+    result = Command.run_with_progress([sys.executable, "-c",
+        "import sys; print('out-0'); print('err-0', file=sys.stderr); print('out-1', end='')"],
+        echo=False
+    )
+    assert result.returncode == 0
+    assert result.stdout == ["out-0", "out-1"]
+    assert result.stderr == ["err-0"]
+
+def test_run_with_progress_throughput():
+    """
+    Micro-benchmark: capture a synthetic high-rate emitter and report the captured lines/s
+    """
+    line_count = 500_000
+    emitter = "import sys\n" \
+              f"for i in range({line_count}):\n" \
+              "    sys.stdout.write(f'Training: epoch 0 iteration {i} throughput 1234.5 tok/s\\n')\n" \
+              "    if i % 10 == 0:\n" \
+              "        sys.stderr.write(f'warning {i}\\n')\n"
+
+    start = time.perf_counter()
+    result = Command.run_with_progress([sys.executable, "-c", emitter], echo=False)
+    duration = time.perf_counter() - start
+
+    assert len(result.stdout) == line_count
+    assert len(result.stderr) == line_count // 10
+    assert result.stdout[-1] == f"Training: epoch 0 iteration {line_count - 1} throughput 1234.5 tok/s"
+
+    lines_per_s = (len(result.stdout) + len(result.stderr)) / duration
+    print(f"Captured {lines_per_s:.0f} lines/s ({duration:.2f} s)")
+
+def test_run_with_progress_stop_condition():
+    lines = []
+    emitter = "import time\n" \
+              "for i in range(100):\n" \
+              "    print(f'step {i}', flush=True)\n" \
+              "    time.sleep(0.1)\n"
+
+    start = time.perf_counter()
+    result = Command.run_with_progress([sys.executable, "-c", emitter],
+                echo=False,
+                line_handler=lines.append,
+                stop_condition=lambda: len(lines) >= 3
+             )
+    assert time.perf_counter() - start < 5
+    assert result.stopped_early
+    assert result.returncode != 0
+    assert lines[:3] == ["step 0", "step 1", "step 2"]
+
+def test_run_with_progress_failing_line_handler():
+    values = []
+    emitter = "for x in ['1.5', 'nan%', '2.5']: print(f'value: {x}', flush=True)"
+
+    result = Command.run_with_progress([sys.executable, "-c", emitter],
+                echo=False,
+                line_handler=lambda line: values.append(float(line.split(":")[1]))
+             )
+    assert result.returncode == 0
+    assert values == [1.5, 2.5]
+    assert list(result.stdout) == ["value: 1.5", "value: nan%", "value: 2.5"]
+
+@pytest.mark.parametrize("log_name", ["stdout.log", "stdout.log.gz"])
+def test_run_with_progress_spooling(log_name, tmp_path):
+    line_count = 1000
+    result = Command.run_with_progress([sys.executable, "-c", f"for i in range({line_count}): print(f'line {{i}}')"],
+                echo=False,
+                stdout_log=tmp_path / log_name,
+                stderr_log=tmp_path / "stderr.log",
+                max_lines_in_memory=10
+             )
+
+    assert result.stdout == [f"line {i}" for i in range(line_count - 10, line_count)]
+    assert list(result.iter_stdout()) == [f"line {i}" for i in range(line_count)]
+    assert list(result.iter_stderr()) == []
+    assert (tmp_path / log_name).exists()
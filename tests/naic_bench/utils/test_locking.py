@@ -0,0 +1,28 @@
+import multiprocessing
+import pytest
+
+from naic_bench.utils.locking import FileLock
+
+def hold_lock(path, acquired, release):
+    with FileLock(path):
+        acquired.set()
+        release.wait(10)
+
+def test_file_lock(tmp_path):
+    path = tmp_path / "locks" / "test.lock"
+
+    acquired = multiprocessing.Event()
+    release = multiprocessing.Event()
+    process = multiprocessing.Process(target=hold_lock, args=[path, acquired, release])
+    process.start()
+    try:
+        assert acquired.wait(10)
+        with pytest.raises(TimeoutError):
+            FileLock(path, timeout_in_s=0.2, poll_interval_in_s=0.05).acquire()
+    finally:
+        release.set()
+        process.join()
+
+    with FileLock(path, timeout_in_s=1) as lock:
+        assert lock.locked
+    assert not lock.locked